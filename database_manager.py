@@ -0,0 +1,1008 @@
+# database_manager.py
+import sqlite3
+import os
+import re
+import sys
+import json
+import threading
+import time
+import weakref
+import gc
+from datetime import date, datetime, timedelta
+from contextlib import contextmanager
+
+from database import Database
+from utils.migrations import MigrationRunner, MigrationError
+from utils.prefix_index import build_customer_index
+
+DATABASE_CONFIG_FILE = "config/database_config.json"
+
+DEFAULT_DATABASE_CONFIG = {
+    "database_path": "ganesh_toughened_industry.db",
+    "backup_directory": "backups",
+    "backup_retention_days": 90,
+    "backup_compression_level": 6,
+    "backup_fast_mode": False,
+    "backup_io_limit_mb": 0,
+    "connection_timeout": 30,
+    "max_connections": 5,
+    "cache_size_kb": 16384,
+    "mmap_size_mb": 128
+}
+
+
+def load_database_config(config_file=DATABASE_CONFIG_FILE):
+    """Load database settings, falling back to defaults for missing keys"""
+    config = dict(DEFAULT_DATABASE_CONFIG)
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config.update(json.load(f))
+    except Exception as e:
+        print(f"Error loading database config: {e}")
+    return config
+
+
+# Invoice history sort orders: sort key -> (column, direction).
+# Pages are keyed on (column, invoice_id) so each page is an index range scan.
+INVOICE_PAGE_SORTS = {
+    "date_desc": ("i.date", "DESC"),
+    "date_asc": ("i.date", "ASC"),
+    "customer_asc": ("c.name", "ASC"),
+    "customer_desc": ("c.name", "DESC"),
+    "total_desc": ("COALESCE(i.total, 0)", "DESC"),
+    "total_asc": ("COALESCE(i.total, 0)", "ASC"),
+}
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that goes back to its pool instead of closing"""
+
+    def close(self):
+        """Return the connection to the pool it came from"""
+        pool = getattr(self, "pool", None)
+        if pool is not None:
+            pool.release(self)
+        else:
+            super().close()
+
+
+class ConnectionPool:
+    """Pool of warm SQLite connections shared by the whole application"""
+
+    def __init__(self, db_path, max_connections=5, timeout=30, cache_size_kb=16384, mmap_size_mb=128):
+        """Initialize the pool; connections are opened lazily"""
+        self.db_path = db_path
+        self.max_connections = max(1, int(max_connections))
+        self.timeout = float(timeout)
+        self.cache_size_kb = int(cache_size_kb)
+        self.mmap_size = int(mmap_size_mb) * 1024 * 1024
+
+        self._idle = []
+        self._open_count = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _open_connection(self):
+        """Open a new connection with the shared pragmas applied"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                               factory=PooledConnection, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size=-{self.cache_size_kb}")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+
+        conn.pool = self
+        # Callers that drop a connection without closing it still free their slot
+        conn.finalizer = weakref.finalize(conn, self._forget)
+        return conn
+
+    def _forget(self):
+        """Release the slot of a connection that was garbage collected"""
+        with self._condition:
+            self._open_count -= 1
+            self._condition.notify()
+
+    def acquire(self):
+        """Take a connection from the pool, waiting up to the timeout"""
+        deadline = time.monotonic() + self.timeout
+        collected = False
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._open_count < self.max_connections:
+                    self._open_count += 1
+                    break
+                if not collected:
+                    # sqlite3 connections sit in reference cycles, so leaked
+                    # ones are only freed by the cycle collector
+                    collected = True
+                    self._condition.release()
+                    try:
+                        gc.collect()
+                    finally:
+                        self._condition.acquire()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"No database connection available after {self.timeout:.0f} seconds")
+                self._condition.wait(remaining)
+
+        try:
+            return self._open_connection()
+        except Exception:
+            with self._condition:
+                self._open_count -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn):
+        """Reset a connection and put it back on the idle list"""
+        try:
+            if conn.in_transaction:
+                # Same outcome as closing a connection with uncommitted work
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error as e:
+            print(f"Discarding broken pooled connection: {e}")
+            self._discard(conn)
+            return
+
+        with self._condition:
+            if self._closed:
+                self._discard(conn)
+                return
+            if conn not in self._idle:
+                self._idle.append(conn)
+            self._condition.notify()
+
+    def _discard(self, conn):
+        """Really close a connection and free its slot"""
+        conn.pool = None
+        if conn.finalizer.detach():
+            with self._condition:
+                self._open_count -= 1
+                self._condition.notify()
+        try:
+            sqlite3.Connection.close(conn)
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Close every idle connection and refuse new checkouts"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+class CatalogCache:
+    """In-memory customer and product lookup tables, reloaded after writes"""
+
+    def __init__(self, loaders):
+        """Initialize with a loader per kind returning the full list of rows"""
+        self._loaders = loaders
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._generation = 0
+
+    def invalidate(self, kind=None):
+        """Drop one kind ("customers"/"products") or everything"""
+        with self._lock:
+            self._generation += 1
+            if kind is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(kind, None)
+
+    def _table(self, kind):
+        """Get the lookup table for a kind, loading it on first use"""
+        with self._lock:
+            table = self._tables.get(kind)
+            if table is not None:
+                return table
+            generation = self._generation
+
+        rows = self._loaders[kind]()
+        table = {"rows": rows, "by_id": {}, "by_name": {}, "by_label": {}}
+        id_key = "customer_id" if kind == "customers" else "product_id"
+        for row in rows:
+            table["by_id"][row[id_key]] = row
+            # Keep the first row for duplicate names, like the old linear scans
+            table["by_name"].setdefault(row["name"], row)
+            if kind == "products":
+                table["by_label"].setdefault(f"{row['name']} ({row['type']})", row)
+
+        with self._lock:
+            # Only keep the result if nothing was written while loading
+            if generation == self._generation:
+                self._tables[kind] = table
+        return table
+
+    def all(self, kind):
+        """Get copies of every row of a kind"""
+        return [dict(row) for row in self._table(kind)["rows"]]
+
+    def get(self, kind, index, key):
+        """Get a copy of the row for a key in an index, or None"""
+        row = self._table(kind)[index].get(key)
+        return dict(row) if row is not None else None
+
+    def derived(self, kind, name, builder):
+        """Get an index built from a kind's rows on first use and dropped with them"""
+        table = self._table(kind)
+        with self._lock:
+            value = table.get(name)
+        if value is None:
+            value = builder(table["rows"])
+            with self._lock:
+                table[name] = value
+        return value
+
+
+class DatabaseManager(Database):
+    """Application database with pooled connections and versioned schema"""
+
+    def __init__(self, db_name=None, config_file=DATABASE_CONFIG_FILE):
+        """Initialize the connection pool before the schema is touched"""
+        self.config = load_database_config(config_file)
+        db_name = db_name or self.config["database_path"]
+
+        self.pool = ConnectionPool(
+            db_name,
+            max_connections=self.config["max_connections"],
+            timeout=self.config["connection_timeout"],
+            cache_size_kb=self.config["cache_size_kb"],
+            mmap_size_mb=self.config["mmap_size_mb"]
+        )
+
+        # Customer/product lookups served from memory; writes invalidate it
+        self.catalog = CatalogCache({
+            "customers": lambda: Database.get_customers(self),
+            "products": lambda: Database.get_products(self)
+        })
+
+        super().__init__(db_name)
+
+        # Bring the schema (indexes, new tables) up to the latest version.
+        # Later queries rely on it, so a failed migration refuses to open the database.
+        try:
+            self.apply_migrations()
+        except MigrationError:
+            self.close()
+            raise
+
+    def apply_migrations(self):
+        """Apply any pending schema migrations; raises MigrationError if one fails"""
+        try:
+            return MigrationRunner(self.db_name).run()
+        except MigrationError as e:
+            print(f"Error applying database migrations: {e}")
+            raise
+        except sqlite3.Error as e:
+            print(f"Error applying database migrations: {e}")
+            raise MigrationError(f"Could not read the schema version: {e}") from e
+
+    def get_schema_version(self):
+        """Get (current_version, latest_version) of the schema"""
+        return MigrationRunner(self.db_name).get_status()
+
+    def get_connection(self):
+        """Get a warm connection from the pool; close() hands it back"""
+        return self.pool.acquire()
+
+    @contextmanager
+    def get_cursor(self):
+        """Context manager for a pooled cursor, committing on success"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            yield cursor
+            conn.commit()
+        except sqlite3.Error as e:
+            if conn:
+                conn.rollback()
+            print(f"Database error: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close_all()
+
+    @staticmethod
+    def _date_param(value):
+        """Convert a date/datetime (or ISO string) to the stored YYYY-MM-DD form"""
+        if isinstance(value, (date, datetime)):
+            return value.strftime("%Y-%m-%d")
+        return value
+
+    @staticmethod
+    def _date_value(value):
+        """Convert a datetime or stored YYYY-MM-DD string to a date"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+    def get_customer_summary(self, from_date, to_date):
+        """Get invoiced, paid and outstanding totals per customer for a date range"""
+        try:
+            from_str = self._date_param(from_date)
+            to_str = self._date_param(to_date)
+
+            with self.get_cursor() as cursor:
+                # Both sides are aggregated over the date indexes before the join,
+                # so each customer costs one row rather than two extra queries
+                cursor.execute("""
+                SELECT c.customer_id, c.name, c.place,
+                       COALESCE(inv.total_invoices, 0) AS total_invoices,
+                       COALESCE(pay.total_payments, 0) AS total_payments
+                FROM customers c
+                LEFT JOIN (
+                    SELECT customer_id, SUM(total) AS total_invoices
+                    FROM invoices
+                    WHERE date >= ? AND date <= ?
+                    GROUP BY customer_id
+                ) inv ON inv.customer_id = c.customer_id
+                LEFT JOIN (
+                    SELECT customer_id, SUM(amount) AS total_payments
+                    FROM payments
+                    WHERE date >= ? AND date <= ?
+                    GROUP BY customer_id
+                ) pay ON pay.customer_id = c.customer_id
+                WHERE COALESCE(inv.total_invoices, 0) > 0 OR COALESCE(pay.total_payments, 0) > 0
+                ORDER BY c.customer_id
+                """, (from_str, to_str, from_str, to_str))
+
+                summary = []
+                for row in cursor.fetchall():
+                    total_invoices = row[3] or 0
+                    total_payments = row[4] or 0
+                    summary.append({
+                        "customer_id": row[0],
+                        "name": row[1],
+                        "place": row[2],
+                        "total_invoices": total_invoices,
+                        "total_payments": total_payments,
+                        "outstanding": total_invoices - total_payments
+                    })
+                return summary
+        except Exception as e:
+            print(f"Error getting customer summary: {e}")
+            return []
+
+    def get_customer_balance(self, customer_id):
+        """Get lifetime invoiced, paid and outstanding totals from the balance ledger"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                SELECT total_invoices, total_payments
+                FROM customer_balances
+                WHERE customer_id = ?
+                """, (customer_id,))
+                row = cursor.fetchone()
+
+                total_invoices = row[0] if row else 0
+                total_payments = row[1] if row else 0
+                return {
+                    "customer_id": customer_id,
+                    "total_invoices": total_invoices,
+                    "total_payments": total_payments,
+                    "outstanding": total_invoices - total_payments
+                }
+        except Exception as e:
+            print(f"Error getting customer balance: {e}")
+            return None
+
+    def get_customer_outstanding(self, customer_id=None):
+        """Get outstanding balance for one customer, or all customers who owe money"""
+        try:
+            with self.get_cursor() as cursor:
+                query = """
+                SELECT c.customer_id, c.name, c.place,
+                       COALESCE(b.total_invoices, 0) AS total_invoices,
+                       COALESCE(b.total_payments, 0) AS total_payments,
+                       COALESCE(b.total_invoices, 0) - COALESCE(b.total_payments, 0) AS outstanding
+                FROM customers c
+                LEFT JOIN customer_balances b ON b.customer_id = c.customer_id
+                """
+                if customer_id:
+                    cursor.execute(query + " WHERE c.customer_id = ?", (customer_id,))
+                    rows = cursor.fetchall()
+                else:
+                    cursor.execute(query + """
+                WHERE COALESCE(b.total_invoices, 0) - COALESCE(b.total_payments, 0) > 0
+                ORDER BY outstanding DESC
+                """)
+                    rows = cursor.fetchall()
+
+                outstanding_list = []
+                for row in rows:
+                    outstanding_list.append({
+                        "customer_id": row[0],
+                        "name": row[1],
+                        "place": row[2],
+                        "total_invoices": row[3],
+                        "total_payments": row[4],
+                        "outstanding": row[5]
+                    })
+
+                if customer_id:
+                    return outstanding_list[0] if outstanding_list else None
+                return outstanding_list
+        except Exception as e:
+            print(f"Error getting customer outstanding: {e}")
+            return None if customer_id else []
+
+    def rebuild_customer_balances(self):
+        """Recompute the customer balance ledger from invoices and payments"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("DELETE FROM customer_balances")
+                cursor.execute("""
+                INSERT INTO customer_balances (customer_id, total_invoices, total_payments)
+                SELECT c.customer_id,
+                       COALESCE((SELECT SUM(total) FROM invoices i WHERE i.customer_id = c.customer_id), 0),
+                       COALESCE((SELECT SUM(amount) FROM payments p WHERE p.customer_id = c.customer_id), 0)
+                FROM customers c
+                """)
+                return cursor.rowcount
+        except Exception as e:
+            print(f"Error rebuilding customer balances: {e}")
+            return None
+
+    def verify_customer_balances(self, tolerance=0.005):
+        """Compare the balance ledger with a full aggregation; returns mismatched customers"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                SELECT c.customer_id, c.name,
+                       COALESCE(b.total_invoices, 0), COALESCE(b.total_payments, 0),
+                       COALESCE((SELECT SUM(total) FROM invoices i WHERE i.customer_id = c.customer_id), 0),
+                       COALESCE((SELECT SUM(amount) FROM payments p WHERE p.customer_id = c.customer_id), 0)
+                FROM customers c
+                LEFT JOIN customer_balances b ON b.customer_id = c.customer_id
+                """)
+
+                mismatches = []
+                for row in cursor.fetchall():
+                    if abs(row[2] - row[4]) > tolerance or abs(row[3] - row[5]) > tolerance:
+                        mismatches.append({
+                            "customer_id": row[0],
+                            "name": row[1],
+                            "ledger_invoices": row[2],
+                            "ledger_payments": row[3],
+                            "actual_invoices": row[4],
+                            "actual_payments": row[5]
+                        })
+                return mismatches
+        except Exception as e:
+            print(f"Error verifying customer balances: {e}")
+            return None
+
+
+    def save_invoice_bundle(self, customer_id, date, invoice_number, subtotal, extra_charges, round_off,
+                            total, payment_mode, p_pay_no, extra_charges_breakdown, items,
+                            visit=None, invoice_id=None, pending_invoice_id=None):
+        """Save an invoice with its items, works, stock movements, payment and visit in one transaction
+
+        Passing invoice_id rewrites that invoice in place; passing pending_invoice_id
+        marks the pending invoice confirmed. Returns (invoice_id, invoice_number).
+        """
+        try:
+            date_str = self._date_param(date)
+
+            if invoice_id is None:
+                # Pick a fresh number before the write transaction starts
+                with self.get_cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM invoices WHERE invoice_number = ?", (invoice_number,))
+                    taken = cursor.fetchone() is not None
+                if taken:
+                    invoice_number = self.generate_invoice_number()
+
+            with self.get_cursor() as cursor:
+                if invoice_id is None:
+                    cursor.execute("""
+                    INSERT INTO invoices (customer_id, date, invoice_number, subtotal, extra_charges, round_off,
+                                          total, payment_mode, p_pay_no, extra_charges_breakdown)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (customer_id, date_str, invoice_number, subtotal, extra_charges, round_off,
+                          total, payment_mode, p_pay_no, extra_charges_breakdown))
+                    invoice_id = cursor.lastrowid
+                    payment_row = None
+                else:
+                    cursor.execute("""
+                    UPDATE invoices SET
+                        customer_id = ?, date = ?, subtotal = ?, extra_charges = ?,
+                        round_off = ?, total = ?, payment_mode = ?, p_pay_no = ?,
+                        extra_charges_breakdown = ?
+                    WHERE invoice_id = ?
+                    """, (customer_id, date_str, subtotal, extra_charges, round_off,
+                          total, payment_mode, p_pay_no, extra_charges_breakdown, invoice_id))
+
+                    # Items, works and stock movements are rewritten from the form
+                    cursor.execute("DELETE FROM invoice_items WHERE invoice_id = ?", (invoice_id,))
+                    cursor.execute("DELETE FROM works WHERE invoice_id = ?", (invoice_id,))
+                    cursor.execute("DELETE FROM inventory WHERE invoice_id = ?", (invoice_id,))
+
+                    cursor.execute("SELECT payment_id FROM payments WHERE invoice_id = ?", (invoice_id,))
+                    payment_row = cursor.fetchone()
+
+                cursor.executemany("""
+                INSERT INTO invoice_items (invoice_id, product_id, actual_height, actual_width,
+                                           chargeable_height, chargeable_width, sqft, rounded_sqft,
+                                           rate, amount, quantity)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(invoice_id, item["product_id"], item["actual_height"], item["actual_width"],
+                       item["chargeable_height"], item["chargeable_width"], item["sqft"],
+                       item["rounded_sqft"], item["rate"], item["amount"], item["quantity"])
+                      for item in items])
+
+                cursor.executemany("""
+                INSERT INTO works (invoice_id, date, type, size, quantity, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """, [(invoice_id, date_str, item["product_name"],
+                       f"{item['chargeable_height']}\" x {item['chargeable_width']}\"",
+                       item["quantity"], "Completed")
+                      for item in items])
+
+                cursor.executemany("""
+                INSERT INTO inventory (product_id, date, type, quantity, invoice_id)
+                VALUES (?, ?, ?, ?, ?)
+                """, [(item["product_id"], date_str, "stock_out", item["quantity"], invoice_id) for item in items])
+
+                if payment_row:
+                    cursor.execute("""
+                    UPDATE payments SET
+                        customer_id = ?, date = ?, amount = ?, mode = ?, reference = ?
+                    WHERE payment_id = ?
+                    """, (customer_id, date_str, total, payment_mode, p_pay_no, payment_row[0]))
+                elif payment_mode:
+                    cursor.execute("""
+                    INSERT INTO payments (customer_id, date, amount, mode, reference, invoice_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """, (customer_id, date_str, total, payment_mode, p_pay_no, invoice_id))
+
+                if visit:
+                    cursor.execute("""
+                    INSERT INTO customer_visits (customer_id, name, city, purpose, date)
+                    VALUES (?, ?, ?, ?, ?)
+                    """, (customer_id, visit["name"], visit.get("city"), visit.get("purpose", "Billing"),
+                          datetime.now().strftime("%Y-%m-%d")))
+
+                if pending_invoice_id is not None:
+                    cursor.execute("UPDATE pending_invoices SET status = ? WHERE pending_invoice_id = ?",
+                                   ("confirmed", pending_invoice_id))
+
+                return invoice_id, invoice_number
+        except Exception as e:
+            print(f"Error saving invoice: {e}")
+            return None, None
+
+    def get_invoices_page(self, after_key=None, limit=100, sort="date_desc",
+                          customer=None, from_date=None, to_date=None, before_key=None):
+        """Get one page of invoices after a keyset position; returns (invoices, next_key)
+
+        With before_key the page is the one just before that position instead
+        (still in display order), and the returned key is the position to
+        page back from next. Each invoice carries its own position as "key".
+        A returned key of None means there is nothing further that way.
+        """
+        try:
+            column, direction = INVOICE_PAGE_SORTS[sort]
+            if before_key is not None:
+                # Walk the index backwards from before_key, then flip the page
+                after_key = before_key
+                direction = "ASC" if direction == "DESC" else "DESC"
+            comparison = "<" if direction == "DESC" else ">"
+
+            conditions = []
+            params = []
+            if customer:
+                conditions.append("c.name LIKE ?")
+                params.append(f"%{customer}%")
+            if from_date:
+                conditions.append("i.date >= ?")
+                params.append(self._date_param(from_date))
+            if to_date:
+                conditions.append("i.date <= ?")
+                params.append(self._date_param(to_date))
+            if after_key is not None:
+                conditions.append(f"({column}, i.invoice_id) {comparison} (?, ?)")
+                params.extend(after_key)
+
+            query = f"""
+            SELECT i.invoice_id, i.invoice_number, i.date, i.total, i.payment_mode,
+                   c.name as customer_name, c.customer_id, {column} as sort_value
+            FROM invoices i
+            JOIN customers c ON i.customer_id = c.customer_id
+            {"WHERE " + " AND ".join(conditions) if conditions else ""}
+            ORDER BY {column} {direction}, i.invoice_id {direction}
+            LIMIT ?
+            """
+            params.append(limit)
+
+            with self.get_cursor() as cursor:
+                cursor.execute(query, params)
+                invoices = []
+                for row in cursor.fetchall():
+                    invoices.append({
+                        "invoice_id": row[0],
+                        "invoice_number": row[1],
+                        "date": row[2],
+                        "total": row[3],
+                        "payment_mode": row[4],
+                        "customer_name": row[5],
+                        "customer_id": row[6],
+                        "key": (row[7], row[0])
+                    })
+
+                # A short page means there is nothing after it
+                next_key = None
+                if len(invoices) == limit:
+                    next_key = invoices[-1]["key"]
+                if before_key is not None:
+                    invoices.reverse()
+                return invoices, next_key
+        except Exception as e:
+            print(f"Error getting invoices page: {e}")
+            return [], None
+
+    def get_invoices_for_export(self, customer=None, from_date=None, to_date=None):
+        """Get full invoices (customer details and items) matching the bill history filters
+
+        Runs two queries, one for the invoices and one for all their items,
+        instead of one item query per invoice.
+        """
+        try:
+            conditions = []
+            params = []
+            if customer:
+                conditions.append("c.name LIKE ?")
+                params.append(f"%{customer}%")
+            if from_date:
+                conditions.append("i.date >= ?")
+                params.append(self._date_param(from_date))
+            if to_date:
+                conditions.append("i.date <= ?")
+                params.append(self._date_param(to_date))
+            where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+            with self.get_cursor() as cursor:
+                cursor.execute(f"""
+                SELECT i.invoice_id, i.customer_id, i.invoice_number, i.date, i.subtotal, i.extra_charges,
+                       i.round_off, i.total, i.payment_mode, i.p_pay_no, i.extra_charges_breakdown,
+                       c.name as customer_name, c.place as customer_place, c.phone as customer_phone,
+                       c.gst as customer_gst
+                FROM invoices i
+                JOIN customers c ON i.customer_id = c.customer_id
+                {where}
+                ORDER BY i.date, i.invoice_id
+                """, params)
+
+                invoices = {}
+                for row in cursor.fetchall():
+                    invoices[row[0]] = {
+                        "invoice_id": row[0],
+                        "customer_id": row[1],
+                        "invoice_number": row[2],
+                        "date": row[3],
+                        "subtotal": row[4],
+                        "extra_charges": row[5],
+                        "round_off": row[6],
+                        "total": row[7],
+                        "payment_mode": row[8],
+                        "p_pay_no": row[9],
+                        "extra_charges_breakdown": row[10],
+                        "customer_name": row[11],
+                        "customer_place": row[12],
+                        "customer_phone": row[13],
+                        "customer_gst": row[14],
+                        "items": []
+                    }
+
+                cursor.execute(f"""
+                SELECT ii.invoice_id, ii.actual_height, ii.actual_width, ii.chargeable_height,
+                       ii.chargeable_width, ii.sqft, COALESCE(ii.rounded_sqft, ii.sqft), ii.rate,
+                       ii.amount, ii.quantity, p.name as product_name
+                FROM invoice_items ii
+                JOIN products p ON ii.product_id = p.product_id
+                WHERE ii.invoice_id IN (
+                    SELECT i.invoice_id FROM invoices i
+                    JOIN customers c ON i.customer_id = c.customer_id
+                    {where}
+                )
+                ORDER BY ii.invoice_id, ii.item_id
+                """, params)
+
+                for row in cursor.fetchall():
+                    invoices[row[0]]["items"].append({
+                        "actual_height": row[1],
+                        "actual_width": row[2],
+                        "chargeable_height": row[3],
+                        "chargeable_width": row[4],
+                        "sqft": row[5],
+                        "rounded_sqft": row[6],
+                        "rate": row[7],
+                        "amount": row[8],
+                        "quantity": row[9],
+                        "product_name": row[10]
+                    })
+
+                return list(invoices.values())
+        except Exception as e:
+            print(f"Error getting invoices for export: {e}")
+            return []
+
+    def search_all(self, text, limit=50):
+        """Full-text search across customers, invoices, visits, works and payments
+
+        Every word of text is matched as a prefix against the search_index
+        (kept current by triggers). Hits are ranked with titles (names,
+        invoice numbers, work types, references) weighted above details.
+        """
+        words = re.findall(r"\w+", text.lower())
+        if not words:
+            return []
+
+        query = " ".join(f'"{word}"*' for word in words)
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                SELECT s.kind, s.ref_id, s.customer_id, s.title, s.details, c.name
+                FROM search_index s
+                LEFT JOIN customers c ON c.customer_id = s.customer_id
+                WHERE search_index MATCH ?
+                ORDER BY bm25(search_index, 0, 0, 0, 10.0, 1.0)
+                LIMIT ?
+                """, (query, limit))
+                return [{
+                    "kind": row[0],
+                    "id": row[1],
+                    "customer_id": row[2],
+                    "title": row[3] or "",
+                    "details": row[4] or "",
+                    "customer_name": row[5] or ""
+                } for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error searching: {e}")
+            return []
+
+    def get_attendance_matrix(self, start_date, end_date, worker_ids=None):
+        """Get attendance for workers over a date range as a dense worker x day grid
+
+        Returns {"dates": [...], "workers": [...], "cells": {worker_id: [entry or None per date]}}
+        where entry has morning, afternoon and notes.
+        """
+        try:
+            start_date = self._date_value(start_date)
+            end_date = self._date_value(end_date)
+            dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+            positions = {d.strftime("%Y-%m-%d"): i for i, d in enumerate(dates)}
+
+            query = """
+            SELECT w.worker_id, w.name, w.phone, w.photo_path, a.date, a.morning, a.afternoon, a.notes
+            FROM workers w
+            LEFT JOIN attendance a
+                ON a.worker_id = w.worker_id AND a.date >= ? AND a.date <= ?
+            """
+            params = [start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")]
+            if worker_ids is not None:
+                worker_ids = list(worker_ids)
+                if not worker_ids:
+                    return {"dates": dates, "workers": [], "cells": {}}
+                query += f" WHERE w.worker_id IN ({', '.join('?' * len(worker_ids))})"
+                params.extend(worker_ids)
+            query += " ORDER BY w.worker_id"
+
+            with self.get_cursor() as cursor:
+                cursor.execute(query, params)
+
+                workers = []
+                cells = {}
+                for row in cursor.fetchall():
+                    worker_id = row[0]
+                    if worker_id not in cells:
+                        workers.append({
+                            "worker_id": worker_id,
+                            "name": row[1],
+                            "phone": row[2],
+                            "photo_path": row[3]
+                        })
+                        cells[worker_id] = [None] * len(dates)
+                    if row[4] in positions:
+                        cells[worker_id][positions[row[4]]] = {
+                            "morning": bool(row[5]),
+                            "afternoon": bool(row[6]),
+                            "notes": row[7]
+                        }
+
+                return {"dates": dates, "workers": workers, "cells": cells}
+        except Exception as e:
+            print(f"Error getting attendance matrix: {e}")
+            return {"dates": [], "workers": [], "cells": {}}
+
+    def upsert_attendance_bulk(self, date, rows):
+        """Add or update attendance for many workers on one date in a single transaction
+
+        rows are dicts with worker_id, morning, afternoon and notes.
+        """
+        try:
+            date_str = self._date_param(date)
+            with self.get_cursor() as cursor:
+                cursor.executemany("""
+                INSERT INTO attendance (worker_id, date, morning, afternoon, notes)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(worker_id, date) DO UPDATE SET
+                    morning = excluded.morning,
+                    afternoon = excluded.afternoon,
+                    notes = excluded.notes
+                """, [(row["worker_id"], date_str, row["morning"], row["afternoon"], row["notes"])
+                      for row in rows])
+                return True
+        except Exception as e:
+            print(f"Error saving attendance: {e}")
+            return False
+
+    # Catalog lookups (served from the in-memory cache)
+
+    def invalidate_catalog(self, kind=None):
+        """Forget cached customers/products after a write outside these methods"""
+        self.catalog.invalidate(kind)
+
+    def get_customers(self):
+        """Get all customers"""
+        return self.catalog.all("customers")
+
+    def get_products(self):
+        """Get all products"""
+        return self.catalog.all("products")
+
+    def get_customer_by_id(self, customer_id):
+        """Get a customer by ID"""
+        return self.catalog.get("customers", "by_id", customer_id)
+
+    def get_product_by_id(self, product_id):
+        """Get a product by ID"""
+        return self.catalog.get("products", "by_id", product_id)
+
+    def find_customer_by_name(self, name):
+        """Get a customer by exact name"""
+        return self.catalog.get("customers", "by_name", name)
+
+    def search_customers(self, text, limit=20):
+        """Names of customers whose name, a word of their name or phone starts with text"""
+        text = text.strip()
+        if re.fullmatch(r"[\d\s+()-]+", text):
+            text = re.sub(r"\D", "", text)
+        return self.catalog.derived("customers", "prefix", build_customer_index).search(text, limit)
+
+    def find_product_by_name(self, name):
+        """Get a product by exact name"""
+        return self.catalog.get("products", "by_name", name)
+
+    def find_product_by_label(self, label):
+        """Get a product by its combobox label ("name (type)")"""
+        return self.catalog.get("products", "by_label", label)
+
+    # Catalog writes (invalidate the cache on the way out)
+
+    def add_customer(self, *args, **kwargs):
+        """Add a new customer"""
+        try:
+            return super().add_customer(*args, **kwargs)
+        finally:
+            self.catalog.invalidate("customers")
+
+    def update_customer(self, customer_id, name, place, phone, gst, address, email):
+        """Update a customer's details"""
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute("""
+                UPDATE customers SET name = ?, place = ?, phone = ?, gst = ?, address = ?, email = ?
+                WHERE customer_id = ?
+                """, (name, place, phone, gst, address, email, customer_id))
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error updating customer: {e}")
+            return False
+        finally:
+            self.catalog.invalidate("customers")
+
+    def delete_customer(self, customer_id):
+        """Delete a customer together with everything that references them
+
+        Rows are removed children first in one transaction, so the foreign
+        keys hold and a failure leaves the customer untouched.
+        """
+        customer_invoices = "SELECT invoice_id FROM invoices WHERE customer_id = ?"
+        customer_pending = "SELECT pending_invoice_id FROM pending_invoices WHERE customer_id = ?"
+        try:
+            with self.get_cursor() as cursor:
+                cursor.execute(f"DELETE FROM invoice_items WHERE invoice_id IN ({customer_invoices})", (customer_id,))
+                cursor.execute(f"DELETE FROM works WHERE invoice_id IN ({customer_invoices})", (customer_id,))
+                cursor.execute(f"DELETE FROM inventory WHERE invoice_id IN ({customer_invoices})", (customer_id,))
+                cursor.execute(f"""
+                DELETE FROM payments
+                WHERE customer_id = ? OR invoice_id IN ({customer_invoices})
+                """, (customer_id, customer_id))
+                cursor.execute("DELETE FROM invoices WHERE customer_id = ?", (customer_id,))
+                cursor.execute(f"DELETE FROM pending_invoice_items WHERE pending_invoice_id IN ({customer_pending})",
+                               (customer_id,))
+                cursor.execute("DELETE FROM pending_invoices WHERE customer_id = ?", (customer_id,))
+                cursor.execute("DELETE FROM customer_visits WHERE customer_id = ?", (customer_id,))
+                cursor.execute("DELETE FROM customers WHERE customer_id = ?", (customer_id,))
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error deleting customer: {e}")
+            return False
+        finally:
+            self.catalog.invalidate("customers")
+
+    def add_product(self, *args, **kwargs):
+        """Add a new product"""
+        try:
+            return super().add_product(*args, **kwargs)
+        finally:
+            self.catalog.invalidate("products")
+
+    def update_product(self, *args, **kwargs):
+        """Update a product"""
+        try:
+            return super().update_product(*args, **kwargs)
+        finally:
+            self.catalog.invalidate("products")
+
+    def delete_product(self, *args, **kwargs):
+        """Delete a product"""
+        try:
+            return super().delete_product(*args, **kwargs)
+        finally:
+            self.catalog.invalidate("products")
+
+    def restore_from_recycle_bin(self, *args, **kwargs):
+        """Restore an item from the recycle bin"""
+        try:
+            return super().restore_from_recycle_bin(*args, **kwargs)
+        finally:
+            # Restored invoices can re-create customers and products
+            self.catalog.invalidate()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ganesh Toughened Industry database maintenance")
+    parser.add_argument("command", choices=["verify-balances", "rebuild-balances"],
+                        help="verify or rebuild the customer balance ledger")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    try:
+        if args.command == "verify-balances":
+            mismatches = db.verify_customer_balances()
+            if mismatches is None:
+                sys.exit(2)
+            for m in mismatches:
+                print(f"{m['customer_id']} {m['name']}: ledger {m['ledger_invoices']:.2f}/{m['ledger_payments']:.2f}, "
+                      f"actual {m['actual_invoices']:.2f}/{m['actual_payments']:.2f}")
+            print(f"{len(mismatches)} customer balance(s) out of date")
+            sys.exit(1 if mismatches else 0)
+        else:
+            count = db.rebuild_customer_balances()
+            if count is None:
+                sys.exit(2)
+            print(f"Rebuilt balances for {count} customer(s)")
+    finally:
+        db.close()
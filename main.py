@@ -1,90 +1,65 @@
 # main.py
+import time
+
+# Reference point for --profile-startup (time to first window)
+STARTUP_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import sqlite3
 from datetime import datetime, date, timedelta
 import os
 import sys
-import shutil
-import zipfile
-from PIL import Image, ImageTk, ImageDraw
-import io
-import qrcode
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib.colors import HexColor
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-import subprocess
-import platform
-import time
-import calendar
-import threading
+import importlib
 import json
 
 # Import module files
-from database import Database
+from database_manager import DatabaseManager
+from utils.migrations import MigrationError
 from settings_manager import SettingsManager  # Import the new settings manager
+from utils.task_runner import TaskRunner
 
-# Try to import modules with error handling
-try:
-    from modules.billing import BillingModule
-    from modules.customer_history import CustomerHistoryModule
-    from modules.daily_ledger import DailyLedgerModule
-    from modules.attendance import AttendanceModule
-    from modules.payments import PaymentsModule
-    from modules.visits import VisitsModule
-    from modules.works import WorksModule
-    from modules.inventory import InventoryModule
-    
+# Sections are imported the first time they are opened, so startup does not pay
+# for every module (and the PDF/QR/imaging libraries they use).
+# Section -> (module path, class name, placeholder title)
+MODULE_SPECS = {
+    "billing": ("modules.billing", "BillingModule", "Billing Module"),
+    "history": ("modules.customer_history", "CustomerHistoryModule", "Customer History Module"),
+    "ledger": ("modules.daily_ledger", "DailyLedgerModule", "Daily Ledger Module"),
+    "attendance": ("modules.attendance", "AttendanceModule", "Attendance Module"),
+    "payments": ("modules.payments", "PaymentsModule", "Payments Module"),
+    "visits": ("modules.visits", "VisitsModule", "Visits Module"),
+    "works": ("modules.works", "WorksModule", "Works Module"),
+    "inventory": ("modules.inventory", "InventoryModule", "Inventory Module"),
+    "recycle_bin": ("modules.recycle_bin", "RecycleBinModule", "Recycle Bin Module")
+}
+
+# Global search: hit kind -> (label, section that shows it)
+SEARCH_RESULT_KINDS = {
+    "customer": ("Customer", "history"),
+    "invoice": ("Invoice", "history"),
+    "pending_invoice": ("Pending Invoice", "billing"),
+    "visit": ("Visit", "visits"),
+    "work": ("Work", "works"),
+    "payment": ("Payment", "payments")
+}
+
+# Delay after the last keystroke before the global search runs
+SEARCH_DEBOUNCE_MS = 250
+
+def import_module_class(module_name):
+    """Import a section's module class, or a placeholder if it cannot be imported"""
+    module_path, class_name, title = MODULE_SPECS[module_name]
     try:
-        from modules.recycle_bin import RecycleBinModule
-    except ImportError:
+        return getattr(importlib.import_module(module_path), class_name)
+    except ImportError as e:
+        print(f"Import error: {e}")
+        
         # Create placeholder module if it doesn't exist
-        class RecycleBinModule:
+        class PlaceholderModule:
             def __init__(self, parent, db, app):
-                ttk.Label(parent, text="Recycle Bin Module - Not Available").pack(pady=20)
-except ImportError as e:
-    print(f"Import error: {e}")
-    # Create placeholder modules if they don't exist
-    class BillingModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Billing Module - Not Available").pack(pady=20)
-    
-    class CustomerHistoryModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Customer History Module - Not Available").pack(pady=20)
-    
-    class DailyLedgerModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Daily Ledger Module - Not Available").pack(pady=20)
-    
-    class AttendanceModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Attendance Module - Not Available").pack(pady=20)
-    
-    class PaymentsModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Payments Module - Not Available").pack(pady=20)
-    
-    class VisitsModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Visits Module - Not Available").pack(pady=20)
-    
-    class WorksModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Works Module - Not Available").pack(pady=20)
-    
-    class InventoryModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Inventory Module - Not Available").pack(pady=20)
-    
-    # Create placeholder module if it doesn't exist
-    class RecycleBinModule:
-        def __init__(self, parent, db, app):
-            ttk.Label(parent, text="Recycle Bin Module - Not Available").pack(pady=20)
+                ttk.Label(parent, text=f"{title} - Not Available").pack(pady=20)
+        
+        return PlaceholderModule
 
 def enable_mousewheel_support(root):
     """Enable mouse wheel support for all scrollable widgets in the application"""
@@ -123,8 +98,8 @@ class GaneshToughenedIndustryApp:
         except:
             pass
         
-        # Initialize database
-        self.db = Database()
+        # Initialize database (pooled connections)
+        self.db = DatabaseManager()
         
         # Initialize settings manager
         self.settings_manager = SettingsManager()
@@ -137,6 +112,18 @@ class GaneshToughenedIndustryApp:
         self.backup_interval_var = tk.StringVar(value=str(self.settings_manager.get_backup_interval_hours()))
         self.backup_location_var = tk.StringVar(value=self.settings_manager.get_setting("backup_location", ""))
         
+        # Shared background executor for queries, PDFs and backups
+        self.tasks = TaskRunner(self.root, on_busy_change=self.update_busy_indicator)
+        
+        # Backup service (created for the configured backup location on first use)
+        self.backup_manager = None
+        self.next_backup_time = None
+        
+        # Module registry: each section is imported and built once, then hidden and shown
+        self.modules = {}
+        self.current_module_name = None
+        self.current_module = None
+        
         # Create main UI
         self.create_ui()
         
@@ -226,6 +213,7 @@ class GaneshToughenedIndustryApp:
         
         # Company logo
         try:
+            from PIL import Image, ImageTk
             logo_img = Image.open("assets/images/logo.png")
             logo_img = logo_img.resize((50, 50), Image.LANCZOS)
             self.logo_photo = ImageTk.PhotoImage(logo_img)
@@ -243,6 +231,118 @@ class GaneshToughenedIndustryApp:
         date_label = ttk.Label(header_frame, text=datetime.now().strftime("%d %B %Y"), 
                               style="Header.TLabel")
         date_label.pack(side=tk.RIGHT, padx=10)
+        
+        # Global search across customers, invoices, visits, works and payments
+        self.create_global_search(header_frame)
+    
+    def create_global_search(self, parent):
+        """Create the header search box and its results popup"""
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(side=tk.RIGHT, padx=10)
+        
+        ttk.Label(search_frame, text="🔍 Search:").pack(side=tk.LEFT)
+        self.global_search_var = tk.StringVar()
+        self.global_search_entry = ttk.Entry(search_frame, textvariable=self.global_search_var, width=30)
+        self.global_search_entry.pack(side=tk.LEFT, padx=5)
+        
+        self.global_search_entry.bind("<KeyRelease>", self.on_global_search_key)
+        self.global_search_entry.bind("<Return>", lambda e: self.open_global_search_result())
+        self.global_search_entry.bind("<Down>", lambda e: self.focus_global_search_results())
+        self.global_search_entry.bind("<Escape>", lambda e: self.hide_global_search_results())
+        
+        self.global_search_timer = None
+        self.global_search_hits = {}
+        
+        # Results popup, shown under the search box while there are hits
+        self.global_search_popup = tk.Toplevel(self.root)
+        self.global_search_popup.withdraw()
+        self.global_search_popup.overrideredirect(True)
+        
+        columns = ("type", "match", "details", "customer")
+        self.global_search_tree = ttk.Treeview(self.global_search_popup, columns=columns, show="headings", height=10)
+        for column, heading, width in (("type", "Type", 110), ("match", "Match", 140),
+                                       ("details", "Details", 260), ("customer", "Customer", 160)):
+            self.global_search_tree.heading(column, text=heading)
+            self.global_search_tree.column(column, width=width)
+        self.global_search_tree.pack(fill=tk.BOTH, expand=True)
+        
+        self.global_search_tree.bind("<Double-1>", lambda e: self.open_global_search_result())
+        self.global_search_tree.bind("<Return>", lambda e: self.open_global_search_result())
+        self.global_search_tree.bind("<Escape>", lambda e: self.hide_global_search_results())
+    
+    def on_global_search_key(self, event):
+        """Run the global search once typing pauses"""
+        if event.keysym in ("Return", "Down", "Escape", "Up"):
+            return
+        if self.global_search_timer:
+            self.root.after_cancel(self.global_search_timer)
+        self.global_search_timer = self.root.after(SEARCH_DEBOUNCE_MS, self.run_global_search)
+    
+    def run_global_search(self):
+        """Query the search index in the background"""
+        self.global_search_timer = None
+        text = self.global_search_var.get().strip()
+        if not text:
+            self.tasks.cancel("global_search")
+            self.hide_global_search_results()
+            return
+        
+        self.tasks.submit(self.db.search_all, text, on_done=self.show_global_search_results,
+                          description="Searching", key="global_search")
+    
+    def show_global_search_results(self, hits):
+        """Fill the results popup with ranked hits"""
+        tree = self.global_search_tree
+        tree.delete(*tree.get_children())
+        self.global_search_hits = {}
+        
+        if not hits:
+            tree.insert("", tk.END, values=("", "No matches", "", ""))
+        for hit in hits:
+            label = SEARCH_RESULT_KINDS.get(hit["kind"], (hit["kind"], None))[0]
+            item = tree.insert("", tk.END, values=(label, hit["title"], hit["details"], hit["customer_name"]))
+            self.global_search_hits[item] = hit
+        
+        # Place the popup under the search box
+        entry = self.global_search_entry
+        width = 670
+        x = entry.winfo_rootx() + entry.winfo_width() - width
+        y = entry.winfo_rooty() + entry.winfo_height() + 2
+        self.global_search_popup.geometry(f"{width}x240+{max(x, 0)}+{y}")
+        self.global_search_popup.deiconify()
+        self.global_search_popup.lift()
+    
+    def hide_global_search_results(self):
+        """Hide the results popup"""
+        self.global_search_popup.withdraw()
+    
+    def focus_global_search_results(self):
+        """Move keyboard focus from the search box to the first hit"""
+        children = self.global_search_tree.get_children()
+        if children and self.global_search_popup.winfo_viewable():
+            self.global_search_tree.focus_set()
+            self.global_search_tree.selection_set(children[0])
+            self.global_search_tree.focus(children[0])
+    
+    def open_global_search_result(self):
+        """Open the section for the selected hit (or the best hit)"""
+        tree = self.global_search_tree
+        selection = tree.selection()
+        item = selection[0] if selection else next(iter(self.global_search_hits), None)
+        hit = self.global_search_hits.get(item)
+        if not hit:
+            return
+        
+        self.hide_global_search_results()
+        module_name = SEARCH_RESULT_KINDS.get(hit["kind"], (None, None))[1]
+        if not module_name:
+            return
+        
+        self.load_module(module_name)
+        
+        # Sections that can focus on a customer do so
+        if hit["customer_name"] and hasattr(self.current_module, "show_customer"):
+            self.current_module.show_customer(hit["customer_name"])
     
     def create_sidebar(self, parent):
         """Create navigation sidebar"""
@@ -292,41 +392,68 @@ class GaneshToughenedIndustryApp:
         # User info
         user_label = ttk.Label(status_frame, text="User: Manager")
         user_label.pack(side=tk.RIGHT, padx=5)
+        
+        # Busy indicator for background work (shown only while tasks are running)
+        self.busy_frame = ttk.Frame(status_frame)
+        self.busy_label = ttk.Label(self.busy_frame, text="")
+        self.busy_label.pack(side=tk.LEFT, padx=5)
+        self.busy_progress = ttk.Progressbar(self.busy_frame, mode="indeterminate", length=100)
+        self.busy_progress.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.busy_frame, text="Cancel", command=self.tasks.cancel).pack(side=tk.LEFT, padx=5)
+    
+    def update_busy_indicator(self, descriptions):
+        """Show or hide the status bar busy indicator for background tasks"""
+        if not hasattr(self, 'busy_frame'):
+            return
+        
+        if descriptions:
+            text = descriptions[0] if len(descriptions) == 1 else f"{descriptions[0]} (+{len(descriptions) - 1} more)"
+            self.busy_label.config(text=f"{text}...")
+            if not self.busy_frame.winfo_ismapped():
+                self.busy_frame.pack(side=tk.RIGHT, padx=10)
+                self.busy_progress.start(15)
+        elif self.busy_frame.winfo_ismapped():
+            self.busy_progress.stop()
+            self.busy_frame.pack_forget()
     
     def load_module(self, module_name):
-        """Load the specified module"""
-        # Clear current content
-        for widget in self.main_content.winfo_children():
-            widget.destroy()
-        
-        # Load module based on name
-        if module_name == "billing":
-            self.current_module = BillingModule(self.main_content, self.db, self)
-        elif module_name == "history":
-            self.current_module = CustomerHistoryModule(self.main_content, self.db, self)
-        elif module_name == "ledger":
-            self.current_module = DailyLedgerModule(self.main_content, self.db, self)
-        elif module_name == "attendance":
-            self.current_module = AttendanceModule(self.main_content, self.db, self)
-        elif module_name == "payments":
-            self.current_module = PaymentsModule(self.main_content, self.db, self)
-        elif module_name == "visits":
-            self.current_module = VisitsModule(self.main_content, self.db, self)
-        elif module_name == "works":
-            self.current_module = WorksModule(self.main_content, self.db, self)
-        elif module_name == "inventory":
-            self.current_module = InventoryModule(self.main_content, self.db, self)
-        elif module_name == "recycle_bin":
-            self.current_module = RecycleBinModule(self.main_content, self.db, self)
-        elif module_name == "settings":
-            self.load_settings_module()
-        
-        # Enable mouse wheel support for the newly loaded module
-        enable_mousewheel_support(self.main_content)
-    
-    def load_settings_module(self):
+        """Show the specified module, building it the first time it is opened"""
+        if module_name in self.modules:
+            frame, module = self.modules[module_name]
+            if module_name != self.current_module_name:
+                self.hide_current_module()
+                frame.pack(fill=tk.BOTH, expand=True)
+            
+            # Let the module cheaply refresh data that may have changed elsewhere
+            if hasattr(module, "on_activate"):
+                module.on_activate()
+        else:
+            self.hide_current_module()
+            frame = ttk.Frame(self.main_content)
+            frame.pack(fill=tk.BOTH, expand=True)
+            
+            if module_name == "settings":
+                self.load_settings_module(frame)
+                module = None
+            else:
+                module = import_module_class(module_name)(frame, self.db, self)
+            
+            self.modules[module_name] = (frame, module)
+            
+            # Enable mouse wheel support for the newly built module
+            enable_mousewheel_support(frame)
+        
+        self.current_module_name = module_name
+        self.current_module = module
+    
+    def hide_current_module(self):
+        """Hide the visible module, keeping its widgets and state"""
+        if self.current_module_name in self.modules:
+            self.modules[self.current_module_name][0].pack_forget()
+    
+    def load_settings_module(self, parent):
         """Load settings module"""
-        settings_frame = ttk.Frame(self.main_content)
+        settings_frame = ttk.Frame(parent)
         settings_frame.pack(fill=tk.BOTH, expand=True)
         
         # Title
@@ -513,27 +640,46 @@ class GaneshToughenedIndustryApp:
     
     def check_backup(self):
         """Check if backup is needed"""
-        # Get the last backup date from the settings
-        last_backup_date = None
-        
+        def on_done(last_backup_date):
+            # Update the backup status
+            if last_backup_date:
+                self.update_status("backup", last_backup_date.strftime("%d/%m/%Y %H:%M"))
+            else:
+                self.update_status("backup", "Never")
+        
+        # The last backup time comes from the backup store's index
         try:
-            last_backup_str = self.settings_manager.get_setting("last_backup")
-            if last_backup_str:
-                last_backup_date = datetime.strptime(last_backup_str, "%Y-%m-%d %H:%M:%S")
+            self.tasks.submit(self.get_backup_manager().get_last_backup, on_done=on_done,
+                              description="Checking backups", key="backup_check")
         except Exception as e:
             print(f"Error loading backup date: {e}")
-        
-        # Update the backup status
-        if last_backup_date:
-            self.update_status("backup", last_backup_date.strftime("%d/%m/%Y %H:%M"))
-        else:
-            self.update_status("backup", "Never")
+    
+    def get_backup_manager(self):
+        """Get the backup service for the current backup location"""
+        from utils.backup import DEFAULT_BACKUP_PATHS, backup_manager_from_config
+        
+        # Get backup location
+        backup_location = self.backup_location_var.get()
+        
+        if not backup_location:
+            # Use default backup location
+            backup_location = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backups")
+        
+        if self.backup_manager is None or self.backup_manager.backup_dir != backup_location:
+            settings_path = self.settings_manager.settings_file
+            self.backup_manager = backup_manager_from_config(
+                self.db.config, self.db.db_name, backup_location,
+                DEFAULT_BACKUP_PATHS + [(settings_path, os.path.basename(settings_path))]
+            )
+        return self.backup_manager
     
     def schedule_backup(self):
         """Schedule automatic backup"""
         # Cancel any existing backup timer
         if hasattr(self, 'backup_timer') and self.backup_timer:
-            self.backup_timer.cancel()
+            self.root.after_cancel(self.backup_timer)
+            self.backup_timer = None
+        self.next_backup_time = None
         
         # Check if auto backup is enabled
         if self.auto_backup_var.get():
@@ -541,81 +687,117 @@ class GaneshToughenedIndustryApp:
                 # Get backup interval in hours using the settings manager
                 interval_hours = self.settings_manager.get_backup_interval_hours()
                 
-                # Schedule backup
-                self.backup_timer = threading.Timer(interval_hours * 3600, self.auto_backup)
-                self.backup_timer.daemon = True
-                self.backup_timer.start()
+                # Schedule backup on the Tk event loop; the backup itself runs in the background
+                self.backup_timer = self.root.after(int(interval_hours * 3600 * 1000), self.auto_backup)
+                self.next_backup_time = datetime.now() + timedelta(hours=interval_hours)
                 
                 print(f"Next backup scheduled in {interval_hours} hours")
             except Exception as e:
                 print(f"Error scheduling backup: {e}")
+        
+        self.refresh_backup_status()
     
     def auto_backup(self):
         """Perform automatic backup"""
+        # Re-arm the timer first: a cancelled backup task never reports back
+        self.backup_timer = None
+        self.schedule_backup()
+        
         try:
-            # Create the backup
-            success = self.create_backup()
-            
-            if success:
-                # Save the backup date to settings
-                self.settings_manager.update_setting("last_backup", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-                
-                # Schedule next backup
-                self.schedule_backup()
+            self.create_backup(manual=False)
         except Exception as e:
             print(f"Error in auto backup: {e}")
     
-    def create_backup(self):
-        """Create database backup"""
-        try:
-            # Get backup location
-            backup_location = self.backup_location_var.get()
-            
-            if not backup_location:
-                # Use default backup location
-                backup_location = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backups")
-            
-            # Create backup directory if it doesn't exist
-            if not os.path.exists(backup_location):
-                os.makedirs(backup_location)
-            
-            # Create backup filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"ganesh_toughened_industry_backup_{timestamp}.zip"
-            backup_path = os.path.join(backup_location, backup_filename)
-            
-            # Create a zip file
-            with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Add database file
-                db_path = self.db.db_name
-                if os.path.exists(db_path):
-                    zipf.write(db_path, os.path.basename(db_path))
-                
-                # Add settings file if it exists
-                settings_path = self.settings_manager.settings_file
-                if os.path.exists(settings_path):
-                    zipf.write(settings_path, os.path.basename(settings_path))
-                
-                # Add assets directory if it exists
-                assets_path = "assets"
-                if os.path.exists(assets_path):
-                    for root, dirs, files in os.walk(assets_path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            arcname = os.path.relpath(file_path, os.path.dirname(assets_path))
-                            zipf.write(file_path, arcname)
-            
+    def create_backup(self, manual=True):
+        """Create an incremental backup in the background"""
+        manager = self.get_backup_manager()
+        
+        def run_backup(task):
+            return manager.create_backup(progress=self.backup_progress(task, "Creating backup"))
+        
+        def on_done(manifest):
             # Update backup status
             self.update_status("backup", datetime.now().strftime("%d/%m/%Y %H:%M"))
+            self.refresh_backup_status()
             
             # Show notification if this is a manual backup
-            if not threading.current_thread().daemon:
-                messagebox.showinfo("Backup Complete", f"Backup created successfully at:\n{backup_path}")
+            if manual:
+                messagebox.showinfo("Backup Complete",
+                                    f"Backup {manifest['id']} created successfully in:\n{manager.backup_dir}\n\n"
+                                    f"New data stored: {manifest['new_bytes'] / 1024:.1f} KB")
             
-            return True
-        except Exception as e:
-            messagebox.showerror("Backup Error", f"Failed to create backup: {e}")
-            return False
+            # Apply the retention policy now that a new snapshot exists
+            self.prune_backups()
+        
+        def on_error(e):
+            if manual:
+                messagebox.showerror("Backup Error", f"Failed to create backup: {e}")
+            else:
+                print(f"Error in auto backup: {e}")
+        
+        return self.tasks.submit(run_backup, on_done=on_done, on_error=on_error,
+                                 description="Creating backup", key="backup", pass_task=True)
+    
+    def backup_progress(self, task, description):
+        """Progress callback that shows a backup's percentage in the busy indicator
+        
+        Runs on the backup thread; cancelling the task stops the backup.
+        """
+        from utils.backup import BackupCancelled
+        
+        last_percent = [-1]
+        
+        def progress(done, total):
+            if task.is_cancelled():
+                raise BackupCancelled()
+            percent = int(done * 100 / total) if total else 100
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                self.tasks.set_progress(task, f"{description} ({percent}%)")
+        
+        return progress
+    
+    def prune_backups(self):
+        """Remove snapshots outside the retention policy in the background"""
+        def on_done(summary):
+            if summary["removed"] or summary["archives_removed"]:
+                print(f"Pruned {len(summary['removed'])} backup snapshot(s) and "
+                      f"{summary['archives_removed']} old archive(s), freed {summary['bytes_freed'] / 1024:.1f} KB")
+            self.refresh_backup_status()
+        
+        def on_error(e):
+            print(f"Error pruning backups: {e}")
+        
+        return self.tasks.submit(self.get_backup_manager().prune, on_done=on_done, on_error=on_error,
+                                 description="Pruning old backups", key="backup_prune")
+    
+    def verify_backups(self):
+        """Verify every backup snapshot in the background and report the result"""
+        def on_done(results):
+            failed = [result for result in results if not result["ok"]]
+            if not results:
+                messagebox.showinfo("Verify Backups", "There are no backups to verify.")
+            elif failed:
+                details = "\n".join(f"{result['id']}: {'; '.join(result['problems'])}" for result in failed[:5])
+                messagebox.showerror("Verify Backups",
+                                     f"{len(failed)} of {len(results)} backup(s) failed verification:\n\n{details}")
+            else:
+                messagebox.showinfo("Verify Backups", f"All {len(results)} backup(s) verified successfully.")
+        
+        def on_error(e):
+            messagebox.showerror("Verify Backups", f"Failed to verify backups: {e}")
+        
+        return self.tasks.submit(self.get_backup_manager().verify_backups, on_done=on_done, on_error=on_error,
+                                 description="Verifying backups", key="backup_verify")
+    
+    def refresh_backup_status(self):
+        """Refresh the backup status on the backup settings tab, if it has been opened"""
+        if "recycle_bin" in self.modules:
+            module = self.modules["recycle_bin"][1]
+            try:
+                module.update_backup_status()
+            except Exception as e:
+                print(f"Error refreshing backup status: {e}")
     
     def show_notification(self, title, message):
         """Show notification to user"""
@@ -630,13 +812,44 @@ class GaneshToughenedIndustryApp:
             self.last_backup_time = message
 
 def main():
+    if "--profile-startup" in sys.argv:
+        # Re-run startup under -X importtime and print a per-subsystem breakdown
+        from utils.startup_profile import profile_startup
+        profile_startup(os.path.abspath(__file__))
+        return
+    
     root = tk.Tk()
-    app = GaneshToughenedIndustryApp(root)
+    try:
+        app = GaneshToughenedIndustryApp(root)
+    except MigrationError as e:
+        # Do not run on a half-migrated schema
+        root.withdraw()
+        messagebox.showerror("Database Error",
+                             f"The database could not be upgraded, so the application cannot start.\n\n{e}\n\n"
+                             f"Restore a backup or contact support.")
+        root.destroy()
+        return
     
     # Enable mouse wheel support for the entire application
     enable_mousewheel_support(root)
     
+    if "--startup-probe" in sys.argv:
+        # Used by --profile-startup: draw the first window, report the time and exit
+        root.update()
+        print(f"Time to first window: {(time.perf_counter() - STARTUP_TIME) * 1000:.0f} ms")
+        root.destroy()
+        app.tasks.shutdown()
+        app.db.close()
+        return
+    
     root.mainloop()
+    
+    # Stop background work, then close pooled database connections
+    app.tasks.shutdown()
+    app.db.close()
 
 if __name__ == "__main__":
+    # Lets the bulk PDF export's process pool start in packaged (frozen) builds
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
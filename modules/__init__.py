@@ -15,15 +15,18 @@ This package contains all the functional modules for the application:
 __version__ = "1.0.0"
 __author__ = "Ganesh Toughened Industry"
 
-# Import all modules for easy access
-from . import billing
-from . import customer_history
-from . import daily_ledger
-from . import attendance
-from . import payments
-from . import visits
-from . import works
-from . import inventory
+import importlib
+
+# Modules are imported on first access (modules.billing etc.) so that
+# startup only pays for the sections that are actually opened
+MODULE_NAMES = ["billing", "customer_history", "daily_ledger", "attendance",
+                "payments", "visits", "works", "inventory", "recycle_bin"]
+
+def __getattr__(name):
+    """Import a section module the first time it is accessed"""
+    if name not in MODULE_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(f".{name}", __name__)
 
 # Module information dictionary
 MODULE_INFO = {
@@ -3,7 +3,6 @@ from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, date, timedelta
 import calendar
 import os
-from PIL import Image, ImageTk, ImageDraw
 
 class AttendanceModule:
     def __init__(self, parent, db, app):
@@ -16,6 +15,10 @@ class AttendanceModule:
         # Create UI
         self.create_ui()
     
+    def on_activate(self):
+        """Refresh the worker lists when the section is shown again"""
+        self.load_workers()
+    
     def create_ui(self):
         """Create the worker attendance UI"""
         # Main container
@@ -250,19 +253,34 @@ class AttendanceModule:
         month_combo = ttk.Combobox(month_frame, textvariable=self.month_var, values=months, state="readonly")
         month_combo.pack(side=tk.LEFT, padx=5)
         
+        # Redrawing the canvas is cheap, so month changes apply immediately
+        year_combo.bind("<<ComboboxSelected>>", lambda e: self.load_calendar_view())
+        month_combo.bind("<<ComboboxSelected>>", lambda e: self.load_calendar_view())
+        
         # Worker selection
         ttk.Label(month_frame, text="Worker:").pack(side=tk.LEFT, padx=5)
         self.worker_var = tk.StringVar()
         self.worker_combo = ttk.Combobox(month_frame, textvariable=self.worker_var)
         self.worker_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
+        # Heat map of every worker's attendance
+        self.heatmap_var = tk.BooleanVar(value=False)
+        heatmap_check = ttk.Checkbutton(month_frame, text="All Workers (Heat Map)", variable=self.heatmap_var,
+                                        command=self.load_calendar_view)
+        heatmap_check.pack(side=tk.LEFT, padx=5)
+        
         # Load button
         load_btn = ttk.Button(month_frame, text="Load", command=self.load_calendar_view)
         load_btn.pack(side=tk.LEFT, padx=5)
         
-        # Calendar display
-        self.calendar_frame = ttk.Frame(main_frame)
-        self.calendar_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        # Calendar display, drawn on a single canvas
+        self.calendar_canvas = tk.Canvas(main_frame, background="white", highlightthickness=0)
+        self.calendar_canvas.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.create_calendar_cells()
+        self.layout_calendar()
+        self.calendar_canvas.bind("<Configure>", self.layout_calendar)
+        self.calendar_canvas.bind("<Motion>", self.on_calendar_motion)
+        self.calendar_canvas.bind("<Leave>", lambda e: self.hide_calendar_tooltip())
         
         # Load workers for the dropdown BEFORE loading the calendar view
         self.load_workers()
@@ -290,13 +308,11 @@ class AttendanceModule:
             messagebox.showerror("Error", "Please enter a valid date in DD/MM/YYYY format")
             return
         
-        # Get workers
-        workers = self.db.get_workers()
+        # Get every worker's attendance for the day in one query
+        matrix = self.db.get_attendance_matrix(self.selected_date, self.selected_date)
         
-        # Get attendance for each worker
-        for worker in workers:
-            # Get attendance
-            attendance = self.db.get_attendance(worker["worker_id"], self.selected_date)
+        for worker in matrix["workers"]:
+            attendance = matrix["cells"][worker["worker_id"]][0]
             
             if attendance:
                 morning = "✓" if attendance["morning"] else "✗"
@@ -379,79 +395,88 @@ class AttendanceModule:
             messagebox.showinfo("Info", "No workers to save")
             return
         
-        # Save attendance for each worker
+        rows = []
         for item in items:
             # Get worker ID and values
             worker_id = self.attendance_tree.item(item)["tags"][0]
             values = self.attendance_tree.item(item)["values"]
             
-            # Parse attendance
-            morning = values[1] == "✓"
-            afternoon = values[2] == "✓"
-            notes = values[3]
-            
-            # If notes is empty, prompt for notes
-            if not notes:
-                # Get worker name
-                worker_name = values[0]
-                
-                # Create a dialog to add notes
-                notes_dialog = tk.Toplevel(self.parent)
-                notes_dialog.title(f"Add Notes for {worker_name}")
-                notes_dialog.geometry("400x200")
-                notes_dialog.transient(self.parent)
-                notes_dialog.grab_set()
-                
-                ttk.Label(notes_dialog, text="Enter notes for this worker:").pack(pady=10)
-                
-                notes_entry = ttk.Entry(notes_dialog, width=40)
-                notes_entry.pack(pady=10)
-                notes_entry.focus()
-                
-                def save_notes():
-                    notes = notes_entry.get()
-                    notes_dialog.destroy()
-                    
-                    # Save to database with notes
-                    self.db.add_attendance(
-                        worker_id=worker_id,
-                        date=self.selected_date,
-                        morning=morning,
-                        afternoon=afternoon,
-                        notes=notes
-                    )
-                
-                def skip_notes():
-                    notes_dialog.destroy()
-                    
-                    # Save to database without notes
-                    self.db.add_attendance(
-                        worker_id=worker_id,
-                        date=self.selected_date,
-                        morning=morning,
-                        afternoon=afternoon,
-                        notes=""
-                    )
-                
-                button_frame = ttk.Frame(notes_dialog)
-                button_frame.pack(pady=10)
-                
-                ttk.Button(button_frame, text="Save Notes", command=save_notes).pack(side=tk.LEFT, padx=5)
-                ttk.Button(button_frame, text="Skip", command=skip_notes).pack(side=tk.LEFT, padx=5)
-                
-                # Wait for dialog to close
-                notes_dialog.wait_window()
-            else:
-                # Save to database
-                self.db.add_attendance(
-                    worker_id=worker_id,
-                    date=self.selected_date,
-                    morning=morning,
-                    afternoon=afternoon,
-                    notes=notes
-                )
-        
-        messagebox.showinfo("Success", "Attendance saved successfully")
+            rows.append({
+                "worker_id": worker_id,
+                "worker_name": values[0],
+                "morning": values[1] == "✓",
+                "afternoon": values[2] == "✓",
+                "notes": values[3]
+            })
+        
+        # Ask for any missing notes in one dialog before writing anything
+        missing = [row for row in rows if not row["notes"]]
+        if missing:
+            notes = self.collect_missing_notes(missing)
+            if notes is None:
+                return
+            for row in missing:
+                row["notes"] = notes.get(row["worker_id"], "")
+        
+        # Save every worker in a single transaction
+        if self.db.upsert_attendance_bulk(self.selected_date, rows):
+            messagebox.showinfo("Success", "Attendance saved successfully")
+        else:
+            messagebox.showerror("Error", "Could not save attendance")
+    
+    def collect_missing_notes(self, rows):
+        """Ask for notes for several workers in one dialog; returns {worker_id: notes} or None if cancelled"""
+        notes_dialog = tk.Toplevel(self.parent)
+        notes_dialog.title("Add Notes")
+        notes_dialog.geometry("450x400")
+        notes_dialog.transient(self.parent)
+        notes_dialog.grab_set()
+        
+        ttk.Label(notes_dialog, text="Enter notes for these workers (leave blank for none):").pack(pady=10)
+        
+        # Scrollable list of workers
+        list_frame = ttk.Frame(notes_dialog)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        canvas = tk.Canvas(list_frame, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=canvas.yview)
+        entries_frame = ttk.Frame(canvas)
+        entries_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.create_window((0, 0), window=entries_frame, anchor=tk.NW)
+        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        entries = {}
+        for i, row in enumerate(rows):
+            ttk.Label(entries_frame, text=row["worker_name"]).grid(row=i, column=0, padx=5, pady=2, sticky=tk.W)
+            entry = ttk.Entry(entries_frame, width=35)
+            entry.grid(row=i, column=1, padx=5, pady=2, sticky=tk.EW)
+            entries[row["worker_id"]] = entry
+        
+        if entries:
+            entries[rows[0]["worker_id"]].focus()
+        
+        result = {}
+        
+        def save_notes():
+            result["notes"] = {worker_id: entry.get() for worker_id, entry in entries.items()}
+            notes_dialog.destroy()
+        
+        def skip_notes():
+            result["notes"] = {}
+            notes_dialog.destroy()
+        
+        button_frame = ttk.Frame(notes_dialog)
+        button_frame.pack(pady=10)
+        
+        ttk.Button(button_frame, text="Save Notes", command=save_notes).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Skip", command=skip_notes).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=notes_dialog.destroy).pack(side=tk.LEFT, padx=5)
+        
+        # Wait for dialog to close
+        notes_dialog.wait_window()
+        return result.get("notes")
     
     def load_workers(self):
         """Load workers into treeview"""
@@ -530,6 +555,7 @@ class AttendanceModule:
         # Display photo if available
         if worker["photo_path"] and os.path.exists(worker["photo_path"]):
             try:
+                from PIL import Image, ImageTk
                 photo_img = Image.open(worker["photo_path"])
                 photo_img = photo_img.resize((150, 150), Image.LANCZOS)
                 photo_photo = ImageTk.PhotoImage(photo_img)
@@ -635,6 +661,7 @@ class AttendanceModule:
                 
                 # Display photo
                 try:
+                    from PIL import Image, ImageTk
                     photo_img = Image.open(file_path)
                     photo_img = photo_img.resize((150, 150), Image.LANCZOS)
                     photo_photo = ImageTk.PhotoImage(photo_img)
@@ -726,6 +753,7 @@ class AttendanceModule:
         # Display current photo if available
         if worker["photo_path"] and os.path.exists(worker["photo_path"]):
             try:
+                from PIL import Image, ImageTk
                 photo_img = Image.open(worker["photo_path"])
                 photo_img = photo_img.resize((150, 150), Image.LANCZOS)
                 photo_photo = ImageTk.PhotoImage(photo_img)
@@ -752,6 +780,7 @@ class AttendanceModule:
                 
                 # Display photo
                 try:
+                    from PIL import Image, ImageTk
                     photo_img = Image.open(file_path)
                     photo_img = photo_img.resize((150, 150), Image.LANCZOS)
                     photo_photo = ImageTk.PhotoImage(photo_img)
@@ -838,110 +867,177 @@ class AttendanceModule:
             else:
                 messagebox.showerror("Error", "Could not delete worker")
     
+    def create_calendar_cells(self):
+        """Create the canvas items for the day-name header and the 6x7 day grid"""
+        canvas = self.calendar_canvas
+        
+        self.calendar_headers = []
+        for day in ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]:
+            rect = canvas.create_rectangle(0, 0, 0, 0, outline="gray", fill="#f0f0f0")
+            text = canvas.create_text(0, 0, text=day)
+            self.calendar_headers.append((rect, text))
+        
+        # Cells are created once and reconfigured; a month change only touches cells that differ
+        self.calendar_cells = []
+        for i in range(42):
+            self.calendar_cells.append({
+                "rect": canvas.create_rectangle(0, 0, 0, 0, outline="gray", fill="white"),
+                "day": canvas.create_text(0, 0, anchor=tk.N),
+                "morning": canvas.create_text(0, 0),
+                "afternoon": canvas.create_text(0, 0),
+                "notes": canvas.create_text(0, 0, font=("TkDefaultFont", 8)),
+                "state": None,
+                "tooltip": ""
+            })
+        
+        self.calendar_tooltip = None
+        self.calendar_tooltip_index = None
+    
+    def layout_calendar(self, event=None):
+        """Position the calendar items for the current canvas size"""
+        canvas = self.calendar_canvas
+        width = max(canvas.winfo_width(), 70)
+        height = max(canvas.winfo_height(), 150)
+        header_height = 24
+        cell_width = width / 7
+        cell_height = (height - header_height) / 6
+        
+        for col, (rect, text) in enumerate(self.calendar_headers):
+            x = col * cell_width
+            canvas.coords(rect, x + 1, 1, x + cell_width - 1, header_height - 1)
+            canvas.coords(text, x + cell_width / 2, header_height / 2)
+        
+        for index, cell in enumerate(self.calendar_cells):
+            row, col = divmod(index, 7)
+            x = col * cell_width
+            y = header_height + row * cell_height
+            center = x + cell_width / 2
+            canvas.coords(cell["rect"], x + 1, y + 1, x + cell_width - 1, y + cell_height - 1)
+            canvas.coords(cell["day"], center, y + 4)
+            canvas.coords(cell["morning"], center - cell_width / 5, y + cell_height / 2 + 4)
+            canvas.coords(cell["afternoon"], center + cell_width / 5, y + cell_height / 2 + 4)
+            canvas.coords(cell["notes"], center, y + cell_height - 10)
+        
+        self.calendar_layout = (header_height, cell_width, cell_height)
+    
+    @staticmethod
+    def heat_color(fraction):
+        """Shade from white (nobody present) to green (everybody present)"""
+        fraction = min(max(fraction, 0.0), 1.0)
+        red = int(255 + (56 - 255) * fraction)
+        green = int(255 + (142 - 255) * fraction)
+        blue = int(255 + (60 - 255) * fraction)
+        return f"#{red:02x}{green:02x}{blue:02x}"
+    
     def load_calendar_view(self):
         """Load calendar view for selected month and worker"""
-        # Clear existing calendar
-        for widget in self.calendar_frame.winfo_children():
-            widget.destroy()
-        
         # Get month and year
         month_name = self.month_var.get()
         year = int(self.year_var.get())
         
         # Convert month name to number
         month_num = list(calendar.month_name).index(month_name)
+        days_in_month = calendar.monthrange(year, month_num)[1]
+        heatmap = self.heatmap_var.get()
         
         # Get worker
         worker_name = self.worker_var.get()
         worker_id = None
         
-        if worker_name:
+        if worker_name and not heatmap:
             workers = self.db.get_workers()
             for worker in workers:
                 if worker["name"] == worker_name:
                     worker_id = worker["worker_id"]
                     break
         
-        # Create calendar
-        cal = calendar.monthcalendar(year, month_num)
-        
-        # Create header with day names
-        header_frame = ttk.Frame(self.calendar_frame)
-        header_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        # Day names
-        day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        for i, day in enumerate(day_names):
-            day_label = ttk.Label(header_frame, text=day, width=10, relief=tk.RIDGE, borderwidth=1)
-            day_label.grid(row=0, column=i, padx=2, pady=2)
-        
-        # Create a separate frame for the calendar grid
-        calendar_grid = ttk.Frame(self.calendar_frame)
-        calendar_grid.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        # Create calendar grid using grid geometry manager
-        for week_idx, week in enumerate(cal):
-            for day_idx, day in enumerate(week):
-                if day == 0:  # Day not in month
-                    day_label = ttk.Label(calendar_grid, text="", width=10, relief=tk.RIDGE, borderwidth=1)
-                    day_label.grid(row=week_idx, column=day_idx, padx=2, pady=2, sticky="nsew")
-                else:
-                    # Create day frame
-                    day_frame = ttk.Frame(calendar_grid, relief=tk.RIDGE, borderwidth=1)
-                    day_frame.grid(row=week_idx, column=day_idx, padx=2, pady=2, sticky="nsew")
-                    
-                    # Day number
-                    day_label = ttk.Label(day_frame, text=str(day))
-                    day_label.pack()
-                    
-                    # Get attendance for this day
-                    if worker_id:
-                        date_obj = date(year, month_num, day)
-                        attendance = self.db.get_attendance(worker_id, date_obj)
-                        
-                        if attendance:
-                            # Create attendance indicators
-                            att_frame = ttk.Frame(day_frame)
-                            att_frame.pack()
-                            
-                            # Morning attendance
-                            if attendance["morning"]:
-                                morning_label = ttk.Label(att_frame, text="M: ✓", foreground="green")
-                            else:
-                                morning_label = ttk.Label(att_frame, text="M: ✗", foreground="red")
-                            morning_label.pack(side=tk.LEFT)
-                            
-                            # Afternoon attendance
-                            if attendance["afternoon"]:
-                                afternoon_label = ttk.Label(att_frame, text="A: ✓", foreground="green")
-                            else:
-                                afternoon_label = ttk.Label(att_frame, text="A: ✗", foreground="red")
-                            afternoon_label.pack(side=tk.LEFT)
-                            
-                            # Notes if available
-                            if attendance["notes"]:
-                                notes_label = ttk.Label(day_frame, text="📝", font=("TkDefaultFont", 8))
-                                notes_label.pack()
-                                
-                                # Add tooltip for notes
-                                def show_notes(event, notes=attendance["notes"]):
-                                    tooltip = tk.Toplevel()
-                                    tooltip.wm_overrideredirect(True)
-                                    tooltip.wm_geometry(f"+{event.x_root+10}+{event.y_root+10}")
-                                    label = ttk.Label(tooltip, text=notes, background="lightyellow", relief=tk.SOLID, borderwidth=1)
-                                    label.pack()
-                                    
-                                    def hide_tooltip():
-                                        tooltip.destroy()
-                                    
-                                    tooltip.after(3000, hide_tooltip)
-                                
-                                notes_label.bind("<Enter>", show_notes)
-        
-        # Configure grid weights to make cells expand properly
-        for i in range(7):
-            calendar_grid.columnconfigure(i, weight=1)
-        
-        # Configure row weights to make cells expand properly
-        for i in range(len(cal)):
-            calendar_grid.rowconfigure(i, weight=1)
\ No newline at end of file
+        # Get the month's attendance in one query (every worker in heat map mode)
+        matrix = None
+        if heatmap or worker_id:
+            matrix = self.db.get_attendance_matrix(
+                date(year, month_num, 1), date(year, month_num, days_in_month),
+                None if heatmap else [worker_id]
+            )
+        
+        blank = ("", "#f5f5f5", "", "black", "", "black", "")
+        states = [(blank, "")] * 42
+        
+        # Cell position of each day (Monday-first, like calendar.monthcalendar)
+        first_index = calendar.monthrange(year, month_num)[0]
+        for day in range(1, days_in_month + 1):
+            states[first_index + day - 1] = self.calendar_day_state(matrix, day - 1, worker_id, heatmap, str(day))
+        
+        # Redraw only the cells whose contents changed
+        canvas = self.calendar_canvas
+        for cell, (state, tooltip) in zip(self.calendar_cells, states):
+            cell["tooltip"] = tooltip
+            if cell["state"] == state:
+                continue
+            day_text, fill, morning, morning_color, afternoon, afternoon_color, notes = state
+            canvas.itemconfigure(cell["rect"], fill=fill)
+            canvas.itemconfigure(cell["day"], text=day_text)
+            canvas.itemconfigure(cell["morning"], text=morning, fill=morning_color)
+            canvas.itemconfigure(cell["afternoon"], text=afternoon, fill=afternoon_color)
+            canvas.itemconfigure(cell["notes"], text=notes)
+            cell["state"] = state
+        
+        self.hide_calendar_tooltip()
+    
+    def calendar_day_state(self, matrix, day_index, worker_id, heatmap, day_text):
+        """Get the drawn contents and tooltip text for one day cell"""
+        if heatmap:
+            workers = matrix["workers"]
+            entries = [(worker, matrix["cells"][worker["worker_id"]][day_index]) for worker in workers]
+            morning = sum(1 for _, entry in entries if entry and entry["morning"])
+            afternoon = sum(1 for _, entry in entries if entry and entry["afternoon"])
+            fraction = (morning + afternoon) / (2 * len(workers)) if workers else 0
+            notes = [f"{worker['name']}: {entry['notes']}" for worker, entry in entries if entry and entry["notes"]]
+            state = (day_text, self.heat_color(fraction),
+                     f"M: {morning}/{len(workers)}", "black",
+                     f"A: {afternoon}/{len(workers)}", "black",
+                     "📝" if notes else "")
+            return state, "\n".join(notes)
+        
+        attendance = None
+        if matrix and worker_id in matrix["cells"]:
+            attendance = matrix["cells"][worker_id][day_index]
+        if not attendance:
+            return (day_text, "white", "", "black", "", "black", ""), ""
+        
+        state = (day_text, "white",
+                 "M: ✓" if attendance["morning"] else "M: ✗", "green" if attendance["morning"] else "red",
+                 "A: ✓" if attendance["afternoon"] else "A: ✗", "green" if attendance["afternoon"] else "red",
+                 "📝" if attendance["notes"] else "")
+        return state, attendance["notes"] or ""
+    
+    def on_calendar_motion(self, event):
+        """Show the notes of the day cell under the pointer"""
+        header_height, cell_width, cell_height = self.calendar_layout
+        if event.y < header_height:
+            self.hide_calendar_tooltip()
+            return
+        
+        row = int((event.y - header_height) // cell_height)
+        col = int(event.x // cell_width)
+        index = row * 7 + col
+        if not (0 <= row < 6 and 0 <= col < 7) or not self.calendar_cells[index]["tooltip"]:
+            self.hide_calendar_tooltip()
+            return
+        
+        if self.calendar_tooltip is None:
+            self.calendar_tooltip = tk.Toplevel(self.calendar_canvas)
+            self.calendar_tooltip.wm_overrideredirect(True)
+            self.calendar_tooltip_label = ttk.Label(self.calendar_tooltip, background="lightyellow", relief=tk.SOLID, borderwidth=1)
+            self.calendar_tooltip_label.pack()
+        
+        if index != self.calendar_tooltip_index:
+            self.calendar_tooltip_label.configure(text=self.calendar_cells[index]["tooltip"])
+            self.calendar_tooltip_index = index
+        self.calendar_tooltip.wm_geometry(f"+{event.x_root+10}+{event.y_root+10}")
+        self.calendar_tooltip.deiconify()
+    
+    def hide_calendar_tooltip(self):
+        """Hide the calendar notes tooltip"""
+        if self.calendar_tooltip is not None:
+            self.calendar_tooltip.withdraw()
+        self.calendar_tooltip_index = None
\ No newline at end of file
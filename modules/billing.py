@@ -3,24 +3,13 @@ from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, date
 import os
 import sys
-import qrcode
-from PIL import Image, ImageTk, ImageDraw
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch, cm
-from reportlab.lib.colors import HexColor
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.lib import colors
 import subprocess
 import platform
 import json
-import threading
 import sqlite3
 import traceback
 from .share_utils import ShareUtils
+from .customer_picker import CustomerPicker
 
 class BillingModule:
     def __init__(self, parent, db, app):
@@ -40,6 +29,18 @@ class BillingModule:
         self.current_invoice_id = None
         self.current_pending_invoice_id = None
         
+        # Bill history paging: pages are fetched as the list scrolls, and only
+        # bills_max_pages are kept in the treeview; pages dropped from one end
+        # are fetched again by key when scrolling back to them
+        self.bills_page_size = 100
+        self.bills_max_pages = 5
+        self.bills_pages = []
+        self.bills_next_key = None
+        self.bills_prev_key = None
+        self.bills_filters = {}
+        self.bills_sort = "date_desc"
+        self.bills_loading = False
+        
         # Create UI
         self.create_ui()
         
@@ -50,6 +51,15 @@ class BillingModule:
         self.auto_save_timer = None
         self.start_auto_save()
     
+    def on_activate(self):
+        """Refresh lists other sections may have changed when the section is shown again"""
+        self.load_customers()
+        self.load_products()
+        
+        # Restores from the recycle bin and payment edits change bills and pending invoices
+        self.reload_bills()
+        self.load_pending_invoices()
+    
     def create_ui(self):
         """Create the billing module UI"""
         # Main container
@@ -144,9 +154,10 @@ class BillingModule:
         ttk.Label(customer_select_frame, text="Customer:").pack(side=tk.LEFT)
         
         self.customer_var = tk.StringVar()
-        self.customer_combobox = ttk.Combobox(customer_select_frame, textvariable=self.customer_var, state="readonly")
+        self.customer_combobox = CustomerPicker(customer_select_frame, self.db, textvariable=self.customer_var)
         self.customer_combobox.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         self.customer_combobox.bind("<<ComboboxSelected>>", self.on_customer_selected)
+        self.customer_var.trace('w', self.on_customer_text_changed)
         
         # Customer buttons
         button_frame = ttk.Frame(customer_select_frame)
@@ -445,25 +456,10 @@ class BillingModule:
         upi_frame = ttk.Frame(payment_frame)
         upi_frame.pack(fill=tk.X, padx=5, pady=5)
         
-        # Load static QR code image
-        try:
-            qr_image_path = "assets/images/upi_qr.png"
-            if not os.path.exists(qr_image_path):
-                qr_image_path = "ganesh_toughened_industry/assets/images/upi_qr.png"
-                
-            if os.path.exists(qr_image_path):
-                self.qr_image = Image.open(qr_image_path)
-                self.qr_image = self.qr_image.resize((150, 150), Image.LANCZOS)
-                self.upi_qr_photo = ImageTk.PhotoImage(self.qr_image)
-                self.upi_qr_label = ttk.Label(upi_frame, image=self.upi_qr_photo)
-                self.upi_qr_label.pack(side=tk.LEFT, padx=5)
-            else:
-                self.upi_qr_label = ttk.Label(upi_frame, text="QR Code Image Not Found")
-                self.upi_qr_label.pack(side=tk.LEFT, padx=5)
-        except Exception as e:
-            print(f"Error loading QR code image: {e}")
-            self.upi_qr_label = ttk.Label(upi_frame, text="QR Code Image Error")
-            self.upi_qr_label.pack(side=tk.LEFT, padx=5)
+        # Static QR code image (loaded just after the window is drawn, so PIL stays off the startup path)
+        self.upi_qr_label = ttk.Label(upi_frame, text="")
+        self.upi_qr_label.pack(side=tk.LEFT, padx=5)
+        self.upi_qr_label.after(100, self.load_upi_qr_image)
         
         # UPI payment button
         upi_id = settings.get("upi_id", "7013374872-3@axl")
@@ -509,7 +505,7 @@ class BillingModule:
         # Customer filter
         ttk.Label(search_frame, text="Customer:").pack(side=tk.LEFT, padx=5)
         self.history_customer_var = tk.StringVar()
-        self.history_customer_combo = ttk.Combobox(search_frame, textvariable=self.history_customer_var)
+        self.history_customer_combo = CustomerPicker(search_frame, self.db, textvariable=self.history_customer_var)
         self.history_customer_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
         # Date range
@@ -531,10 +527,19 @@ class BillingModule:
         
         ttk.Label(sort_frame, text="Sort By:").pack(side=tk.LEFT, padx=5)
         self.sort_var = tk.StringVar()
-        sort_options = ["Date (Newest First)", "Date (Oldest First)", "Customer (A-Z)", "Customer (Z-A)", "Total (High to Low)", "Total (Low to High)"]
-        sort_combo = ttk.Combobox(sort_frame, textvariable=self.sort_var, values=sort_options, state="readonly")
+        # Sort option -> invoice query sort key (sorting is done by the database)
+        self.sort_options = {
+            "Date (Newest First)": "date_desc",
+            "Date (Oldest First)": "date_asc",
+            "Customer (A-Z)": "customer_asc",
+            "Customer (Z-A)": "customer_desc",
+            "Total (High to Low)": "total_desc",
+            "Total (Low to High)": "total_asc"
+        }
+        sort_combo = ttk.Combobox(sort_frame, textvariable=self.sort_var, values=list(self.sort_options), state="readonly")
         sort_combo.pack(side=tk.LEFT, padx=5)
         sort_combo.current(0)
+        sort_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_sort())
         
         sort_btn = ttk.Button(sort_frame, text="Apply Sort", command=self.apply_sort)
         sort_btn.pack(side=tk.LEFT, padx=5)
@@ -557,10 +562,10 @@ class BillingModule:
         self.bills_tree.column("total", width=100)
         self.bills_tree.column("payment_mode", width=100)
         
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(history_frame, orient=tk.VERTICAL, command=self.bills_tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.bills_tree.configure(yscrollcommand=scrollbar.set)
+        # Add scrollbar (scrolling near the end fetches the next page)
+        self.bills_scrollbar = ttk.Scrollbar(history_frame, orient=tk.VERTICAL, command=self.bills_tree.yview)
+        self.bills_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.bills_tree.configure(yscrollcommand=self.on_bills_scroll)
         
         # Bind double-click to view bill
         self.bills_tree.bind("<Double-1>", self.view_bill)
@@ -584,6 +589,10 @@ class BillingModule:
         delete_btn = ttk.Button(action_frame, text="Delete Bill", command=self.delete_bill)
         delete_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
+        # Bulk export button (all bills matching the current search)
+        export_btn = ttk.Button(action_frame, text="Export PDFs", command=self.export_bill_pdfs)
+        export_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        
         # Print bill button
         print_btn = ttk.Button(action_frame, text="Print Bill", command=self.print_bill)
         print_btn.pack_forget()  # Hide the button
@@ -610,7 +619,7 @@ class BillingModule:
         # Customer filter
         ttk.Label(search_frame, text="Customer:").pack(side=tk.LEFT, padx=5)
         self.pending_customer_var = tk.StringVar()
-        self.pending_customer_combo = ttk.Combobox(search_frame, textvariable=self.pending_customer_var)
+        self.pending_customer_combo = CustomerPicker(search_frame, self.db, textvariable=self.pending_customer_var)
         self.pending_customer_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
         # Date range
@@ -674,6 +683,25 @@ class BillingModule:
         # Load pending invoices
         self.load_pending_invoices()
     
+    def load_upi_qr_image(self):
+        """Load the static UPI QR code image into the payment section"""
+        try:
+            qr_image_path = "assets/images/upi_qr.png"
+            if not os.path.exists(qr_image_path):
+                qr_image_path = "ganesh_toughened_industry/assets/images/upi_qr.png"
+                
+            if os.path.exists(qr_image_path):
+                from PIL import Image, ImageTk
+                self.qr_image = Image.open(qr_image_path)
+                self.qr_image = self.qr_image.resize((150, 150), Image.LANCZOS)
+                self.upi_qr_photo = ImageTk.PhotoImage(self.qr_image)
+                self.upi_qr_label.configure(image=self.upi_qr_photo)
+            else:
+                self.upi_qr_label.configure(text="QR Code Image Not Found")
+        except Exception as e:
+            print(f"Error loading QR code image: {e}")
+            self.upi_qr_label.configure(text="QR Code Image Error")
+    
     def load_settings(self):
         """Load settings from JSON file"""
         try:
@@ -724,63 +752,20 @@ class BillingModule:
     
     def apply_sort(self):
         """Apply sorting to the bill history"""
-        sort_option = self.sort_var.get()
-        
-        # Get all items from the treeview
-        items = []
-        for item_id in self.bills_tree.get_children():
-            item = self.bills_tree.item(item_id)
-            values = item['values']
-            items.append({
-                'id': item_id,
-                'invoice_number': values[0],
-                'date': values[1],
-                'customer': values[2],
-                'total': float(values[3]),
-                'payment_mode': values[4]
-            })
-        
-        # Sort based on selected option
-        if sort_option == "Date (Newest First)":
-            items.sort(key=lambda x: datetime.strptime(x['date'], "%d/%m/%Y"), reverse=True)
-        elif sort_option == "Date (Oldest First)":
-            items.sort(key=lambda x: datetime.strptime(x['date'], "%d/%m/%Y"))
-        elif sort_option == "Customer (A-Z)":
-            items.sort(key=lambda x: x['customer'])
-        elif sort_option == "Customer (Z-A)":
-            items.sort(key=lambda x: x['customer'], reverse=True)
-        elif sort_option == "Total (High to Low)":
-            items.sort(key=lambda x: x['total'], reverse=True)
-        elif sort_option == "Total (Low to High)":
-            items.sort(key=lambda x: x['total'])
-        
-        # Clear the treeview
-        for item_id in self.bills_tree.get_children():
-            self.bills_tree.delete(item_id)
-        
-        # Re-add sorted items
-        for item in items:
-            self.bills_tree.insert("", "end", values=(
-                item['invoice_number'],
-                item['date'],
-                item['customer'],
-                f"{item['total']:.2f}",
-                item['payment_mode']
-            ))
+        self.bills_sort = self.sort_options.get(self.sort_var.get(), "date_desc")
+        self.reload_bills()
     
     def load_customers(self):
-        """Load customers into combobox"""
-        customers = self.db.get_customers()
-        customer_names = [customer["name"] for customer in customers]
-        self.customer_combobox["values"] = customer_names
+        """Refresh the customer pickers (they look customers up as the user types)"""
+        self.customer_combobox.refresh()
         
-        # Also load for history tab if it exists
+        # Also refresh the history tab picker if it exists
         if hasattr(self, 'history_customer_combo'):
-            self.history_customer_combo["values"] = customer_names
+            self.history_customer_combo.refresh()
         
-        # Also load for pending tab if it exists
+        # Also refresh the pending tab picker if it exists
         if hasattr(self, 'pending_customer_combo'):
-            self.pending_customer_combo["values"] = customer_names
+            self.pending_customer_combo.refresh()
     
     def load_products(self):
         """Load products into combobox"""
@@ -793,28 +778,34 @@ class BillingModule:
         customer_name = self.customer_var.get()
         if customer_name:
             # Get customer details
-            customers = self.db.get_customers()
-            for customer in customers:
-                if customer["name"] == customer_name:
-                    self.selected_customer = customer
-                    self.customer_name_var.set(customer["name"])
-                    self.customer_place_var.set(customer["place"] or "")
-                    self.customer_phone_var.set(customer["phone"] or "")
-                    self.customer_gst_var.set(customer["gst"] or "")
-                    self.customer_email_var.set(customer["email"] or "")
-                    break
+            customer = self.db.find_customer_by_name(customer_name)
+            if customer:
+                self.selected_customer = customer
+                self.customer_name_var.set(customer["name"])
+                self.customer_place_var.set(customer["place"] or "")
+                self.customer_phone_var.set(customer["phone"] or "")
+                self.customer_gst_var.set(customer["gst"] or "")
+                self.customer_email_var.set(customer["email"] or "")
+    
+    def on_customer_text_changed(self, *args):
+        """Forget the selected customer once the typed name no longer matches it"""
+        if self.selected_customer and self.customer_var.get() != self.selected_customer["name"]:
+            self.selected_customer = None
+            self.customer_name_var.set("")
+            self.customer_place_var.set("")
+            self.customer_phone_var.set("")
+            self.customer_gst_var.set("")
+            self.customer_email_var.set("")
     
     def on_product_selected(self, event):
         """Handle product selection"""
         product_name = self.product_var.get()
         if product_name:
             # Get product details
-            products = self.db.get_products()
-            for product in products:
-                if f"{product['name']} ({product['type']})" == product_name:
-                    self.selected_product = product
-                    self.rate_var.set(str(product["rate_per_sqft"]))
-                    break
+            product = self.db.find_product_by_label(product_name)
+            if product:
+                self.selected_product = product
+                self.rate_var.set(str(product["rate_per_sqft"]))
     
     def update_chargeable_size(self, *args):
         """Automatically update chargeable size based on actual size"""
@@ -1019,228 +1010,58 @@ class BillingModule:
             invoice_number = self.invoice_number_var.get()
             
             # Check if we're updating an existing invoice
-            if hasattr(self, 'edit_mode') and self.edit_mode and hasattr(self, 'current_invoice_id'):
-                # Update existing invoice
-                invoice_id = self.current_invoice_id
-                
-                # Update invoice
-                conn = self.db.get_connection()
-                cursor = conn.cursor()
-                
-                try:
-                    cursor.execute("""
-                    UPDATE invoices SET 
-                        customer_id = ?, date = ?, subtotal = ?, extra_charges = ?, 
-                        round_off = ?, total = ?, payment_mode = ?, p_pay_no = ?,
-                        extra_charges_breakdown = ?
-                    WHERE invoice_id = ?
-                    """, (
-                        self.selected_customer["customer_id"],
-                        invoice_date.strftime("%Y-%m-%d"),
-                        subtotal,
-                        total_extra,
-                        0,
-                        total,
-                        payment_mode,
-                        ppay_no,
-                        extra_charges_breakdown,
-                        invoice_id
-                    ))
-                    
-                    # Delete existing invoice items
-                    cursor.execute("DELETE FROM invoice_items WHERE invoice_id = ?", (invoice_id,))
-                    
-                    # Add updated invoice items
-                    for item in self.invoice_items:
-                        cursor.execute("""
-                        INSERT INTO invoice_items (invoice_id, product_id, actual_height, actual_width, 
-                                                chargeable_height, chargeable_width, sqft, rounded_sqft, 
-                                                rate, amount, quantity)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            invoice_id,
-                            item["product_id"],
-                            item["actual_height"],
-                            item["actual_width"],
-                            item["chargeable_height"],
-                            item["chargeable_width"],
-                            item["sqft"],
-                            item["rounded_sqft"],
-                            item["rate"],
-                            item["amount"],
-                            item["quantity"]
-                        ))
-                    
-                    # Update payment if exists
-                    cursor.execute("SELECT payment_id FROM payments WHERE invoice_id = ?", (invoice_id,))
-                    payment_row = cursor.fetchone()
-                    
-                    if payment_row:
-                        payment_id = payment_row[0]
-                        cursor.execute("""
-                        UPDATE payments SET 
-                            customer_id = ?, date = ?, amount = ?, mode = ?, reference = ?
-                        WHERE payment_id = ?
-                        """, (
-                            self.selected_customer["customer_id"],
-                            invoice_date.strftime("%Y-%m-%d"),
-                            total,
-                            payment_mode,
-                            ppay_no,
-                            payment_id
-                        ))
-                    elif payment_mode:
-                        # Add new payment
-                        cursor.execute("""
-                        INSERT INTO payments (customer_id, date, amount, mode, reference, invoice_id)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            self.selected_customer["customer_id"],
-                            invoice_date.strftime("%Y-%m-%d"),
-                            total,
-                            payment_mode,
-                            ppay_no,
-                            invoice_id
-                        ))
-                    
-                    # Update works
-                    cursor.execute("DELETE FROM works WHERE invoice_id = ?", (invoice_id,))
-                    
-                    for item in self.invoice_items:
-                        size = f"{item['chargeable_height']}\" x {item['chargeable_width']}\""
-                        cursor.execute("""
-                        INSERT INTO works (invoice_id, date, type, size, quantity, status)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """, (
-                            invoice_id,
-                            invoice_date.strftime("%Y-%m-%d"),
-                            item["product_name"],
-                            size,
-                            item["quantity"],
-                            "Completed"
-                        ))
-                    
-                    # Update inventory
-                    cursor.execute("DELETE FROM inventory WHERE product_id IN (SELECT product_id FROM invoice_items WHERE invoice_id = ?)", 
-                                 (invoice_id,))
-                    
-                    for item in self.invoice_items:
-                        cursor.execute("""
-                        INSERT INTO inventory (product_id, date, type, quantity)
-                        VALUES (?, ?, ?, ?)
-                        """, (
-                            item["product_id"],
-                            invoice_date.strftime("%Y-%m-%d"),
-                            "stock_out",
-                            item["quantity"]
-                        ))
-                    
-                    conn.commit()
-                    conn.close()
-                    
-                    # Reset edit mode
-                    self.edit_mode = False
-                    self.current_invoice_id = None
-                    
-                    # Change button text back to "SAVE BILL"
-                    if hasattr(self, 'save_button'):
-                        self.save_button.config(text="SAVE BILL")
-                    
-                    # Show SAVE AS PENDING button again
-                    if hasattr(self, 'save_pending_btn'):
-                        self.save_pending_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
-                    
-                    messagebox.showinfo("Success", "Bill updated successfully")
-                    self.load_bill_history()
-                    
-                except Exception as e:
-                    conn.rollback()
-                    conn.close()
-                    messagebox.showerror("Error", f"Could not update bill: {e}")
-                    return
-                    
-            else:
-                # Save new invoice
+            editing = hasattr(self, 'edit_mode') and self.edit_mode and hasattr(self, 'current_invoice_id')
+            if not editing:
                 # Generate new invoice number to avoid duplicates
                 invoice_number = self.db.generate_invoice_number()
                 self.invoice_number_var.set(invoice_number)
-                
-                # Add invoice to database
-                result = self.db.add_invoice(
-                    customer_id=self.selected_customer["customer_id"],
-                    date=invoice_date,
-                    invoice_number=invoice_number,
-                    subtotal=subtotal,
-                    extra_charges=total_extra,
-                    round_off=0,
-                    total=total,
-                    payment_mode=payment_mode,
-                    p_pay_no=ppay_no,
-                    extra_charges_breakdown=extra_charges_breakdown
-                )
-                
-                if not result:
+            
+            # Write the invoice, items, works, stock, payment and visit in one transaction
+            invoice_id, invoice_number = self.db.save_invoice_bundle(
+                customer_id=self.selected_customer["customer_id"],
+                date=invoice_date,
+                invoice_number=invoice_number,
+                subtotal=subtotal,
+                extra_charges=total_extra,
+                round_off=0,
+                total=total,
+                payment_mode=payment_mode,
+                p_pay_no=ppay_no,
+                extra_charges_breakdown=extra_charges_breakdown,
+                items=self.invoice_items,
+                visit=None if editing else {
+                    "name": self.selected_customer["name"],
+                    "city": self.selected_customer["place"]
+                },
+                invoice_id=self.current_invoice_id if editing else None
+            )
+            
+            if not invoice_id:
+                if editing:
+                    messagebox.showerror("Error", "Could not update bill")
+                else:
                     messagebox.showerror("Error", "Could not save invoice")
-                    return
-                
-                # Extract invoice_id and invoice_number from the result
-                invoice_id, invoice_number = result
-                
-                # Add invoice items
-                for item in self.invoice_items:
-                    self.db.add_invoice_item(
-                        invoice_id=invoice_id,
-                        product_id=item["product_id"],
-                        actual_height=item["actual_height"],
-                        actual_width=item["actual_width"],
-                        chargeable_height=item["chargeable_height"],
-                        chargeable_width=item["chargeable_width"],
-                        sqft=item["sqft"],
-                        rounded_sqft=item["rounded_sqft"],
-                        rate=item["rate"],
-                        amount=item["amount"],
-                        quantity=item["quantity"]
-                    )
-                
-                if payment_mode:
-                    self.db.add_payment(
-                        customer_id=self.selected_customer["customer_id"],
-                        date=invoice_date,
-                        amount=total,
-                        mode=payment_mode,
-                        reference=ppay_no,
-                        invoice_id=invoice_id
-                    )
+                return
+            
+            if editing:
+                # Reset edit mode
+                self.edit_mode = False
+                self.current_invoice_id = None
                 
-                self.db.add_visit(
-                    customer_id=self.selected_customer["customer_id"],
-                    name=self.selected_customer["name"],
-                    city=self.selected_customer["place"],
-                    purpose="Billing"
-                )
+                # Change button text back to "SAVE BILL"
+                if hasattr(self, 'save_button'):
+                    self.save_button.config(text="SAVE BILL")
                 
-                for item in self.invoice_items:
-                    size = f"{item['chargeable_height']}\" x {item['chargeable_width']}\""
-                    self.db.add_work(
-                        invoice_id=invoice_id,
-                        date=invoice_date,
-                        type=item["product_name"],
-                        size=size,
-                        quantity=item["quantity"],
-                        status="Completed"
-                    )
+                # Show SAVE AS PENDING button again
+                if hasattr(self, 'save_pending_btn'):
+                    self.save_pending_btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
                 
-                for item in self.invoice_items:
-                    self.db.add_inventory(
-                        product_id=item["product_id"],
-                        date=invoice_date,
-                        type="stock_out",
-                        quantity=item["quantity"]
-                    )
+                messagebox.showinfo("Success", "Bill updated successfully")
+                self.load_bill_history()
             
             # Store the last saved invoice for PDF generation
             self.last_saved_invoice = {
-                "invoice_id": invoice_id if not hasattr(self, 'edit_mode') or not self.edit_mode else self.current_invoice_id,
+                "invoice_id": invoice_id,
                 "invoice_number": invoice_number,
                 "customer": self.selected_customer,
                 "items": self.invoice_items,
@@ -1253,7 +1074,7 @@ class BillingModule:
                 "extra_charges_breakdown": extra_charges_breakdown
             }
             
-            if not hasattr(self, 'edit_mode') or not self.edit_mode:
+            if not editing:
                 messagebox.showinfo("Success", "Bill saved successfully")
                 self.load_bill_history()
             
@@ -1400,53 +1221,51 @@ class BillingModule:
             print(f"Error in save_pending_bill: {traceback.format_exc()}")
             messagebox.showerror("Error", f"Could not save pending bill: {e}")
     
-    def generate_pdf(self):
-        """Generate PDF for the invoice"""
+    def generate_pdf(self, on_generated=None):
+        """Generate PDF for the invoice in the background
+        
+        on_generated(file_path) replaces the usual success dialog when given.
+        """
         # Use last saved invoice if available, otherwise use current form data
         if self.last_saved_invoice:
-            self._generate_pdf_from_saved_invoice()
+            self._generate_pdf_from_saved_invoice(on_generated)
         elif self.selected_customer and self.invoice_items:
-            self._generate_pdf_from_form()
+            self._generate_pdf_from_form(on_generated)
         else:
             messagebox.showerror("Error", "No bill data available. Please save a bill first.")
     
-    def _generate_pdf_common(self, invoice_number, customer, items, invoice_date, subtotal, total_extra, total, payment_mode, ppay_no, extra_charges_breakdown=None, is_pending=False):
+    def _generate_pdf_common(self, invoice_number, customer, items, invoice_date, subtotal, total_extra, total, payment_mode, ppay_no, extra_charges_breakdown=None, is_pending=False, on_generated=None):
         """Common PDF generation logic to avoid duplication"""
-        try:
-            # Create invoices directory if it doesn't exist
-            if not os.path.exists("invoices"):
-                os.makedirs("invoices")
+        # Sanitize invoice number for file name
+        prefix = "Pending_Invoice_" if is_pending else "Invoice_"
+        safe_invoice_number = invoice_number.replace('/', '_')
+        file_path = os.path.join("invoices", f"{prefix}{safe_invoice_number}.pdf")
+        
+        def on_done(result):
+            # Store the file path for sharing
+            self.last_pdf_path = file_path
             
-            # Sanitize invoice number for file name
-            prefix = "Pending_Invoice_" if is_pending else "Invoice_"
-            safe_invoice_number = invoice_number.replace('/', '_')
-            file_path = os.path.join("invoices", f"{prefix}{safe_invoice_number}.pdf")
+            if on_generated:
+                on_generated(file_path)
+                return
             
-            # Generate the PDF
-            success = self._generate_invoice_pdf_to_path(
-                invoice_number, customer, items, invoice_date, 
-                subtotal, total_extra, total, payment_mode, ppay_no, file_path, extra_charges_breakdown, is_pending
-            )
+            # Show success message
+            messagebox.showinfo("Success", f"PDF generated successfully at {file_path}")
             
-            if success:
-                # Store the file path for sharing
-                self.last_pdf_path = file_path
-                
-                # Show success message
-                messagebox.showinfo("Success", f"PDF generated successfully at {file_path}")
-                
-                # Show custom dialog with Open and Cancel buttons
-                self.show_pdf_generated_dialog(file_path)
-                
-                return True
-            else:
-                messagebox.showerror("Error", "Failed to generate PDF")
-                return False
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not generate PDF: {e}")
-            return False
+            # Show custom dialog with Open and Cancel buttons
+            self.show_pdf_generated_dialog(file_path)
+        
+        # Render off the Tk thread; the items list is copied so later edits to the form do not race the render
+        self.app.tasks.submit(
+            self._render_invoice_pdf,
+            invoice_number, customer, list(items), invoice_date,
+            subtotal, total_extra, total, payment_mode, ppay_no, file_path, extra_charges_breakdown, is_pending,
+            on_done=on_done,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not generate PDF: {e}"),
+            description=f"Generating PDF {invoice_number}", key=f"pdf:{file_path}"
+        )
     
-    def _generate_pdf_from_saved_invoice(self):
+    def _generate_pdf_from_saved_invoice(self, on_generated=None):
         """Generate PDF from the last saved invoice"""
         if not self.last_saved_invoice:
             messagebox.showerror("Error", "No saved invoice available")
@@ -1466,10 +1285,11 @@ class BillingModule:
             self.last_saved_invoice['payment_mode'],
             self.last_saved_invoice['ppay_no'],
             extra_charges_breakdown,
-            is_pending
+            is_pending,
+            on_generated
         )
     
-    def _generate_pdf_from_form(self):
+    def _generate_pdf_from_form(self, on_generated=None):
         """Generate PDF from current form data"""
         if not self.selected_customer or not self.invoice_items:
             messagebox.showerror("Error", "Please select a customer and add items")
@@ -1488,7 +1308,8 @@ class BillingModule:
                 float(self.total_var.get()),
                 self.payment_mode_var.get(),
                 self.ppay_var.get(),
-                extra_charges_breakdown
+                extra_charges_breakdown,
+                on_generated=on_generated
             )
         except Exception as e:
             messagebox.showerror("Error", f"Could not generate PDF: {e}")
@@ -1545,41 +1366,36 @@ class BillingModule:
             messagebox.showerror("Error", "No saved bill to share")
             return
             
-        # Generate PDF if not already generated
+        # Generate PDF if not already generated, then share it once it is ready
         if not hasattr(self, 'last_pdf_path') or not self.last_pdf_path:
-            success = self.generate_pdf()
-            if not success:
-                messagebox.showerror("Error", "Could not generate PDF for sharing")
-                return
-    
-        if hasattr(self, 'last_pdf_path') and self.last_pdf_path:
-            # Use the improved share dialog
-            ShareUtils.share_dialog(self.last_pdf_path, self.parent)
-        else:
-            messagebox.showerror("Error", "Could not generate PDF for sharing")
-        
-    def print_bill(self):
-        """Print the selected bill"""
-        selected = self.bills_tree.selection()
-        if not selected:
-            messagebox.showerror("Error", "Please select a bill to print")
+            self.generate_pdf(on_generated=lambda file_path: ShareUtils.share_dialog(file_path, self.parent))
             return
     
-        # Get invoice number
-        item = self.bills_tree.item(selected[0])
-        invoice_number = item['values'][0]
-    
-        # Get invoice details
-        invoice = self.db.get_invoice_by_number(invoice_number)
+        # Use the improved share dialog
+        ShareUtils.share_dialog(self.last_pdf_path, self.parent)
+        
+    def render_stored_invoice_pdf(self, invoice_number, is_pending=False):
+        """Load a saved or pending invoice and render its PDF; returns the file path
+        
+        Runs in the background (no Tk calls). An existing PDF whose content is
+        unchanged is returned without re-rendering.
+        """
+        if is_pending:
+            invoice = self.db.get_pending_invoice_by_number(invoice_number)
+        else:
+            invoice = self.db.get_invoice_by_number(invoice_number)
         if not invoice:
-            messagebox.showerror("Error", "Could not find invoice details")
-            return
-    
-        # Generate PDF if needed
+            raise ValueError(f"Invoice {invoice_number} not found")
+        
         safe_invoice_number = invoice_number.replace('/', '_')
-        file_path = os.path.join("invoices", f"Invoice_{safe_invoice_number}.pdf")
-    
-        # Always regenerate PDF to ensure it's up to date
+        prefix = "Pending_Invoice_" if is_pending else "Invoice_"
+        file_path = os.path.join("invoices", f"{prefix}{safe_invoice_number}.pdf")
+        
+        if is_pending:
+            items = self.db.get_pending_invoice_items(invoice['pending_invoice_id'])
+        else:
+            items = self.db.get_invoice_items(invoice['invoice_id'])
+        
         # Fixed date handling - ensure date is a date object
         invoice_date = invoice['date']
         if isinstance(invoice_date, str):
@@ -1587,8 +1403,8 @@ class BillingModule:
                 invoice_date = datetime.strptime(invoice_date, "%Y-%m-%d").date()
             except ValueError:
                 invoice_date = date.today()
-                
-        success = self._generate_invoice_pdf_to_path(
+        
+        self._render_invoice_pdf(
             invoice_number,
             {
                 "name": invoice['customer_name'],
@@ -1597,7 +1413,7 @@ class BillingModule:
                 "gst": invoice['customer_gst'],
                 "email": invoice.get('customer_email', '')
             },
-            self.db.get_invoice_items(invoice['invoice_id']),
+            items,
             invoice_date,
             invoice['subtotal'],
             invoice['extra_charges'],
@@ -1605,13 +1421,32 @@ class BillingModule:
             invoice['payment_mode'],
             invoice['p_pay_no'],
             file_path,
-            invoice.get('extra_charges_breakdown')
+            invoice.get('extra_charges_breakdown'),
+            is_pending
         )
-        
-        if not success:
-            messagebox.showerror("Error", "Could not generate PDF for printing")
+        return file_path
+    
+    def print_bill(self):
+        """Print the selected bill"""
+        selected = self.bills_tree.selection()
+        if not selected:
+            messagebox.showerror("Error", "Please select a bill to print")
             return
     
+        # Get invoice number
+        item = self.bills_tree.item(selected[0])
+        invoice_number = item['values'][0]
+    
+        # Regenerate the PDF if the bill changed since it was last rendered, then print it
+        self.app.tasks.submit(
+            self.render_stored_invoice_pdf, invoice_number,
+            on_done=self.send_to_printer,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not generate PDF for printing: {e}"),
+            description=f"Preparing {invoice_number} for printing", key=f"print:{invoice_number}"
+        )
+    
+    def send_to_printer(self, file_path):
+        """Send a generated invoice PDF to the printer"""
         # Show print dialog
         try:
             if platform.system() == "Windows":
@@ -1664,53 +1499,16 @@ class BillingModule:
         item = self.bills_tree.item(selected[0])
         invoice_number = item['values'][0]
         
-        # Get the invoice details
-        invoice = self.db.get_invoice_by_number(invoice_number)
-        if not invoice:
-            messagebox.showerror("Error", "Invoice not found")
-            return
-        
-        # Get the invoice items
-        items = self.db.get_invoice_items(invoice['invoice_id'])
-        
-        # Generate the PDF
-        safe_invoice_number = invoice_number.replace('/', '_')
-        file_path = os.path.join("invoices", f"Invoice_{safe_invoice_number}.pdf")
-        
-        # Generate the PDF if it doesn't exist
-        if not os.path.exists(file_path):
-            # Fixed date handling - ensure date is a date object
-            invoice_date = invoice['date']
-            if isinstance(invoice_date, str):
-                try:
-                    invoice_date = datetime.strptime(invoice_date, "%Y-%m-%d").date()
-                except ValueError:
-                    invoice_date = date.today()
-                    
-            success = self._generate_invoice_pdf_to_path(
-                invoice_number,
-                {
-                    "name": invoice['customer_name'],
-                    "place": invoice['customer_place'],
-                    "phone": invoice['customer_phone'],
-                    "gst": invoice['customer_gst'],
-                    "email": invoice.get('customer_email', '')
-                },
-                items,
-                invoice_date,
-                invoice['subtotal'],
-                invoice['extra_charges'],
-                invoice['total'],
-                invoice['payment_mode'],
-                invoice['p_pay_no'],
-                file_path,
-                invoice.get('extra_charges_breakdown')
-            )
-            
-            if not success:
-                messagebox.showerror("Error", "Could not generate PDF for viewing")
-                return
-        
+        # Generate the PDF if it is missing or out of date, then open it
+        self.app.tasks.submit(
+            self.render_stored_invoice_pdf, invoice_number,
+            on_done=self.open_invoice_file,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not generate PDF for viewing: {e}"),
+            description=f"Opening {invoice_number}", key=f"view:{invoice_number}"
+        )
+    
+    def open_invoice_file(self, file_path):
+        """Open a generated invoice PDF with the system viewer"""
         # Open the PDF
         try:
             if platform.system() == "Windows":
@@ -1720,7 +1518,7 @@ class BillingModule:
             else:
                 subprocess.call(["xdg-open", file_path])
         except Exception as e:
-            messagebox.showerror("Error", f"Could not open bill: {e}")
+            messagebox.showerror("Error", f"Could not open invoice: {e}")
     
     def edit_bill(self):
         """Edit the selected bill"""
@@ -1763,12 +1561,10 @@ class BillingModule:
     def load_invoice_data(self, invoice, items):
         """Load invoice data into the form"""
         # Set customer
-        customers = self.db.get_customers()
-        for customer in customers:
-            if customer["customer_id"] == invoice.get("customer_id"):
-                self.customer_var.set(customer["name"])
-                self.on_customer_selected(None)
-                break
+        customer = self.db.get_customer_by_id(invoice.get("customer_id"))
+        if customer:
+            self.customer_var.set(customer["name"])
+            self.on_customer_selected(None)
     
         # Set invoice number and date
         self.invoice_number_var.set(invoice["invoice_number"])
@@ -1916,9 +1712,8 @@ class BillingModule:
             # Delete works
             cursor.execute("DELETE FROM works WHERE invoice_id = ?", (invoice["invoice_id"],))
             
-            # Delete inventory records
-            cursor.execute("DELETE FROM inventory WHERE product_id IN (SELECT product_id FROM invoice_items WHERE invoice_id = ?)", 
-                         (invoice["invoice_id"],))
+            # Delete the invoice's stock movements
+            cursor.execute("DELETE FROM inventory WHERE invoice_id = ?", (invoice["invoice_id"],))
             
             # Delete the invoice
             cursor.execute("DELETE FROM invoices WHERE invoice_id = ?", (invoice["invoice_id"],))
@@ -1979,46 +1774,32 @@ class BillingModule:
                     conn.close()
                     return
             
-            # Add customer to recycle bin before deletion
-            self.db.add_to_recycle_bin("customers", self.selected_customer["customer_id"], self.selected_customer)
-            
-            # Delete all related records
-            # Delete invoice items and inventory records for invoices
-            cursor.execute("DELETE FROM invoice_items WHERE invoice_id IN (SELECT invoice_id FROM invoices WHERE customer_id = ?)", 
-                         (self.selected_customer["customer_id"],))
-            cursor.execute("DELETE FROM inventory WHERE product_id IN (SELECT product_id FROM invoice_items WHERE invoice_id IN (SELECT invoice_id FROM invoices WHERE customer_id = ?))", 
-                         (self.selected_customer["customer_id"],))
-            
-            # Delete invoices
-            cursor.execute("DELETE FROM invoices WHERE customer_id = ?", (self.selected_customer["customer_id"],))
-            
-            # Delete payments
-            cursor.execute("DELETE FROM payments WHERE customer_id = ?", (self.selected_customer["customer_id"],))
-            
-            # Delete visits
-            cursor.execute("DELETE FROM customer_visits WHERE customer_id = ?", (self.selected_customer["customer_id"],))
-            
-            # Delete the customer
-            cursor.execute("DELETE FROM customers WHERE customer_id = ?", (self.selected_customer["customer_id"],))
-            
-            conn.commit()
             conn.close()
-            
-            messagebox.showinfo("Success", "Customer moved to recycle bin")
-            # Refresh customer list
-            self.load_customers()
-            # Clear customer details
-            self.customer_var.set("")
-            self.selected_customer = None
-            self.customer_name_var.set("")
-            self.customer_place_var.set("")
-            self.customer_phone_var.set("")
-            self.customer_gst_var.set("")
-            self.customer_email_var.set("")
         except Exception as e:
-            conn.rollback()
             conn.close()
             messagebox.showerror("Error", f"Could not delete customer: {e}")
+            return
+        
+        # Delete the customer and all related records in one transaction
+        customer = self.selected_customer
+        if not self.db.delete_customer(customer["customer_id"]):
+            messagebox.showerror("Error", "Could not delete customer")
+            return
+        
+        # Add customer to recycle bin only once the customer is really gone
+        self.db.add_to_recycle_bin("customers", customer["customer_id"], customer)
+        
+        messagebox.showinfo("Success", "Customer moved to recycle bin")
+        # Refresh customer list
+        self.load_customers()
+        # Clear customer details
+        self.customer_var.set("")
+        self.selected_customer = None
+        self.customer_name_var.set("")
+        self.customer_place_var.set("")
+        self.customer_phone_var.set("")
+        self.customer_gst_var.set("")
+        self.customer_email_var.set("")
     
     def search_bills(self):
         """Search bills based on criteria"""
@@ -2045,67 +1826,155 @@ class BillingModule:
                 messagebox.showerror("Error", "Invalid to date format. Use DD/MM/YYYY")
                 return
         
-        # Search invoices
-        invoices = self.db.search_invoices(customer, from_date, to_date)
+        # Search invoices, one page at a time
+        self.bills_filters = {"customer": customer, "from_date": from_date, "to_date": to_date}
+        self.reload_bills()
+    
+    def export_bill_pdfs(self):
+        """Regenerate the PDFs of every bill matching the current search, using all cores"""
+        filters = dict(self.bills_filters)
+        if not messagebox.askyesno("Export PDFs", "Regenerate the PDFs of all bills matching the current search into the invoices folder?"):
+            return
         
-        # Clear the treeview
-        for item_id in self.bills_tree.get_children():
-            self.bills_tree.delete(item_id)
+        def export(task):
+            from utils.bulk_export import export_invoices
+            
+            invoices = self.db.get_invoices_for_export(**filters)
+            return export_invoices(
+                invoices,
+                progress=lambda done, total, invoice_number, error: self.app.tasks.set_progress(task, f"Exporting PDFs {done}/{total}"),
+                should_cancel=task.is_cancelled
+            )
         
-        # Add search results
-        for invoice in invoices:
-            # Fixed: Check if date is a string or date object
-            if isinstance(invoice["date"], str):
-                # Parse the date string
-                try:
-                    date_obj = datetime.strptime(invoice["date"], "%Y-%m-%d").date()
-                    display_date = date_obj.strftime("%d/%m/%Y")
-                except ValueError:
-                    # If parsing fails, use the original string
-                    display_date = invoice["date"]
-            else:
-                # It's already a date object
-                display_date = invoice["date"].strftime("%d/%m/%Y")
-                
-            self.bills_tree.insert("", "end", values=(
-                invoice["invoice_number"],
-                display_date,
-                invoice["customer_name"],
-                f"{invoice['total']:.2f}",
-                invoice["payment_mode"] or ""
-            ))
+        def on_done(summary):
+            message = (f"Exported {len(summary['written'])} of {summary['total']} bill PDF(s) to the invoices folder"
+                       f" ({summary['unchanged']} already up to date)")
+            if summary["failed"]:
+                invoice_number, error = summary["failed"][0]
+                message += f"\n{len(summary['failed'])} failed (first: {invoice_number}: {error})"
+            messagebox.showinfo("Export PDFs", message)
+        
+        self.app.tasks.submit(
+            export, pass_task=True, on_done=on_done,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not export PDFs: {e}"),
+            description="Exporting PDFs", key="bulk_export"
+        )
     
     def load_bill_history(self):
         """Load bill history into the treeview"""
-        # Clear the treeview
-        for item_id in self.bills_tree.get_children():
-            self.bills_tree.delete(item_id)
+        self.bills_filters = {}
+        self.reload_bills()
+    
+    def reload_bills(self):
+        """Clear the bill list and load the first page for the current filters"""
+        self.bills_tree.delete(*self.bills_tree.get_children())
+        self.bills_pages = []
+        self.bills_next_key = None
+        self.bills_prev_key = None
+        self.load_more_bills(first_page=True)
+    
+    def load_more_bills(self, first_page=False):
+        """Fetch the next page of bills in the background and append it to the treeview"""
+        if not first_page and (self.bills_loading or self.bills_next_key is None):
+            return
+        
+        after_key = None if first_page else self.bills_next_key
+        self.fetch_bills_page(after_key=after_key, on_done=self.show_bills_page)
+    
+    def load_previous_bills(self):
+        """Fetch the page before the first one in the treeview and prepend it"""
+        if self.bills_loading or self.bills_prev_key is None:
+            return
         
-        # Get invoices
-        invoices = self.db.get_invoices()
+        self.fetch_bills_page(before_key=self.bills_prev_key, on_done=self.show_previous_bills_page)
+    
+    def fetch_bills_page(self, on_done, after_key=None, before_key=None):
+        """Fetch one page of bills for the current sort and filters in the background"""
+        self.bills_loading = True
+        sort = self.bills_sort
+        filters = dict(self.bills_filters)
+        
+        def on_error(e):
+            self.bills_loading = False
+            messagebox.showerror("Error", f"Could not load bills: {e}")
+        
+        # A new first page (filter or sort change) replaces any page still loading
+        self.app.tasks.submit(
+            lambda: self.db.get_invoices_page(after_key=after_key, before_key=before_key,
+                                              limit=self.bills_page_size, sort=sort, **filters),
+            on_done=on_done, on_error=on_error,
+            description="Loading bills", key="bills_page"
+        )
+    
+    def show_bills_page(self, page):
+        """Append a page of bills fetched by load_more_bills, dropping the oldest page if over the cap"""
+        invoices, self.bills_next_key = page
+        self.bills_loading = False
+        if not invoices:
+            return
         
-        # Add invoices to the treeview
-        for invoice in invoices:
-            # Fixed: Check if date is a string or date object
-            if isinstance(invoice["date"], str):
-                # Parse the date string
-                try:
-                    date_obj = datetime.strptime(invoice["date"], "%Y-%m-%d").date()
-                    display_date = date_obj.strftime("%d/%m/%Y")
-                except ValueError:
-                    # If parsing fails, use the original string
-                    display_date = invoice["date"]
-            else:
-                # It's already a date object
-                display_date = invoice["date"].strftime("%d/%m/%Y")
-                
-            self.bills_tree.insert("", "end", values=(
-                invoice["invoice_number"],
-                display_date,
-                invoice["customer_name"],
-                f"{invoice['total']:.2f}",
-                invoice["payment_mode"] or ""
-            ))
+        anchor = self.top_bill_row()
+        items = [self.bills_tree.insert("", "end", values=self.bill_row_values(invoice)) for invoice in invoices]
+        self.bills_pages.append({"items": items, "first": invoices[0]["key"], "last": invoices[-1]["key"]})
+        
+        if len(self.bills_pages) > self.bills_max_pages:
+            dropped = self.bills_pages.pop(0)
+            self.bills_tree.delete(*dropped["items"])
+            self.bills_prev_key = self.bills_pages[0]["first"]
+            self.keep_bills_view(anchor)
+    
+    def show_previous_bills_page(self, page):
+        """Prepend a page of bills fetched by load_previous_bills, dropping the newest page if over the cap"""
+        invoices, prev_key = page
+        self.bills_loading = False
+        # A short page reached the start of the list
+        self.bills_prev_key = prev_key if invoices else None
+        if not invoices:
+            return
+        
+        anchor = self.top_bill_row()
+        items = [self.bills_tree.insert("", index, values=self.bill_row_values(invoice))
+                 for index, invoice in enumerate(invoices)]
+        self.bills_pages.insert(0, {"items": items, "first": invoices[0]["key"], "last": invoices[-1]["key"]})
+        
+        if len(self.bills_pages) > self.bills_max_pages:
+            dropped = self.bills_pages.pop()
+            self.bills_tree.delete(*dropped["items"])
+            self.bills_next_key = self.bills_pages[-1]["last"]
+        self.keep_bills_view(anchor)
+    
+    def bill_row_values(self, invoice):
+        """Treeview values for a bill"""
+        # Stored dates are YYYY-MM-DD; show DD/MM/YYYY
+        display_date = "/".join(reversed(invoice["date"].split("-")))
+        return (
+            invoice["invoice_number"],
+            display_date,
+            invoice["customer_name"],
+            f"{invoice['total']:.2f}",
+            invoice["payment_mode"] or ""
+        )
+    
+    def top_bill_row(self):
+        """The bill row currently at the top of the view, if any"""
+        children = self.bills_tree.get_children()
+        if not children:
+            return None
+        return children[min(int(self.bills_tree.yview()[0] * len(children)), len(children) - 1)]
+    
+    def keep_bills_view(self, anchor):
+        """Scroll so the row that was at the top stays there after rows were added or dropped above it"""
+        if anchor and self.bills_tree.exists(anchor):
+            rows = len(self.bills_tree.get_children())
+            self.bills_tree.yview_moveto(self.bills_tree.index(anchor) / rows)
+    
+    def on_bills_scroll(self, first, last):
+        """Update the scrollbar and fetch more bills when either end comes into view"""
+        self.bills_scrollbar.set(first, last)
+        if float(last) > 0.9 and self.bills_next_key is not None:
+            self.load_more_bills()
+        elif float(first) < 0.1 and self.bills_prev_key is not None:
+            self.load_previous_bills()
     
     def add_new_customer(self):
         """Add a new customer"""
@@ -2224,36 +2093,25 @@ class BillingModule:
                 return
             
             # Update customer in database
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
+            success = self.db.update_customer(
+                self.selected_customer["customer_id"],
+                name,
+                place_var.get().strip(),
+                phone_var.get().strip(),
+                gst_var.get().strip(),
+                address_var.get().strip(),
+                email_var.get().strip()
+            )
             
-            try:
-                cursor.execute("""
-                UPDATE customers SET name = ?, place = ?, phone = ?, gst = ?, address = ?, email = ?
-                WHERE customer_id = ?
-                """, (
-                    name,
-                    place_var.get().strip(),
-                    phone_var.get().strip(),
-                    gst_var.get().strip(),
-                    address_var.get().strip(),
-                    email_var.get().strip(),
-                    self.selected_customer["customer_id"]
-                ))
-                
-                conn.commit()
-                conn.close()
-                
+            if success:
                 messagebox.showinfo("Success", "Customer updated successfully")
                 customer_window.destroy()
                 # Refresh customer list and selected customer
                 self.load_customers()
                 self.customer_var.set(name)
                 self.on_customer_selected(None)
-            except Exception as e:
-                conn.rollback()
-                conn.close()
-                messagebox.showerror("Error", f"Could not update customer: {e}")
+            else:
+                messagebox.showerror("Error", "Could not update customer")
         
         ttk.Button(button_frame, text="Save", command=update_customer).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=customer_window.destroy).pack(side=tk.LEFT, padx=5)
@@ -2326,9 +2184,8 @@ class BillingModule:
     
     def start_auto_save(self):
         """Start auto-save timer"""
-        self.auto_save_timer = threading.Timer(self.auto_save_interval, self.auto_save_draft)
-        self.auto_save_timer.daemon = True
-        self.auto_save_timer.start()
+        # Scheduled on the Tk event loop: saving a draft reads the form's Tk variables
+        self.auto_save_timer = self.parent.after(self.auto_save_interval * 1000, self.auto_save_draft)
     
     def auto_save_draft(self):
         """Auto-save the current bill as draft"""
@@ -2426,326 +2283,27 @@ class BillingModule:
         except Exception as e:
             print(f"Error deleting draft: {e}")
     
-    def _generate_invoice_pdf_to_path(self, invoice_number, customer, items, invoice_date, subtotal, total_extra, total, payment_mode, ppay_no, file_path, extra_charges_breakdown=None, is_pending=False):
-        """Generate PDF for an invoice to a specific path with modern styling"""
+    def _render_invoice_pdf(self, invoice_number, customer, items, invoice_date, subtotal, total_extra, total, payment_mode, ppay_no, file_path, extra_charges_breakdown=None, is_pending=False):
+        """Render an invoice PDF with modern styling (no Tk calls, safe to run in the background)"""
+        # The PDF libraries are only loaded when an invoice is rendered
+        from utils.invoice_template import get_invoice_template
+        
         try:
             # Create invoices directory if it doesn't exist
             if not os.path.exists("invoices"):
                 os.makedirs("invoices")
             
-            doc = SimpleDocTemplate(file_path, pagesize=A4, 
-                                    rightMargin=30, leftMargin=30, 
-                                    topMargin=30, bottomMargin=30)
-            elements = []
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            
-            # Define modern color scheme using hex values
-            primary_color = "#000080"  # dark blue
-            secondary_color = "#0000FF"  # blue
-            accent_color = "#FF0000"  # red
-            light_gray = "#D3D3D3"  # light gray
-            
-            # Add custom styles for modern look
-            styles.add(ParagraphStyle(
-                name='CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=20,
-                textColor=HexColor(primary_color),
-                alignment=TA_CENTER,
-                borderWidth=1,
-                borderColor=HexColor(primary_color),
-                borderPadding=5
-            ))
-            
-            styles.add(ParagraphStyle(
-                name='CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=12,
-                textColor=HexColor(primary_color),
-                borderWidth=1,
-                borderColor=HexColor(primary_color),
-                borderPadding=3
-            ))
-            
-            styles.add(ParagraphStyle(
-                name='CustomNormal',
-                parent=styles['Normal'],
-                fontSize=10,
-                textColor=HexColor("#000000"),  # black
-                spaceAfter=6
-            ))
-            
-            # Create a table for logo and company details side by side
-            company_data = []
-            
-            # Add logo if available
-            logo_path = "assets/images/logo.png"
-            if not os.path.exists(logo_path):
-                logo_path = "ganesh_toughened_industry/assets/images/logo.png"
-                
-            logo_cell = None
-            if os.path.exists(logo_path):
-                logo = RLImage(logo_path, width=2*inch, height=1.5*inch)
-                logo_cell = logo
-            
-            # Load settings from JSON file
-            settings = {}
-            try:
-                with open('config/settings.json', 'r') as f:
-                    settings = json.load(f)
-            except:
-                settings = {}
-            
-            # Company details
-            company_name = settings.get("company_name", "GANESH TOUGHEN INDUSTRY")
-            company_address = settings.get("company_address", "Plot no:B13, Industrial Estate, Madanapalli")
-            company_phone = settings.get("company_phone", "9398530499, 7013374872")
-            company_gst = settings.get("company_gst", "37EXFPK2395C1ZE")
-            
-            company_details = [
-                [Paragraph(f"<b>{company_name}</b>", styles["CustomTitle"])],
-                [Paragraph(company_address, styles["CustomNormal"])],
-                [Paragraph(f"Phone: {company_phone}", styles["CustomNormal"])],
-                [Paragraph(f"GST: {company_gst}", styles["CustomNormal"])]
-            ]
-            
-            company_table = Table(company_details, colWidths=[10*cm])
-            company_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            
-            # Create table with logo and company details
-            if logo_cell:
-                company_layout_data = [[logo_cell, company_table]]
-                company_layout_table = Table(company_layout_data, colWidths=[2*inch, 10*cm])
-            else:
-                company_layout_table = company_table
-            
-            company_layout_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            
-            elements.append(company_layout_table)
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # Invoice title with modern styling
-            if is_pending:
-                invoice_title = Paragraph("<b>PENDING INVOICE</b>", styles["CustomHeading"])
-            else:
-                invoice_title = Paragraph("<b>INVOICE</b>", styles["CustomHeading"])
-            elements.append(invoice_title)
-            elements.append(Spacer(1, 0.2*inch))
-            
-            # Invoice details in a modern table
-            invoice_data = [
-                ["Invoice #:", invoice_number],
-                ["Date:", invoice_date.strftime("%d/%m/%Y")],
-                ["Customer:", customer["name"]],
-                ["Place:", customer["place"] or ""],
-                ["Phone:", customer["phone"] or ""],
-                ["GST:", customer["gst"] or ""]
-            ]
-            
-            if is_pending:
-                invoice_data.append(["Status:", "PENDING"])
-            
-            invoice_table = Table(invoice_data, colWidths=[4*cm, 12*cm])
-            invoice_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('BACKGROUND', (0, 0), (-1, -1), HexColor(light_gray)),
-                ('BOX', (0, 0), (-1, -1), 1, HexColor(primary_color)),
-                ('ROUNDEDCORNERS', [10, 10, 10, 10]),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ]))
-            
-            elements.append(invoice_table)
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # Items table with improved formatting
-            items_data = [[
-                "Product", "Actual Size", "Chargeable Size", "SQ.FT", "Rounded SQ.FT", "Rate", "Qty", "Amount"
-            ]]
-            
-            for item in items:
-                actual_size = f"{item['actual_height']}\" x {item['actual_width']}\""
-                chargeable_size = f"{item['chargeable_height']}\" x {item['chargeable_width']}\""
-                items_data.append([
-                    item["product_name"],
-                    actual_size,
-                    chargeable_size,
-                    f"{item['sqft']:.2f}",
-                    f"{item['rounded_sqft']:.1f}",
-                    f"{item['rate']:.2f}",
-                    str(item["quantity"]),
-                    f"{item['amount']:.2f}"
-                ])
-            
-            # Adjust column widths for better text fitting
-            items_table = Table(items_data, colWidths=[3.5*cm, 2.5*cm, 2.5*cm, 1.5*cm, 2*cm, 1.5*cm, 1*cm, 2*cm])
-            items_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('BACKGROUND', (0, 0), (-1, 0), HexColor(primary_color)),
-                ('TEXTCOLOR', (0, 0), (-1, 0), HexColor("#FFFFFF")),  # white
-                ('GRID', (0, 0), (-1, -1), 1, HexColor(primary_color)),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),  # Reduced font size
-                ('FONTSIZE', (0, 1), (-1, -1), 8),  # Reduced font size
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TOPPADDING', (0, 1), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('ROUNDEDCORNERS', [10, 10, 10, 10]),
-            ]))
-            
-            elements.append(items_table)
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # Extra charges section - Fixed to always show breakdown
-            extra_charges_data = [["Description", "Amount"]]
-            
-            # Parse extra charges breakdown if provided
-            extra_charges = {}
-            if extra_charges_breakdown:
-                try:
-                    extra_charges = json.loads(extra_charges_breakdown)
-                except:
-                    pass
-            
-            # Always add all charge types, even if they're zero
-            extra_charges_data.append(["Cut Out Charges", f"{float(extra_charges.get('cutout', 0)):.2f}"])
-            extra_charges_data.append(["Hole Charges", f"{float(extra_charges.get('hole', 0)):.2f}"])
-            extra_charges_data.append(["Door Handle Hole Charges", f"{float(extra_charges.get('handle', 0)):.2f}"])
-            extra_charges_data.append(["Jumbo Size Charges", f"{float(extra_charges.get('jumbo', 0)):.2f}"])
-            
-            extra_charges_table = Table(extra_charges_data, colWidths=[8*cm, 4*cm])
-            extra_charges_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('BACKGROUND', (0, 0), (-1, 0), HexColor(primary_color)),
-                ('TEXTCOLOR', (0, 0), (-1, 0), HexColor("#FFFFFF")),  # white
-                ('GRID', (0, 0), (-1, -1), 1, HexColor(primary_color)),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TOPPADDING', (0, 1), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ]))
-            
-            elements.append(extra_charges_table)
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # Summary table with modern styling
-            summary_data = [
-                ["Subtotal:", f"{subtotal:.2f}"],
-                ["Extra Charges:", f"{total_extra:.2f}"],
-                ["Total:", f"{total:.2f}"]
-            ]
-            
-            summary_table = Table(summary_data, colWidths=[12*cm, 4*cm])
-            summary_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('BACKGROUND', (0, 0), (-1, -1), HexColor(light_gray)),
-                ('GRID', (0, 0), (-1, -1), 1, HexColor(primary_color)),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-                ('ROUNDEDCORNERS', [10, 10, 10, 10]),
-            ]))
-            
-            elements.append(summary_table)
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # Payment details with bank info and QR code side by side
-            # Create a 2-column layout for payment details
-            payment_layout = Table([
-                [
-                    # Left column - Payment details and bank info
-                    [
-                        Paragraph("<b>Payment Details</b>", styles["CustomHeading"]),
-                        Spacer(1, 0.2*inch),
-                        Paragraph(f"Payment Mode: {payment_mode or ''}", styles["CustomNormal"]),
-                        Paragraph(f"P-PAY No.: {ppay_no or ''}", styles["CustomNormal"]),
-                        Spacer(1, 0.3*inch),
-                        Paragraph("<b>Bank Details</b>", styles["CustomHeading"]),
-                        Spacer(1, 0.1*inch),
-                        Paragraph(f"Bank: {settings.get('bank_name', '')}", styles["CustomNormal"]),
-                        Paragraph(f"Account: {settings.get('bank_account', '')}", styles["CustomNormal"]),
-                        Paragraph(f"IFSC: {settings.get('bank_ifsc', '')}", styles["CustomNormal"]),
-                        Paragraph(f"Branch: {settings.get('bank_branch', '')}", styles["CustomNormal"])
-                    ],
-                    # Right column - QR code
-                    [
-                        Paragraph("<b>UPI Payment</b>", styles["CustomHeading"]),
-                        Spacer(1, 0.1*inch)
-                    ]
-                ]
-            ], colWidths=[10*cm, 5*cm])
-            
-            payment_layout.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ]))
-            
-            elements.append(payment_layout)
-            elements.append(Spacer(1, 0.3*inch))
-            
-            # Add UPI QR code
-            upi_id = settings.get("upi_id", "")
-            upi_name = settings.get("upi_name", "")
-            upi_data = f"upi://pay?pa={upi_id}&pn={upi_name}&am={total}&cu=INR"
-            
-            # Generate QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
+            # Styles, header, bank details and the scaled logo are built once per settings version;
+            # an existing PDF rendered from the same content is reused as is
+            template = get_invoice_template()
+            template.render_if_changed(
+                file_path, invoice_number, customer, items, invoice_date, subtotal, total_extra, total,
+                payment_mode, ppay_no, extra_charges_breakdown, is_pending
             )
-            qr.add_data(upi_data)
-            qr.make(fit=True)
-            
-            # Use RGB tuples for qrcode
-            img = qr.make_image(fill_color=(0, 0, 128), back_color=(255, 255, 255))  # darkblue and white as RGB
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
-            
-            qr_image = RLImage(img_byte_arr, width=1.5*inch, height=1.5*inch)
-            elements.append(qr_image)
-            
-            # Add footer with modern styling
-            footer_text = f"Generated on {datetime.now().strftime('%d/%m/%Y %H:%M:%S')} | {company_name}"
-            if is_pending:
-                footer_text += " | PENDING INVOICE"
-            footer = Paragraph(footer_text, styles["CustomNormal"])
-            elements.append(Spacer(1, 0.5*inch))
-            elements.append(footer)
-            
-            # Build the PDF
-            doc.build(elements)
-            
             return True
         except Exception as e:
             print(f"Error generating PDF: {e}")
-            messagebox.showerror("Error", f"Failed to generate PDF: {e}")
-            return False
+            raise
     
     def open_upi_app(self):
         """Open UPI payment app or URL"""
@@ -2772,8 +2330,9 @@ class BillingModule:
             # Get UPI name
             upi_name = settings.get("upi_name", "GANESH TOUGHENED INDUSTRY")
             
-            # Create UPI payment URL
-            upi_url = f"upi://pay?pa={upi_id}&pn={upi_name}&am={total}&cu=INR"
+            # Create UPI payment URL (same link as the invoice QR code)
+            from utils.qr_cache import build_upi_url
+            upi_url = build_upi_url(upi_id, upi_name, total)
             
             # Open UPI URL based on platform
             if platform.system() == "Windows":
@@ -2878,64 +2437,13 @@ class BillingModule:
         item = self.pending_tree.item(selected[0])
         invoice_number = item['values'][0]
         
-        # Get the invoice details
-        invoice = self.db.get_pending_invoice_by_number(invoice_number)
-        if not invoice:
-            messagebox.showerror("Error", "Invoice not found")
-            return
-        
-        # Get the invoice items
-        items = self.db.get_pending_invoice_items(invoice['pending_invoice_id'])
-        
-        # Generate the PDF
-        safe_invoice_number = invoice_number.replace('/', '_')
-        file_path = os.path.join("invoices", f"Pending_Invoice_{safe_invoice_number}.pdf")
-        
-        # Generate the PDF if it doesn't exist
-        if not os.path.exists(file_path):
-            # Fixed date handling
-            invoice_date = invoice['date']
-            if isinstance(invoice_date, str):
-                try:
-                    invoice_date = datetime.strptime(invoice_date, "%Y-%m-%d").date()
-                except ValueError:
-                    invoice_date = date.today()
-                    
-            success = self._generate_invoice_pdf_to_path(
-                invoice_number,
-                {
-                    "name": invoice['customer_name'],
-                    "place": invoice['customer_place'],
-                    "phone": invoice['customer_phone'],
-                    "gst": invoice['customer_gst'],
-                    "email": invoice.get('customer_email', '')
-                },
-                items,
-                invoice_date,
-                invoice['subtotal'],
-                invoice['extra_charges'],
-                invoice['total'],
-                invoice['payment_mode'],
-                invoice['p_pay_no'],
-                file_path,
-                invoice.get('extra_charges_breakdown'),
-                is_pending=True  # Mark as pending invoice
-            )
-            
-            if not success:
-                messagebox.showerror("Error", "Could not generate PDF for viewing")
-                return
-        
-        # Open the PDF
-        try:
-            if platform.system() == "Windows":
-                os.startfile(file_path)
-            elif platform.system() == "Darwin":
-                subprocess.call(["open", file_path])
-            else:
-                subprocess.call(["xdg-open", file_path])
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not open invoice: {e}")
+        # Generate the PDF if it is missing or out of date, then open it
+        self.app.tasks.submit(
+            self.render_stored_invoice_pdf, invoice_number, is_pending=True,
+            on_done=self.open_invoice_file,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not generate PDF for viewing: {e}"),
+            description=f"Opening {invoice_number}", key=f"view:{invoice_number}"
+        )
     
     def confirm_pending_invoice(self):
         """Confirm the selected pending invoice"""
@@ -2972,8 +2480,8 @@ class BillingModule:
             else:
                 invoice_date = invoice['date']
                 
-            # Add to regular invoices table
-            result = self.db.add_invoice(
+            # Add to regular invoices and mark the pending invoice confirmed in one transaction
+            invoice_id, invoice_number = self.db.save_invoice_bundle(
                 customer_id=invoice['customer_id'],
                 date=invoice_date,
                 invoice_number=invoice['invoice_number'],
@@ -2983,75 +2491,19 @@ class BillingModule:
                 total=invoice['total'],
                 payment_mode=invoice['payment_mode'],
                 p_pay_no=invoice['p_pay_no'],
-                extra_charges_breakdown=invoice['extra_charges_breakdown']
+                extra_charges_breakdown=invoice['extra_charges_breakdown'],
+                items=items,
+                visit={
+                    "name": invoice['customer_name'],
+                    "city": invoice['customer_place']
+                },
+                pending_invoice_id=invoice['pending_invoice_id']
             )
             
-            if not result:
+            if not invoice_id:
                 messagebox.showerror("Error", "Could not confirm invoice")
                 return
             
-            # Extract invoice_id and invoice_number from the result
-            invoice_id, invoice_number = result
-            
-            # Add invoice items
-            for item in items:
-                self.db.add_invoice_item(
-                    invoice_id=invoice_id,
-                    product_id=item['product_id'],
-                    actual_height=item['actual_height'],
-                    actual_width=item['actual_width'],
-                    chargeable_height=item['chargeable_height'],
-                    chargeable_width=item['chargeable_width'],
-                    sqft=item['sqft'],
-                    rounded_sqft=item['rounded_sqft'],
-                    rate=item['rate'],
-                    amount=item['amount'],
-                    quantity=item['quantity']
-                )
-            
-            # Add payment if payment mode is specified
-            if invoice['payment_mode']:
-                self.db.add_payment(
-                    customer_id=invoice['customer_id'],
-                    date=invoice_date,
-                    amount=invoice['total'],
-                    mode=invoice['payment_mode'],
-                    reference=invoice['p_pay_no'],
-                    invoice_id=invoice_id
-                )
-            
-            # Add visit record
-            self.db.add_visit(
-                customer_id=invoice['customer_id'],
-                name=invoice['customer_name'],
-                city=invoice['customer_place'],
-                purpose="Billing"
-            )
-            
-            # Add work records
-            for item in items:
-                size = f"{item['chargeable_height']}\" x {item['chargeable_width']}\""
-                self.db.add_work(
-                    invoice_id=invoice_id,
-                    date=invoice_date,
-                    type=item["product_name"],
-                    size=size,
-                    quantity=item["quantity"],
-                    status="Completed"
-                )
-            
-            # Add inventory records
-            for item in items:
-                self.db.add_inventory(
-                    product_id=item['product_id'],
-                    date=invoice_date,
-                    type="stock_out",
-                    quantity=item['quantity']
-                )
-            
-            # Update pending invoice status to confirmed
-            self.db.update_pending_invoice_status(invoice['pending_invoice_id'], 'confirmed')
-            
             messagebox.showinfo("Success", "Invoice confirmed successfully")
             
             # Refresh both pending and regular invoice lists
@@ -3,6 +3,7 @@ from tkinter import ttk, messagebox
 from datetime import datetime, date
 import calendar
 import json
+from .customer_picker import CustomerPicker
 
 class CustomerHistoryModule:
     def __init__(self, parent, db, app):
@@ -14,6 +15,11 @@ class CustomerHistoryModule:
         # Create UI
         self.create_ui()
     
+    def on_activate(self):
+        """Refresh customers and outstanding balances when the section is shown again"""
+        self.load_customers()
+        self.load_outstanding()
+    
     def create_ui(self):
         """Create the customer history UI"""
         # Main container
@@ -64,9 +70,10 @@ class CustomerHistoryModule:
         # Customer filter
         ttk.Label(search_frame, text="Customer:").pack(side=tk.LEFT, padx=5)
         self.customer_var = tk.StringVar()
-        self.customer_combo = ttk.Combobox(search_frame, textvariable=self.customer_var)
+        self.customer_combo = CustomerPicker(search_frame, self.db, textvariable=self.customer_var)
         self.customer_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         self.customer_combo.bind("<<ComboboxSelected>>", self.on_customer_selected)
+        self.customer_var.trace('w', self.on_customer_text_changed)
         
         # Load customers
         self.load_customers()
@@ -145,11 +152,9 @@ class CustomerHistoryModule:
         self.load_outstanding()
     
     def load_customers(self):
-        """Load customers into combobox"""
+        """Refresh the customer picker (it looks customers up as the user types)"""
         try:
-            customers = self.db.get_customers()
-            customer_names = [customer["name"] for customer in customers]
-            self.customer_combo["values"] = customer_names
+            self.customer_combo.refresh()
         except Exception as e:
             print(f"Error loading customers: {e}")
             messagebox.showerror("Error", f"Failed to load customers: {e}")
@@ -160,15 +165,26 @@ class CustomerHistoryModule:
         if customer_name:
             # Get customer details
             try:
-                customers = self.db.get_customers()
-                for customer in customers:
-                    if customer["name"] == customer_name:
-                        self.selected_customer = customer
-                        break
+                customer = self.db.find_customer_by_name(customer_name)
+                if customer:
+                    self.selected_customer = customer
             except Exception as e:
                 print(f"Error selecting customer: {e}")
                 messagebox.showerror("Error", f"Failed to select customer: {e}")
     
+    def on_customer_text_changed(self, *args):
+        """Forget the selected customer once the typed name no longer matches it"""
+        if self.selected_customer and self.customer_var.get() != self.selected_customer["name"]:
+            self.selected_customer = None
+    
+    def show_customer(self, customer_name):
+        """Select a customer and open their full history (used by the global search)"""
+        self.customer_var.set(customer_name)
+        self.on_customer_selected(None)
+        customer = self.db.find_customer_by_name(customer_name)
+        if customer:
+            self.view_customer_history(customer)
+    
     def search_history(self):
         """Search customer history based on filters"""
         # Clear existing tabs
@@ -209,12 +225,16 @@ class CustomerHistoryModule:
                 query += " AND i.customer_id = ?"
                 params.append(customer_id)
             
-            # Add year and month filtering
-            query += " AND strftime('%Y', i.date) = ?"
-            params.append(year)
+            # Add year and month filtering as a date range so the date index is used
+            month_start = date(int(year), month_num, 1)
+            if month_num == 12:
+                next_month_start = date(int(year) + 1, 1, 1)
+            else:
+                next_month_start = date(int(year), month_num + 1, 1)
             
-            query += " AND strftime('%m', i.date) = ?"
-            params.append(f"{month_num:02d}")
+            query += " AND i.date >= ? AND i.date < ?"
+            params.append(month_start.strftime("%Y-%m-%d"))
+            params.append(next_month_start.strftime("%Y-%m-%d"))
             
             # Execute query
             conn = self.db.get_connection()
@@ -230,6 +250,9 @@ class CustomerHistoryModule:
                 invoice = dict(zip(column_names, row))
                 invoices.append(invoice)
             
+            # Return the connection to the pool before building the tabs
+            conn.close()
+            
             # Group invoices by month
             monthly_invoices = {}
             for invoice in invoices:
@@ -300,9 +323,6 @@ class CustomerHistoryModule:
                 self.history_notebook.add(no_data_frame, text="No Data")
                 ttk.Label(no_data_frame, text="No invoices found for the selected criteria").pack(pady=20)
             
-            # Close connection
-            conn.close()
-            
         except Exception as e:
             print(f"Error searching history: {e}")
             messagebox.showerror("Error", f"Failed to search history: {e}")
@@ -513,28 +533,14 @@ class CustomerHistoryModule:
         
         # Get totals
         try:
-            # Get total invoice amount
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-            SELECT COALESCE(SUM(total), 0) as total_invoices
-            FROM invoices WHERE customer_id = ?
-            """, (customer_id,))
+            # Read totals from the maintained customer balance ledger
+            balance = self.db.get_customer_balance(customer_id)
+            if balance is None:
+                raise RuntimeError("Could not read customer balance")
             
-            result = cursor.fetchone()
-            total_invoices = result[0] if result and result[0] is not None else 0
-            
-            # Get total payments
-            cursor.execute("""
-            SELECT COALESCE(SUM(amount), 0) as total_payments
-            FROM payments WHERE customer_id = ?
-            """, (customer_id,))
-            
-            result = cursor.fetchone()
-            total_payments = result[0] if result and result[0] is not None else 0
-            
-            # Calculate outstanding
-            outstanding = total_invoices - total_payments
+            total_invoices = balance["total_invoices"]
+            total_payments = balance["total_payments"]
+            outstanding = balance["outstanding"]
             
             # Display summary
             inv_frame = ttk.Frame(summary_frame)
@@ -552,9 +558,6 @@ class CustomerHistoryModule:
             ttk.Label(out_frame, text="Outstanding:", font=("Arial", 10, "bold")).pack(side=tk.LEFT)
             ttk.Label(out_frame, text=f"{outstanding:.2f}", font=("Arial", 10, "bold")).pack(side=tk.RIGHT)
             
-            # Close connection
-            conn.close()
-            
         except Exception as e:
             print(f"Error calculating payment summary: {e}")
             messagebox.showerror("Error", f"Failed to calculate payment summary: {e}")
@@ -605,12 +608,7 @@ class CustomerHistoryModule:
         
         # Get customer from database
         try:
-            customers = self.db.get_customers()
-            customer = None
-            for c in customers:
-                if c["name"] == customer_name:
-                    customer = c
-                    break
+            customer = self.db.find_customer_by_name(customer_name)
             
             if not customer:
                 messagebox.showerror("Error", "Customer not found")
@@ -668,28 +666,14 @@ class CustomerHistoryModule:
             
             # Get totals
             try:
-                # Get total invoice amount
-                conn = self.db.get_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                SELECT COALESCE(SUM(total), 0) as total_invoices
-                FROM invoices WHERE customer_id = ?
-                """, (customer["customer_id"],))
-                
-                result = cursor.fetchone()
-                total_invoices = result[0] if result and result[0] is not None else 0
+                # Read totals from the maintained customer balance ledger
+                balance = self.db.get_customer_balance(customer["customer_id"])
+                if balance is None:
+                    raise RuntimeError("Could not read customer balance")
                 
-                # Get total payments
-                cursor.execute("""
-                SELECT COALESCE(SUM(amount), 0) as total_payments
-                FROM payments WHERE customer_id = ?
-                """, (customer["customer_id"],))
-                
-                result = cursor.fetchone()
-                total_payments = result[0] if result and result[0] is not None else 0
-                
-                # Calculate outstanding
-                outstanding = total_invoices - total_payments
+                total_invoices = balance["total_invoices"]
+                total_payments = balance["total_payments"]
+                outstanding = balance["outstanding"]
                 
                 # Display summary
                 inv_frame = ttk.Frame(summary_frame)
@@ -707,9 +691,6 @@ class CustomerHistoryModule:
                 ttk.Label(out_frame, text="Outstanding:", font=("Arial", 10, "bold")).pack(side=tk.LEFT)
                 ttk.Label(out_frame, text=f"{outstanding:.2f}", font=("Arial", 10, "bold")).pack(side=tk.RIGHT)
                 
-                # Close connection
-                conn.close()
-                
             except Exception as e:
                 print(f"Error calculating payment summary: {e}")
                 messagebox.showerror("Error", f"Failed to calculate payment summary: {e}")
@@ -752,13 +733,13 @@ class CustomerHistoryModule:
                 customer_data = self.db.get_customer_by_id(customer["customer_id"])
                 
                 if customer_data:
-                    # Add to recycle bin
-                    self.db.add_to_recycle_bin("customers", customer["customer_id"], customer_data)
-                    
                     # Delete customer from database
                     success = self.db.delete_customer(customer["customer_id"])
                     
                     if success:
+                        # Add to recycle bin only once the customer is really gone
+                        self.db.add_to_recycle_bin("customers", customer["customer_id"], customer_data)
+                        
                         # Close parent dialog if provided
                         if parent_dialog:
                             parent_dialog.destroy()
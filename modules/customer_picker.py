@@ -0,0 +1,186 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Keys that move around or pick from the list instead of changing the text
+NAVIGATION_KEYS = {"Up", "Down", "Left", "Right", "Return", "KP_Enter", "Escape", "Tab",
+                   "Home", "End", "Prior", "Next", "Shift_L", "Shift_R", "Control_L", "Control_R",
+                   "Alt_L", "Alt_R"}
+
+class CustomerPicker(ttk.Combobox):
+    """Customer combobox with debounced type-ahead
+    
+    Matches come from the database's customer prefix index (name, any word
+    of the name, or phone number) instead of every name being loaded into
+    the list up front. Once typing pauses the top max_results matches drop
+    down under the entry while the cursor stays in it; Down moves into the
+    list and Enter picks the best match. <<ComboboxSelected>> fires for a
+    pick just like a plain combobox.
+    """
+    
+    def __init__(self, parent, db, max_results=20, debounce_ms=200, **kwargs):
+        """Initialize the picker; other options are passed to ttk.Combobox"""
+        kwargs.pop("values", None)
+        super().__init__(parent, postcommand=self.update_matches, **kwargs)
+        self.db = db
+        self.max_results = max_results
+        self.debounce_ms = debounce_ms
+        self._timer = None
+        self._matched_text = None
+        self._typing_post = False
+        self._popdown = None
+        
+        self.bind("<KeyRelease>", self.on_key_release, add="+")
+        self.bind("<Return>", self.pick_best_match, add="+")
+        self.bind("<KP_Enter>", self.pick_best_match, add="+")
+        self.bind("<Down>", self.enter_list)
+        self.bind("<FocusOut>", self.on_focus_out, add="+")
+        self.bind("<Destroy>", self.on_destroy, add="+")
+        self.winfo_toplevel().bind("<Button>", self.on_window_click, add="+")
+    
+    def refresh(self):
+        """Forget the current matches (after customers change); they reload on next use"""
+        self._matched_text = None
+        self["values"] = ()
+    
+    def update_matches(self):
+        """Fill the list with the top matches for the typed text"""
+        self._cancel_timer()
+        text = self.get()
+        if text == self._matched_text:
+            # Already looked up (e.g. by the debounce just before the list opened)
+            return
+        try:
+            self["values"] = self.db.search_customers(text, self.max_results)
+            self._matched_text = text
+        except tk.TclError:
+            pass
+        except Exception as e:
+            print(f"Error searching customers: {e}")
+    
+    def on_key_release(self, event):
+        """Look up matches once typing pauses"""
+        if event.keysym in NAVIGATION_KEYS:
+            return
+        self._cancel_timer()
+        self._timer = self.after(self.debounce_ms, self.show_matches)
+    
+    def show_matches(self):
+        """Look up the typed text and drop the matches down under the entry"""
+        self.update_matches()
+        if self.get().strip() and self["values"] and str(self.tk.call("focus")) == str(self):
+            self._post_for_typing()
+        else:
+            self.hide_matches()
+    
+    def hide_matches(self):
+        """Close the dropdown list if it is open"""
+        if self._is_posted():
+            self.tk.call("ttk::combobox::Unpost", self)
+    
+    def enter_list(self, event=None):
+        """Down arrow: move into the dropdown list, opening it first if needed"""
+        if not self._is_posted():
+            # Normal combobox behaviour: open the list with the focus in it
+            self.tk.call("ttk::combobox::Post", self)
+            return "break"
+        listbox = f"{self}.popdown.f.l"
+        self.tk.call("focus", listbox)
+        self.tk.call(listbox, "selection", "clear", 0, "end")
+        self.tk.call(listbox, "selection", "set", 0)
+        self.tk.call(listbox, "activate", 0)
+        return "break"
+    
+    def pick_best_match(self, event=None):
+        """Complete the typed text to the best match and report it as selected"""
+        self.hide_matches()
+        text = self.get().strip()
+        if not text:
+            return
+        self.update_matches()
+        matches = self["values"]
+        if not matches:
+            return
+        if text not in matches:
+            self.set(matches[0])
+        self.icursor(tk.END)
+        self.event_generate("<<ComboboxSelected>>")
+    
+    def on_focus_out(self, event):
+        """Close a typed-ahead list when the focus leaves for anything but the list"""
+        if self._typing_post:
+            self.after_idle(self._hide_if_unfocused)
+    
+    def on_window_click(self, event):
+        """Close a typed-ahead list on a click elsewhere in the window"""
+        try:
+            if self._typing_post and event.widget is not self:
+                self.hide_matches()
+        except tk.TclError:
+            pass
+    
+    def on_destroy(self, event):
+        """Stop a pending lookup when the widget goes away"""
+        if event.widget is self:
+            self._cancel_timer()
+    
+    def _post_for_typing(self):
+        """Open the dropdown list but leave the keyboard focus in the entry"""
+        if self._is_posted():
+            return
+        self._typing_post = True
+        self._watch_popdown()
+        self.tk.call("ttk::combobox::Post", self)
+    
+    def _watch_popdown(self):
+        """Run our Map/Unmap handlers after the combobox's own popdown bindings"""
+        if self._popdown is not None:
+            return
+        self._popdown = str(self.tk.call("ttk::combobox::PopdownWindow", self))
+        tag = f"CustomerPicker{id(self)}"
+        listbox = f"{self._popdown}.f.l"
+        self.tk.call("bindtags", self._popdown, (self._popdown, "ComboboxPopdown", tag, "all"))
+        self.tk.call("bindtags", listbox, (listbox, "ComboboxListbox", "Listbox", tag, f"{self._popdown}.f", "all"))
+        self.tk.call("bind", tag, "<Map>", self.register(self._keep_focus_in_entry))
+        self.tk.call("bind", tag, "<Unmap>", self.register(self._popdown_closed))
+        # Escape in the list closes it; bring the cursor back to the entry
+        self.tk.call("bind", tag, "<Escape>", self.register(self.focus_set))
+    
+    def _keep_focus_in_entry(self):
+        """Undo the grab and list focus a popdown takes when it opens for typing"""
+        if not self._typing_post:
+            return
+        self.tk.call("ttk::releaseGrab", self._popdown)
+        self.focus_set()
+        self.icursor(tk.END)
+        self.selection_clear()
+    
+    def _popdown_closed(self):
+        """The dropdown list was closed"""
+        self._typing_post = False
+    
+    def _hide_if_unfocused(self):
+        """Close the list unless the focus moved into it"""
+        try:
+            focus = str(self.tk.call("focus"))
+            if focus != str(self) and not focus.startswith(f"{self}.popdown"):
+                self.hide_matches()
+        except tk.TclError:
+            pass
+    
+    def _is_posted(self):
+        """Check whether the dropdown list is open"""
+        popdown = f"{self}.popdown"
+        try:
+            return (bool(int(self.tk.call("winfo", "exists", popdown)))
+                    and bool(int(self.tk.call("winfo", "ismapped", popdown))))
+        except tk.TclError:
+            return False
+    
+    def _cancel_timer(self):
+        """Cancel a pending debounced lookup"""
+        if self._timer is not None:
+            try:
+                self.after_cancel(self._timer)
+            except tk.TclError:
+                pass
+            self._timer = None
@@ -5,12 +5,6 @@ import calendar
 import os
 import platform
 import subprocess
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
 
 class DailyLedgerModule:
     def __init__(self, parent, db, app):
@@ -21,6 +15,10 @@ class DailyLedgerModule:
         # Create UI
         self.create_ui()
     
+    def on_activate(self):
+        """Refresh the ledger when the section is shown again"""
+        self.search_ledger()
+    
     def create_ui(self):
         """Create the daily ledger UI"""
         # Main container
@@ -96,10 +94,6 @@ class DailyLedgerModule:
     
     def search_ledger(self):
         """Search ledger based on date range"""
-        # Clear existing tabs
-        for tab_id in self.ledger_notebook.tabs():
-            self.ledger_notebook.forget(tab_id)
-        
         # Get date range
         from_date_str = self.from_date_var.get()
         to_date_str = self.to_date_var.get()
@@ -108,85 +102,94 @@ class DailyLedgerModule:
             # Parse dates using datetime.strptime for better error handling
             from_date = datetime.strptime(from_date_str, "%d/%m/%Y").date()
             to_date = datetime.strptime(to_date_str, "%d/%m/%Y").date()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid dates in DD/MM/YYYY format")
+            return
+        
+        # Get ledger data in the background; a newer search replaces a pending one
+        self.app.tasks.submit(
+            self.db.get_daily_ledger, from_date, to_date,
+            on_done=self.show_ledger,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not search ledger: {e}"),
+            description="Loading ledger", key="ledger_search"
+        )
+    
+    def show_ledger(self, ledger_data):
+        """Show ledger entries as one tab per date"""
+        # Clear existing tabs
+        for tab_id in self.ledger_notebook.tabs():
+            self.ledger_notebook.forget(tab_id)
+        
+        # Group by date
+        daily_data = {}
+        for item in ledger_data:
+            date_str = item["date"]
+            if date_str not in daily_data:
+                daily_data[date_str] = []
+            daily_data[date_str].append(item)
+        
+        # Create tabs for each date
+        for date_str in sorted(daily_data.keys()):
+            # Parse date
+            date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
+            formatted_date = date_obj.strftime("%d %b %Y")
             
-            # Get ledger data
-            ledger_data = self.db.get_daily_ledger(from_date, to_date)
+            # Create tab
+            tab_frame = ttk.Frame(self.ledger_notebook)
+            self.ledger_notebook.add(tab_frame, text=formatted_date)
             
-            # Group by date
-            daily_data = {}
-            for item in ledger_data:
-                date_str = item["date"]
-                if date_str not in daily_data:
-                    daily_data[date_str] = []
-                daily_data[date_str].append(item)
+            # Create treeview for ledger entries
+            ledger_tree = ttk.Treeview(tab_frame, columns=("s_no", "actual_height", "actual_width", "chargeable_height", "chargeable_width", "sqft"), show="headings")
+            ledger_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
             
-            # Create tabs for each date
-            for date_str in sorted(daily_data.keys()):
-                # Parse date
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                formatted_date = date_obj.strftime("%d %b %Y")
-                
-                # Create tab
-                tab_frame = ttk.Frame(self.ledger_notebook)
-                self.ledger_notebook.add(tab_frame, text=formatted_date)
-                
-                # Create treeview for ledger entries
-                ledger_tree = ttk.Treeview(tab_frame, columns=("s_no", "actual_height", "actual_width", "chargeable_height", "chargeable_width", "sqft"), show="headings")
-                ledger_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-                
-                # Define headings
-                ledger_tree.heading("s_no", text="S.No")
-                ledger_tree.heading("actual_height", text="Actual Height")
-                ledger_tree.heading("actual_width", text="Actual Width")
-                ledger_tree.heading("chargeable_height", text="Chargeable Height")
-                ledger_tree.heading("chargeable_width", text="Chargeable Width")
-                ledger_tree.heading("sqft", text="SQ.FT")
-                
-                # Define columns
-                ledger_tree.column("s_no", width=50)
-                ledger_tree.column("actual_height", width=100)
-                ledger_tree.column("actual_width", width=100)
-                ledger_tree.column("chargeable_height", width=120)
-                ledger_tree.column("chargeable_width", width=120)
-                ledger_tree.column("sqft", width=80)
-                
-                # Add entries
-                total_sqft = 0
-                for i, item in enumerate(daily_data[date_str], 1):
-                    actual_height = f"{item['actual_height']}\""
-                    actual_width = f"{item['actual_width']}\""
-                    chargeable_height = f"{item['chargeable_height']}\""
-                    chargeable_width = f"{item['chargeable_width']}\""
-                    sqft = item["sqft"]
-                    total_sqft += sqft
-                    
-                    ledger_tree.insert("", "end", values=(
-                        i,
-                        actual_height,
-                        actual_width,
-                        chargeable_height,
-                        chargeable_width,
-                        f"{sqft:.2f}"
-                    ))
-                
-                # Add total row
-                ledger_tree.insert("", "end", values=("", "", "", "", "Total:", f"{total_sqft:.2f}"))
+            # Define headings
+            ledger_tree.heading("s_no", text="S.No")
+            ledger_tree.heading("actual_height", text="Actual Height")
+            ledger_tree.heading("actual_width", text="Actual Width")
+            ledger_tree.heading("chargeable_height", text="Chargeable Height")
+            ledger_tree.heading("chargeable_width", text="Chargeable Width")
+            ledger_tree.heading("sqft", text="SQ.FT")
+            
+            # Define columns
+            ledger_tree.column("s_no", width=50)
+            ledger_tree.column("actual_height", width=100)
+            ledger_tree.column("actual_width", width=100)
+            ledger_tree.column("chargeable_height", width=120)
+            ledger_tree.column("chargeable_width", width=120)
+            ledger_tree.column("sqft", width=80)
+            
+            # Add entries
+            total_sqft = 0
+            for i, item in enumerate(daily_data[date_str], 1):
+                actual_height = f"{item['actual_height']}\""
+                actual_width = f"{item['actual_width']}\""
+                chargeable_height = f"{item['chargeable_height']}\""
+                chargeable_width = f"{item['chargeable_width']}\""
+                sqft = item["sqft"]
+                total_sqft += sqft
                 
-                # Add scrollbar
-                scrollbar = ttk.Scrollbar(tab_frame, orient=tk.VERTICAL, command=ledger_tree.yview)
-                scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-                ledger_tree.configure(yscrollcommand=scrollbar.set)
+                ledger_tree.insert("", "end", values=(
+                    i,
+                    actual_height,
+                    actual_width,
+                    chargeable_height,
+                    chargeable_width,
+                    f"{sqft:.2f}"
+                ))
             
-            # If no data found
-            if not daily_data:
-                no_data_frame = ttk.Frame(self.ledger_notebook)
-                self.ledger_notebook.add(no_data_frame, text="No Data")
-                ttk.Label(no_data_frame, text="No ledger entries found for the selected date range").pack(pady=20)
+            # Add total row
+            ledger_tree.insert("", "end", values=("", "", "", "", "Total:", f"{total_sqft:.2f}"))
             
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid dates in DD/MM/YYYY format")
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not search ledger: {e}")
+            # Add scrollbar
+            scrollbar = ttk.Scrollbar(tab_frame, orient=tk.VERTICAL, command=ledger_tree.yview)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            ledger_tree.configure(yscrollcommand=scrollbar.set)
+        
+        # If no data found
+        if not daily_data:
+            no_data_frame = ttk.Frame(self.ledger_notebook)
+            self.ledger_notebook.add(no_data_frame, text="No Data")
+            ttk.Label(no_data_frame, text="No ledger entries found for the selected date range").pack(pady=20)
     
     def export_pdf(self):
         """Export ledger to PDF"""
@@ -198,10 +201,11 @@ class DailyLedgerModule:
             # Parse dates using datetime.strptime for better error handling
             from_date = datetime.strptime(from_date_str, "%d/%m/%Y").date()
             to_date = datetime.strptime(to_date_str, "%d/%m/%Y").date()
-            
-            # Get ledger data
-            ledger_data = self.db.get_daily_ledger(from_date, to_date)
-            
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid dates in DD/MM/YYYY format")
+            return
+        
+        def on_loaded(ledger_data):
             if not ledger_data:
                 messagebox.showinfo("Info", "No data to export")
                 return
@@ -216,92 +220,122 @@ class DailyLedgerModule:
             if not file_path:
                 return
             
-            # Create PDF
-            doc = SimpleDocTemplate(file_path, pagesize=letter)
-            elements = []
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            
-            # Title
-            title = Paragraph("<b>DAILY LEDGER</b>", styles["Heading1"])
-            elements.append(title)
-            elements.append(Spacer(1, 0.2*inch))
+            # Build the PDF in the background
+            self.app.tasks.submit(
+                self.write_ledger_pdf, file_path, ledger_data, from_date_str, to_date_str,
+                on_done=self.open_exported_pdf,
+                on_error=lambda e: messagebox.showerror("Error", f"Could not export PDF: {e}"),
+                description="Exporting ledger PDF", key="ledger_export"
+            )
+        
+        # Get ledger data
+        self.app.tasks.submit(
+            self.db.get_daily_ledger, from_date, to_date,
+            on_done=on_loaded,
+            on_error=lambda e: messagebox.showerror("Error", f"Could not export PDF: {e}"),
+            description="Loading ledger", key="ledger_export"
+        )
+    
+    def write_ledger_pdf(self, file_path, ledger_data, from_date_str, to_date_str):
+        """Write the ledger PDF to file_path (no Tk calls, runs in the background)"""
+        # reportlab is only loaded when a PDF is exported
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib import colors
+        
+        # Create PDF
+        doc = SimpleDocTemplate(file_path, pagesize=letter)
+        elements = []
+        
+        # Get styles
+        styles = getSampleStyleSheet()
+        
+        # Title
+        title = Paragraph("<b>DAILY LEDGER</b>", styles["Heading1"])
+        elements.append(title)
+        elements.append(Spacer(1, 0.2*inch))
+        
+        # Date range
+        date_range = f"From: {from_date_str} To: {to_date_str}"
+        date_para = Paragraph(date_range, styles["Normal"])
+        elements.append(date_para)
+        elements.append(Spacer(1, 0.2*inch))
+        
+        # Group by date
+        daily_data = {}
+        for item in ledger_data:
+            date_str = item["date"]
+            if date_str not in daily_data:
+                daily_data[date_str] = []
+            daily_data[date_str].append(item)
+        
+        # Create table for each date
+        for date_str in sorted(daily_data.keys()):
+            # Parse date
+            date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
+            formatted_date = date_obj.strftime("%d %B %Y")
             
-            # Date range
-            date_range = f"From: {from_date_str} To: {to_date_str}"
-            date_para = Paragraph(date_range, styles["Normal"])
-            elements.append(date_para)
-            elements.append(Spacer(1, 0.2*inch))
+            # Date heading
+            date_heading = Paragraph(f"<b>Date: {formatted_date}</b>", styles["Heading2"])
+            elements.append(date_heading)
+            elements.append(Spacer(1, 0.1*inch))
             
-            # Group by date
-            daily_data = {}
-            for item in ledger_data:
-                date_str = item["date"]
-                if date_str not in daily_data:
-                    daily_data[date_str] = []
-                daily_data[date_str].append(item)
+            # Table data
+            table_data = [["S.No", "Actual Height", "Actual Width", "Chargeable Height", "Chargeable Width", "SQ.FT"]]
             
-            # Create table for each date
-            for date_str in sorted(daily_data.keys()):
-                # Parse date
-                date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                formatted_date = date_obj.strftime("%d %B %Y")
-                
-                # Date heading
-                date_heading = Paragraph(f"<b>Date: {formatted_date}</b>", styles["Heading2"])
-                elements.append(date_heading)
-                elements.append(Spacer(1, 0.1*inch))
-                
-                # Table data
-                table_data = [["S.No", "Actual Height", "Actual Width", "Chargeable Height", "Chargeable Width", "SQ.FT"]]
-                
-                total_sqft = 0
-                for i, item in enumerate(daily_data[date_str], 1):
-                    actual_height = f"{item['actual_height']}\""
-                    actual_width = f"{item['actual_width']}\""
-                    chargeable_height = f"{item['chargeable_height']}\""
-                    chargeable_width = f"{item['chargeable_width']}\""
-                    sqft = item["sqft"]
-                    total_sqft += sqft
-                    
-                    table_data.append([
-                        str(i),
-                        actual_height,
-                        actual_width,
-                        chargeable_height,
-                        chargeable_width,
-                        f"{sqft:.2f}"
-                    ])
+            total_sqft = 0
+            for i, item in enumerate(daily_data[date_str], 1):
+                actual_height = f"{item['actual_height']}\""
+                actual_width = f"{item['actual_width']}\""
+                chargeable_height = f"{item['chargeable_height']}\""
+                chargeable_width = f"{item['chargeable_width']}\""
+                sqft = item["sqft"]
+                total_sqft += sqft
                 
-                # Add total row
-                table_data.append(["", "", "", "", "Total:", f"{total_sqft:.2f}"])
-                
-                # Create table
-                table = Table(table_data, colWidths=[0.5*inch, 1*inch, 1*inch, 1.2*inch, 1.2*inch, 1*inch])
-                table.setStyle(TableStyle([
-                    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                    ('ALIGN', (0, 1), (-2, -2), 'CENTER'),
-                    ('ALIGN', (-1, -1), (-1, -1), 'RIGHT'),
-                    ('ALIGN', (0, -1), (-2, -1), 'RIGHT'),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-                    ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-                    ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                
-                elements.append(table)
-                elements.append(Spacer(1, 0.3*inch))
+                table_data.append([
+                    str(i),
+                    actual_height,
+                    actual_width,
+                    chargeable_height,
+                    chargeable_width,
+                    f"{sqft:.2f}"
+                ])
             
-            # Build PDF
-            doc.build(elements)
+            # Add total row
+            table_data.append(["", "", "", "", "Total:", f"{total_sqft:.2f}"])
             
-            messagebox.showinfo("Success", "PDF exported successfully")
+            # Create table
+            table = Table(table_data, colWidths=[0.5*inch, 1*inch, 1*inch, 1.2*inch, 1.2*inch, 1*inch])
+            table.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('ALIGN', (0, 1), (-2, -2), 'CENTER'),
+                ('ALIGN', (-1, -1), (-1, -1), 'RIGHT'),
+                ('ALIGN', (0, -1), (-2, -1), 'RIGHT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+                ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+                ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]))
             
+            elements.append(table)
+            elements.append(Spacer(1, 0.3*inch))
+        
+        # Build PDF
+        doc.build(elements)
+        
+        return file_path
+    
+    def open_exported_pdf(self, file_path):
+        """Report a finished export and open the PDF"""
+        messagebox.showinfo("Success", "PDF exported successfully")
+        
+        try:
             # Open PDF
             if platform.system() == "Windows":
                 os.startfile(file_path)
@@ -309,8 +343,5 @@ class DailyLedgerModule:
                 subprocess.call(["open", file_path])
             else:  # Linux
                 subprocess.call(["xdg-open", file_path])
-                
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid dates in DD/MM/YYYY format")
         except Exception as e:
-            messagebox.showerror("Error", f"Could not export PDF: {e}")
\ No newline at end of file
+            messagebox.showerror("Error", f"Could not open PDF: {e}")
\ No newline at end of file
@@ -11,6 +11,10 @@ class InventoryModule:
         # Create UI
         self.create_ui()
     
+    def on_activate(self):
+        """Refresh products when the section is shown again"""
+        self.load_products()
+    
     def create_ui(self):
         """Create the inventory UI"""
         # Main container
@@ -435,11 +439,8 @@ class InventoryModule:
                     return
                 
                 # Get product ID
-                product_id = None
-                for product in products:
-                    if f"{product['name']} ({product['type']})" == product_name:
-                        product_id = product["product_id"]
-                        break
+                product = self.db.find_product_by_label(product_name)
+                product_id = product["product_id"] if product else None
                 
                 if not product_id:
                     messagebox.showerror("Error", "Product not found")
@@ -584,10 +585,9 @@ class InventoryModule:
                 
                 # If we can't find the current movement, try to find by product name
                 if current_product_id is None:
-                    for product in products:
-                        if f"{product['name']} ({product['type']})" == selected_product:
-                            current_product_id = product["product_id"]
-                            break
+                    product = self.db.find_product_by_label(selected_product)
+                    if product:
+                        current_product_id = product["product_id"]
                 
                 if current_product_id is None:
                     messagebox.showerror("Error", "Product not found")
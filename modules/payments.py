@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, date, timedelta
 import calendar
+from .customer_picker import CustomerPicker
 
 class PaymentsModule:
     def __init__(self, parent, db, app):
@@ -12,6 +13,10 @@ class PaymentsModule:
         # Create UI
         self.create_ui()
     
+    def on_activate(self):
+        """Refresh the customer list when the section is shown again"""
+        self.load_customers()
+    
     def create_ui(self):
         """Create the payments UI"""
         # Main container
@@ -57,7 +62,7 @@ class PaymentsModule:
         # Customer filter
         ttk.Label(filter_frame, text="Customer:").pack(side=tk.LEFT, padx=5)
         self.customer_var = tk.StringVar()
-        self.customer_combo = ttk.Combobox(filter_frame, textvariable=self.customer_var)
+        self.customer_combo = CustomerPicker(filter_frame, self.db, textvariable=self.customer_var)
         self.customer_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
         # Date range
@@ -388,10 +393,8 @@ class PaymentsModule:
         self.category_summary_tree.configure(yscrollcommand=scrollbar.set)
     
     def load_customers(self):
-        """Load customers into combobox"""
-        customers = self.db.get_customers()
-        customer_names = [customer["name"] for customer in customers]
-        self.customer_combo["values"] = customer_names
+        """Refresh the customer picker (it looks customers up as the user types)"""
+        self.customer_combo.refresh()
     
     def search_incoming_payments(self):
         """Search incoming payments based on filters"""
@@ -421,11 +424,8 @@ class PaymentsModule:
             # Get customer ID if selected
             customer_id = None
             if customer_name:
-                customers = self.db.get_customers()
-                for customer in customers:
-                    if customer["name"] == customer_name:
-                        customer_id = customer["customer_id"]
-                        break
+                customer = self.db.find_customer_by_name(customer_name)
+                customer_id = customer["customer_id"] if customer else None
             
             # Get payments based on filters
             if customer_id:
@@ -605,61 +605,16 @@ class PaymentsModule:
             self.customer_summary_tree.delete(item)
         
         try:
-            # Get customers
-            customers = self.db.get_customers()
-            
-            for customer in customers:
-                # Get invoices for customer
-                invoices = self.db.get_invoices_by_customer(customer["customer_id"])
-                
-                # Calculate total invoices within date range
-                total_invoices = 0
-                for invoice in invoices:
-                    # Parse invoice date
-                    try:
-                        if isinstance(invoice["date"], str):
-                            invoice_date = datetime.strptime(invoice["date"], "%Y-%m-%d").date()
-                        else:
-                            invoice_date = invoice["date"]
-                    except (ValueError, TypeError):
-                        # Skip if date is invalid
-                        continue
-                    
-                    # Check if invoice is within date range
-                    if from_date <= invoice_date <= to_date:
-                        total_invoices += invoice["total"]
-                
-                # Get payments for customer
-                payments = self.db.get_payments_by_customer(customer["customer_id"])
-                
-                # Calculate total payments within date range
-                total_payments = 0
-                for payment in payments:
-                    # Parse payment date
-                    try:
-                        if isinstance(payment["date"], str):
-                            payment_date = datetime.strptime(payment["date"], "%Y-%m-%d").date()
-                        else:
-                            payment_date = payment["date"]
-                    except (ValueError, TypeError):
-                        # Skip if date is invalid
-                        continue
-                    
-                    # Check if payment is within date range
-                    if from_date <= payment_date <= to_date:
-                        total_payments += payment["amount"]
-                
-                # Calculate outstanding
-                outstanding = total_invoices - total_payments
-                
-                # Add to treeview if there are any transactions
-                if total_invoices > 0 or total_payments > 0:
-                    self.customer_summary_tree.insert("", "end", values=(
-                        customer["name"],
-                        f"{total_invoices:.2f}",
-                        f"{total_payments:.2f}",
-                        f"{outstanding:.2f}"
-                    ))
+            # Get invoiced/paid totals for every customer in one grouped query
+            summary = self.db.get_customer_summary(from_date, to_date)
+            
+            for row in summary:
+                self.customer_summary_tree.insert("", "end", values=(
+                    row["name"],
+                    f"{row['total_invoices']:.2f}",
+                    f"{row['total_payments']:.2f}",
+                    f"{row['outstanding']:.2f}"
+                ))
             
         except Exception as e:
             print(f"Error loading customer summary: {e}")
@@ -713,14 +668,9 @@ class PaymentsModule:
         # Payment details
         ttk.Label(dialog, text="Customer:").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
         customer_var = tk.StringVar()
-        customer_combo = ttk.Combobox(dialog, textvariable=customer_var)
+        customer_combo = CustomerPicker(dialog, self.db, textvariable=customer_var)
         customer_combo.grid(row=0, column=1, padx=10, pady=5, sticky=tk.EW)
         
-        # Load customers
-        customers = self.db.get_customers()
-        customer_names = [customer["name"] for customer in customers]
-        customer_combo["values"] = customer_names
-        
         ttk.Label(dialog, text="Date:").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
         date_var = tk.StringVar(value=date.today().strftime("%d/%m/%Y"))
         ttk.Entry(dialog, textvariable=date_var).grid(row=1, column=1, padx=10, pady=5, sticky=tk.EW)
@@ -756,11 +706,8 @@ class PaymentsModule:
                     messagebox.showerror("Error", "Please select a customer")
                     return
                 
-                customer_id = None
-                for customer in customers:
-                    if customer["name"] == customer_name:
-                        customer_id = customer["customer_id"]
-                        break
+                customer = self.db.find_customer_by_name(customer_name)
+                customer_id = customer["customer_id"] if customer else None
                 
                 if not customer_id:
                     messagebox.showerror("Error", "Customer not found")
@@ -824,14 +771,9 @@ class PaymentsModule:
         # Payment details
         ttk.Label(dialog, text="Customer:").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
         customer_var = tk.StringVar()
-        customer_combo = ttk.Combobox(dialog, textvariable=customer_var)
+        customer_combo = CustomerPicker(dialog, self.db, textvariable=customer_var)
         customer_combo.grid(row=0, column=1, padx=10, pady=5, sticky=tk.EW)
         
-        # Load customers
-        customers = self.db.get_customers()
-        customer_names = [customer["name"] for customer in customers]
-        customer_combo["values"] = customer_names
-        
         ttk.Label(dialog, text="Date:").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
         date_var = tk.StringVar(value=date.today().strftime("%d/%m/%Y"))
         ttk.Entry(dialog, textvariable=date_var).grid(row=1, column=1, padx=10, pady=5, sticky=tk.EW)
@@ -867,11 +809,8 @@ class PaymentsModule:
                     messagebox.showerror("Error", "Please select a customer")
                     return
                 
-                customer_id = None
-                for customer in customers:
-                    if customer["name"] == customer_name:
-                        customer_id = customer["customer_id"]
-                        break
+                customer = self.db.find_customer_by_name(customer_name)
+                customer_id = customer["customer_id"] if customer else None
                 
                 if not customer_id:
                     messagebox.showerror("Error", "Customer not found")
@@ -1032,12 +971,8 @@ class PaymentsModule:
         # Find the payment in the database to get additional details like notes
         try:
             # Get customer ID
-            customers = self.db.get_customers()
-            customer_id = None
-            for customer in customers:
-                if customer["name"] == customer_name:
-                    customer_id = customer["customer_id"]
-                    break
+            customer = self.db.find_customer_by_name(customer_name)
+            customer_id = customer["customer_id"] if customer else None
             
             if not customer_id:
                 messagebox.showerror("Error", "Customer not found")
@@ -1068,13 +1003,9 @@ class PaymentsModule:
             # Payment details
             ttk.Label(dialog, text="Customer:").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
             customer_var = tk.StringVar(value=customer_name)
-            customer_combo = ttk.Combobox(dialog, textvariable=customer_var, state="readonly")
+            customer_combo = CustomerPicker(dialog, self.db, textvariable=customer_var)
             customer_combo.grid(row=0, column=1, padx=10, pady=5, sticky=tk.EW)
             
-            # Load customers
-            customer_names = [customer["name"] for customer in customers]
-            customer_combo["values"] = customer_names
-            
             ttk.Label(dialog, text="Date:").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
             date_var = tk.StringVar(value=date_str)
             ttk.Entry(dialog, textvariable=date_var).grid(row=1, column=1, padx=10, pady=5, sticky=tk.EW)
@@ -1110,11 +1041,8 @@ class PaymentsModule:
                         messagebox.showerror("Error", "Please select a customer")
                         return
                     
-                    customer_id = None
-                    for customer in customers:
-                        if customer["name"] == customer_name:
-                            customer_id = customer["customer_id"]
-                            break
+                    customer = self.db.find_customer_by_name(customer_name)
+                    customer_id = customer["customer_id"] if customer else None
                     
                     if not customer_id:
                         messagebox.showerror("Error", "Customer not found")
@@ -1418,12 +1346,8 @@ class PaymentsModule:
         # Find the payment in the database to get additional details like notes
         try:
             # Get customer ID
-            customers = self.db.get_customers()
-            customer_id = None
-            for customer in customers:
-                if customer["name"] == customer_name:
-                    customer_id = customer["customer_id"]
-                    break
+            customer = self.db.find_customer_by_name(customer_name)
+            customer_id = customer["customer_id"] if customer else None
             
             if not customer_id:
                 messagebox.showerror("Error", "Customer not found")
@@ -1644,12 +1568,7 @@ class PaymentsModule:
         customer_name = item["values"][0]
         
         # Get customer from database
-        customers = self.db.get_customers()
-        customer = None
-        for c in customers:
-            if c["name"] == customer_name:
-                customer = c
-                break
+        customer = self.db.find_customer_by_name(customer_name)
         
         if not customer:
             messagebox.showerror("Error", "Customer not found")
@@ -1,8 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
-import os
 
 class RecycleBinModule:
     def __init__(self, parent, db, app):
@@ -28,6 +27,11 @@ class RecycleBinModule:
         # Initialize backup settings tab
         self.init_backup_settings_tab()
     
+    def on_activate(self):
+        """Refresh deleted items and backup status when the section is shown again"""
+        self.load_recycle_bin_items()
+        self.update_backup_status()
+    
     def init_recycle_bin_tab(self):
         """Initialize the recycle bin tab"""
         # Main container
@@ -144,9 +148,15 @@ class RecycleBinModule:
         browse_btn = ttk.Button(location_frame, text="Browse", command=self.app.browse_backup_location)
         browse_btn.pack(side=tk.LEFT, padx=5)
         
-        # Manual backup button
-        manual_backup_btn = ttk.Button(settings_frame, text="Create Backup Now", command=self.app.create_backup)
-        manual_backup_btn.pack(pady=10)
+        # Manual backup and verify buttons
+        buttons_frame = ttk.Frame(settings_frame)
+        buttons_frame.pack(pady=10)
+        
+        manual_backup_btn = ttk.Button(buttons_frame, text="Create Backup Now", command=self.app.create_backup)
+        manual_backup_btn.pack(side=tk.LEFT, padx=5)
+        
+        verify_btn = ttk.Button(buttons_frame, text="Verify Backups", command=self.app.verify_backups)
+        verify_btn.pack(side=tk.LEFT, padx=5)
         
         # Save button
         save_btn = ttk.Button(self.backup_frame, text="Save Settings", command=self.app.save_settings)
@@ -172,39 +182,52 @@ class RecycleBinModule:
         self.next_backup_label = ttk.Label(next_backup_frame, text="Not scheduled")
         self.next_backup_label.pack(side=tk.LEFT, padx=10)
         
+        # Stored backups info
+        stored_frame = ttk.Frame(status_frame)
+        stored_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Label(stored_frame, text="Stored Backups:").pack(side=tk.LEFT)
+        self.stored_backups_label = ttk.Label(stored_frame, text="None")
+        self.stored_backups_label.pack(side=tk.LEFT, padx=10)
+        
         # Update backup status
         self.update_backup_status()
     
     def update_backup_status(self):
         """Update the backup status display"""
-        # Get last backup time
-        config_file = "config.json"
-        last_backup_date = None
-        
-        if os.path.exists(config_file):
-            try:
-                with open(config_file, 'r') as f:
-                    config = json.load(f)
-                
-                if 'backup' in config and 'last_backup' in config['backup']:
-                    last_backup_date_str = config['backup']['last_backup']
-                    last_backup_date = datetime.strptime(last_backup_date_str, "%Y-%m-%d %H:%M:%S")
-                    self.last_backup_label.config(text=last_backup_date.strftime("%d/%m/%Y %H:%M"))
-                    
-                    # Calculate next backup time
-                    if self.app.auto_backup_var.get():
-                        interval_hours = int(self.app.backup_interval_var.get())
-                        next_backup = last_backup_date + timedelta(hours=interval_hours)
-                        self.next_backup_label.config(text=next_backup.strftime("%d/%m/%Y %H:%M"))
-                    else:
-                        self.next_backup_label.config(text="Disabled")
-                else:
-                    self.last_backup_label.config(text="Never")
-                    self.next_backup_label.config(text="Not scheduled")
-            except Exception as e:
-                print(f"Error updating backup status: {e}")
-                self.last_backup_label.config(text="Error")
-                self.next_backup_label.config(text="Unknown")
+        def on_done(status):
+            last_backup_date = status["last_backup"]
+            if last_backup_date:
+                self.last_backup_label.config(text=last_backup_date.strftime("%d/%m/%Y %H:%M"))
+            else:
+                self.last_backup_label.config(text="Never")
+            
+            # Next backup time comes from the app's backup timer
+            if not self.app.auto_backup_var.get():
+                self.next_backup_label.config(text="Disabled")
+            elif self.app.next_backup_time:
+                self.next_backup_label.config(text=self.app.next_backup_time.strftime("%d/%m/%Y %H:%M"))
+            else:
+                self.next_backup_label.config(text="Not scheduled")
+            
+            if status["snapshots"]:
+                self.stored_backups_label.config(
+                    text=f"{status['snapshots']} snapshot(s), {status['stored_bytes'] / 1048576:.1f} MB on disk "
+                         f"(latest covers {status['latest_bytes'] / 1048576:.1f} MB)")
+            else:
+                self.stored_backups_label.config(text="None")
+        
+        def on_error(e):
+            print(f"Error updating backup status: {e}")
+            self.last_backup_label.config(text="Error")
+            self.next_backup_label.config(text="Unknown")
+        
+        # Read from the backup service's snapshot index off the Tk thread
+        try:
+            self.app.tasks.submit(self.app.get_backup_manager().get_status, on_done=on_done, on_error=on_error,
+                                  description="Loading backup status", key="backup_status")
+        except Exception as e:
+            on_error(e)
     
     def load_recycle_bin_items(self):
         """Load recycle bin items into the treeview"""
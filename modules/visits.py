@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, date, timedelta
+from .customer_picker import CustomerPicker
 
 class VisitsModule:
     def __init__(self, parent, db, app):
@@ -11,6 +12,10 @@ class VisitsModule:
         # Create UI
         self.create_ui()
     
+    def on_activate(self):
+        """Refresh the customer list when the section is shown again"""
+        self.load_customers()
+    
     def create_ui(self):
         """Create the customer visits UI"""
         # Main container
@@ -37,7 +42,7 @@ class VisitsModule:
         # Customer filter
         ttk.Label(filter_frame, text="Customer:").pack(side=tk.LEFT, padx=5)
         self.customer_var = tk.StringVar()
-        self.customer_combo = ttk.Combobox(filter_frame, textvariable=self.customer_var)
+        self.customer_combo = CustomerPicker(filter_frame, self.db, textvariable=self.customer_var)
         self.customer_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         
         # Search button
@@ -146,10 +151,8 @@ class VisitsModule:
         self.summary_tree.configure(yscrollcommand=scrollbar.set)
     
     def load_customers(self):
-        """Load customers into combobox"""
-        customers = self.db.get_customers()
-        customer_names = [customer["name"] for customer in customers]
-        self.customer_combo["values"] = customer_names
+        """Refresh the customer picker (it looks customers up as the user types)"""
+        self.customer_combo.refresh()
     
     def search_visits(self):
         """Search visits based on filters"""
@@ -168,11 +171,8 @@ class VisitsModule:
         # Get customer ID if selected
         customer_id = None
         if customer_name:
-            customers = self.db.get_customers()
-            for customer in customers:
-                if customer["name"] == customer_name:
-                    customer_id = customer["customer_id"]
-                    break
+            customer = self.db.find_customer_by_name(customer_name)
+            customer_id = customer["customer_id"] if customer else None
         
         # Parse dates
         try:
@@ -266,14 +266,9 @@ class VisitsModule:
         # Visit details
         ttk.Label(dialog, text="Customer:").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
         customer_var = tk.StringVar()
-        customer_combo = ttk.Combobox(dialog, textvariable=customer_var, state="readonly")
+        customer_combo = CustomerPicker(dialog, self.db, textvariable=customer_var)
         customer_combo.grid(row=0, column=1, padx=10, pady=5, sticky=tk.EW)
         
-        # Load customers
-        customers = self.db.get_customers()
-        customer_names = [customer["name"] for customer in customers]
-        customer_combo["values"] = customer_names
-        
         # New customer option
         new_customer_var = tk.BooleanVar(value=False)
         new_customer_check = ttk.Checkbutton(dialog, text="New Customer", variable=new_customer_var,
@@ -321,10 +316,8 @@ class VisitsModule:
                         return
                     
                     # Get customer ID
-                    for customer in customers:
-                        if customer["name"] == customer_name:
-                            customer_id = customer["customer_id"]
-                            break
+                    customer = self.db.find_customer_by_name(customer_name)
+                    customer_id = customer["customer_id"] if customer else None
                     
                     if not customer_id:
                         messagebox.showerror("Error", "Customer not found")
@@ -394,14 +387,9 @@ class VisitsModule:
         # Visit details
         ttk.Label(dialog, text="Customer:").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
         customer_var = tk.StringVar()
-        customer_combo = ttk.Combobox(dialog, textvariable=customer_var, state="readonly")
+        customer_combo = CustomerPicker(dialog, self.db, textvariable=customer_var)
         customer_combo.grid(row=0, column=1, padx=10, pady=5, sticky=tk.EW)
         
-        # Load customers
-        customers = self.db.get_customers()
-        customer_names = [customer["name"] for customer in customers]
-        customer_combo["values"] = customer_names
-        
         # New customer option
         new_customer_var = tk.BooleanVar(value=visit["customer_id"] is None)
         new_customer_check = ttk.Checkbutton(dialog, text="New Customer", variable=new_customer_var,
@@ -415,10 +403,9 @@ class VisitsModule:
         
         # Set initial customer if it exists
         if visit["customer_id"]:
-            for customer in customers:
-                if customer["customer_id"] == visit["customer_id"]:
-                    customer_var.set(customer["name"])
-                    break
+            customer = self.db.get_customer_by_id(visit["customer_id"])
+            if customer:
+                customer_var.set(customer["name"])
         
         ttk.Label(dialog, text="City:").grid(row=3, column=0, padx=10, pady=5, sticky=tk.W)
         city_var = tk.StringVar(value=visit["city"] or "")
@@ -471,10 +458,8 @@ class VisitsModule:
                         return
                     
                     # Get customer ID
-                    for customer in customers:
-                        if customer["name"] == customer_name:
-                            customer_id = customer["customer_id"]
-                            break
+                    customer = self.db.find_customer_by_name(customer_name)
+                    customer_id = customer["customer_id"] if customer else None
                     
                     if not customer_id:
                         messagebox.showerror("Error", "Customer not found")
@@ -562,7 +547,7 @@ class VisitsModule:
             name_entry.config(state="normal")
             name_entry.focus()
         else:
-            combo.config(state="readonly")
+            combo.config(state="normal")
             name_entry.config(state="disabled")
             name_entry.set("")
     
@@ -11,6 +11,10 @@ class WorksModule:
         # Create UI
         self.create_ui()
     
+    def on_activate(self):
+        """Refresh the works list when the section is shown again"""
+        self.search_works()
+    
     def create_ui(self):
         """Create the works completed UI"""
         # Main container
@@ -0,0 +1,180 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import backup_store
+from utils.backup_store import BackupStore, select_snapshots_to_keep
+
+
+def snapshot_at(created):
+    """(id, created) pair named the way BackupStore names snapshots"""
+    return created.strftime("%Y%m%d_%H%M%S"), created
+
+
+class SelectSnapshotsToKeepTest(unittest.TestCase):
+    """Retention selection for a fixed clock"""
+
+    now = datetime(2026, 3, 15, 12, 0)
+
+    def test_no_snapshots(self):
+        self.assertEqual(select_snapshots_to_keep([], now=self.now), set())
+
+    def test_hourly_keeps_newest_of_each_recent_hour(self):
+        # Every 10 minutes from 09:00 to 12:00
+        snapshots = [snapshot_at(datetime(2026, 3, 15, 9, 0) + timedelta(minutes=10 * step)) for step in range(19)]
+        keep = select_snapshots_to_keep(snapshots, tiers=(("hourly", 2),), now=self.now)
+        self.assertEqual(keep, {"20260315_120000", "20260315_115000"})
+
+    def test_daily_weekly_monthly_tiers(self):
+        # One snapshot a day at 02:00 for 60 days
+        snapshots = [snapshot_at(datetime(2026, 3, 15, 2, 0) - timedelta(days=day)) for day in range(60)]
+        tiers = (("daily", 3), ("weekly", 2), ("monthly", 2))
+        keep = select_snapshots_to_keep(snapshots, retention_days=90, tiers=tiers, now=self.now)
+        self.assertEqual(keep, {
+            # daily: the three newest days
+            "20260315_020000", "20260314_020000", "20260313_020000",
+            # weekly: newest of ISO week 11 (Mar 15) and week 10 (Mar 8)
+            "20260308_020000",
+            # monthly: newest of March and of February
+            "20260228_020000",
+        })
+
+    def test_nothing_older_than_retention_window_survives(self):
+        snapshots = [snapshot_at(datetime(2026, 3, 15, 2, 0) - timedelta(days=day)) for day in range(60)]
+        keep = select_snapshots_to_keep(snapshots, retention_days=10, now=self.now)
+        cutoff = self.now - timedelta(days=10)
+        created = dict(snapshots)
+        self.assertTrue(keep)
+        self.assertTrue(all(created[snapshot_id] >= cutoff for snapshot_id in keep))
+
+    def test_newest_is_kept_even_past_the_window(self):
+        snapshots = [snapshot_at(datetime(2025, 1, day, 2, 0)) for day in range(1, 6)]
+        keep = select_snapshots_to_keep(snapshots, retention_days=30, now=self.now)
+        self.assertEqual(keep, {"20250105_020000"})
+
+    def test_same_second_keeps_the_later_snapshot(self):
+        created = datetime(2026, 3, 15, 11, 0)
+        snapshots = [("20260315_110000", created), ("20260315_110000_1", created)]
+        keep = select_snapshots_to_keep(snapshots, tiers=(("hourly", 1),), now=self.now)
+        self.assertEqual(keep, {"20260315_110000_1"})
+
+
+class BackupStoreRoundTripTest(unittest.TestCase):
+    """Snapshot, change one row, verify, prune and restore"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        root = self.temp_dir.name
+
+        self.db_path = os.path.join(root, "app.db")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT, balance REAL)")
+        conn.executemany("INSERT INTO customers (name, balance) VALUES (?, ?)",
+                         [(f"Customer {number} " + "x" * 80, number * 1.5) for number in range(5000)])
+        conn.commit()
+        conn.close()
+
+        self.assets_dir = os.path.join(root, "assets")
+        os.makedirs(self.assets_dir)
+        with open(os.path.join(self.assets_dir, "logo.png"), "wb") as f:
+            f.write(os.urandom(50000))
+
+        self.store = BackupStore(os.path.join(root, "backups"))
+        self.extra_paths = [(self.assets_dir, "assets")]
+
+    def snapshot(self):
+        return self.store.create_snapshot(self.db_path, self.extra_paths)
+
+    def customers(self, db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute("SELECT * FROM customers ORDER BY customer_id").fetchall()
+        finally:
+            conn.close()
+
+    def referenced_chunks(self, snapshot_id):
+        manifest = self.store.load_manifest(snapshot_id)
+        chunks = set(manifest["database"]["chunks"])
+        for entry in manifest["files"]:
+            chunks.update(entry["chunks"])
+        return chunks
+
+    def change_one_row(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE customers SET balance = balance + 100 WHERE customer_id = 2500")
+        conn.commit()
+        conn.close()
+
+    def test_unchanged_snapshot_adds_nothing_and_one_row_adds_little(self):
+        first = self.snapshot()
+        self.assertGreater(first["new_bytes"], 0)
+
+        self.assertEqual(self.snapshot()["new_bytes"], 0)
+
+        self.change_one_row()
+        changed = self.snapshot()
+        self.assertGreater(changed["new_bytes"], 0)
+        self.assertLess(changed["new_bytes"], changed["total_bytes"] // 10)
+
+    def test_every_snapshot_verifies_and_restores(self):
+        original_rows = self.customers(self.db_path)
+        first = self.snapshot()
+        self.change_one_row()
+        changed_rows = self.customers(self.db_path)
+        second = self.snapshot()
+
+        results = self.store.verify_snapshots()
+        self.assertEqual([result["id"] for result in results], [second["id"], first["id"]])
+        self.assertTrue(all(result["ok"] for result in results), results)
+
+        for manifest, rows in ((first, original_rows), (second, changed_rows)):
+            target = os.path.join(self.temp_dir.name, "restore_" + manifest["id"])
+            db_path = self.store.restore_snapshot(manifest["id"], target)
+            self.assertEqual(self.customers(db_path), rows)
+            with open(os.path.join(target, "assets", "logo.png"), "rb") as restored, \
+                    open(os.path.join(self.assets_dir, "logo.png"), "rb") as source:
+                self.assertEqual(restored.read(), source.read())
+
+    def test_prune_never_collects_chunks_still_referenced(self):
+        first = self.snapshot()
+        self.change_one_row()
+        second = self.snapshot()
+        changed_rows = self.customers(self.db_path)
+        only_in_first = self.referenced_chunks(first["id"]) - self.referenced_chunks(second["id"])
+        self.assertTrue(only_in_first)
+
+        with mock.patch.object(backup_store, "GC_GRACE_SECONDS", 0):
+            summary = self.store.prune(tiers=(("hourly", 1),))
+
+        self.assertEqual(summary["removed"], [first["id"]])
+        self.assertEqual(self.store.list_snapshots(), [second["id"]])
+        self.assertEqual(summary["objects_removed"], len(only_in_first))
+        for digest in self.referenced_chunks(second["id"]):
+            self.assertTrue(self.store.has_object(digest), digest)
+        for digest in only_in_first:
+            self.assertFalse(self.store.has_object(digest), digest)
+
+        self.assertTrue(self.store.verify_snapshot(second["id"])["ok"])
+        target = os.path.join(self.temp_dir.name, "restore")
+        self.assertEqual(self.customers(self.store.restore_snapshot(second["id"], target)), changed_rows)
+
+    def test_prune_keeps_recent_chunks_during_the_grace_period(self):
+        first = self.snapshot()
+        self.change_one_row()
+        self.snapshot()
+
+        summary = self.store.prune(tiers=(("hourly", 1),))
+
+        self.assertEqual(summary["removed"], [first["id"]])
+        self.assertEqual(summary["objects_removed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
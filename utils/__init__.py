@@ -3,22 +3,49 @@ Utils package for Ganesh Toughened Industry Desktop Application.
 
 This package contains utility functions and classes used throughout the application:
 - pdf_generator: PDF generation utilities for invoices and reports
-- backup: Database backup and restore functionality
+- invoice_template: Compiled invoice layout reused across invoice PDFs
+- qr_cache: LRU cache of UPI QR code images shared by the PDF renderers
+- bulk_export: Parallel invoice PDF regeneration (also a command line tool)
+- backup: Backup service (snapshots, compression, verify, restore; also a command line tool)
+- backup_store: Deduplicated, incremental snapshot store for the database and files
 - helpers: Common helper functions for formatting, validation, etc.
+- migrations: Versioned database schema migrations
+- prefix_index: Sorted prefix index behind the type-ahead customer pickers
+- task_runner: Background executor that hands results back to the Tk main loop
 """
 
 __version__ = "1.0.0"
 __author__ = "Ganesh Toughened Industry"
 
-# Import all utility modules for easy access
-from . import pdf_generator
-from . import backup
-from . import helpers
+import importlib
 
-# Import commonly used classes and functions directly
-from .pdf_generator import PDFGenerator
-from .backup import BackupManager
+# Lightweight utility modules are imported directly
+from . import helpers
+from . import migrations
 from .helpers import Helpers
+from .migrations import MigrationRunner, MigrationError
+
+# The PDF (reportlab, qrcode, PIL) and backup (zipfile) stacks are imported on first use
+LAZY_ATTRIBUTES = {
+    "pdf_generator": ("pdf_generator", None),
+    "invoice_template": ("invoice_template", None),
+    "backup": ("backup", None),
+    "backup_store": ("backup_store", None),
+    "PDFGenerator": ("pdf_generator", "PDFGenerator"),
+    "InvoiceTemplate": ("invoice_template", "InvoiceTemplate"),
+    "BackupManager": ("backup", "BackupManager"),
+    "BackupStore": ("backup_store", "BackupStore")
+}
+
+def __getattr__(name):
+    """Import heavy utility modules the first time they are accessed"""
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = LAZY_ATTRIBUTES[name]
+    module = importlib.import_module(f".{module_name}", __name__)
+    value = getattr(module, attribute) if attribute else module
+    globals()[name] = value
+    return value
 
 # Package information dictionary
 PACKAGE_INFO = {
@@ -32,15 +59,50 @@ PACKAGE_INFO = {
             "description": "Generate PDF invoices, reports, and other documents",
             "class": "PDFGenerator"
         },
+        "invoice_template": {
+            "name": "Invoice Template",
+            "description": "Styles, header, bank details and logo for invoice PDFs, built once per settings version",
+            "class": "InvoiceTemplate"
+        },
+        "qr_cache": {
+            "name": "QR Code Cache",
+            "description": "Cache UPI QR code PNGs by payee and amount, in memory and on disk",
+            "class": "QRCodeCache"
+        },
+        "bulk_export": {
+            "name": "Bulk Invoice Export",
+            "description": "Regenerate invoice PDFs for a date range or customer on a process pool",
+            "class": None
+        },
         "backup": {
             "name": "Backup Manager",
-            "description": "Handle database backup and restore operations",
+            "description": "Create, prune, verify and restore backups for the app timer, settings tab and command line",
             "class": "BackupManager"
         },
+        "backup_store": {
+            "name": "Backup Store",
+            "description": "Store chunked, hashed snapshots of the database, assets and invoices once and restore any of them",
+            "class": "BackupStore"
+        },
         "helpers": {
             "name": "Helper Functions",
             "description": "Common helper functions for formatting, validation, and file operations",
             "class": "Helpers"
+        },
+        "migrations": {
+            "name": "Migration Runner",
+            "description": "Apply versioned schema migrations and indexes to the database",
+            "class": "MigrationRunner"
+        },
+        "prefix_index": {
+            "name": "Prefix Index",
+            "description": "Find customers by the start of their name, any word of it, or their phone number",
+            "class": "PrefixIndex"
+        },
+        "task_runner": {
+            "name": "Task Runner",
+            "description": "Run queries, PDF generation and backups off the Tk event loop",
+            "class": "TaskRunner"
         }
     }
 }
@@ -64,10 +126,16 @@ def list_all_modules():
 
 def create_pdf_generator(db):
     """Create and return a PDFGenerator instance"""
+    from .pdf_generator import PDFGenerator
     return PDFGenerator(db)
 
+def create_migration_runner(db_path):
+    """Create and return a MigrationRunner instance"""
+    return MigrationRunner(db_path)
+
 def create_backup_manager(db_path, backup_dir="backups"):
     """Create and return a BackupManager instance"""
+    from .backup import BackupManager
     return BackupManager(db_path, backup_dir)
 
 # Utility functions that are commonly used throughout the application
@@ -1,167 +1,488 @@
 import os
+import sys
 import sqlite3
-import shutil
+import time
+import tempfile
+import threading
 import zipfile
-from datetime import datetime, date, timedelta
-import json
+from datetime import datetime, timedelta
+
+# Pages copied per step of an online snapshot, and the pause between steps.
+# Writers only wait for one step at a time instead of the whole copy.
+SNAPSHOT_STEP_PAGES = 256
+SNAPSHOT_STEP_SLEEP = 0.005
+
+# A write from another connection restarts a paged copy; after this many
+# restarts the snapshot is finished in one step instead (with WAL that only
+# holds a read snapshot, so writers are still not blocked)
+SNAPSHOT_MAX_RESTARTS = 3
+
+# zlib level used for backup chunks and archives. Fast mode trades some
+# compression for speed; level 0 stores data uncompressed.
+DEFAULT_COMPRESS_LEVEL = 6
+FAST_COMPRESS_LEVEL = 1
+
+# Files are streamed into backups in blocks of this size
+STREAM_BLOCK_SIZE = 256 * 1024
+
+# What the app backs up besides the database: (path, name in the backup)
+DEFAULT_BACKUP_PATHS = [
+    ("config", "config"),
+    ("assets", "assets"),
+    ("invoices", "invoices")
+]
+
+
+class BackupCancelled(Exception):
+    """Raised from a progress callback to stop a backup that is in progress"""
+
+
+class _SnapshotRestarted(Exception):
+    """Raised from the progress callback to stop a paged copy that keeps restarting"""
+
+
+class IOThrottle:
+    """Limit backup I/O to a number of bytes per second
+
+    Shared by every step of a backup, so reading files, copying pages and
+    writing archives together stay under the limit. A limit of 0 or None
+    means unthrottled.
+    """
+
+    def __init__(self, bytes_per_second=None):
+        """Initialize the throttle"""
+        self.bytes_per_second = bytes_per_second or 0
+        self._started = time.monotonic()
+        self._consumed = 0
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes):
+        """Account for nbytes of I/O, sleeping if the limit is exceeded"""
+        if not self.bytes_per_second:
+            return
+        with self._lock:
+            self._consumed += nbytes
+            delay = self._consumed / self.bytes_per_second - (time.monotonic() - self._started)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BackupProgress:
+    """Report the steps of a backup as byte-level progress(done, total) calls"""
+
+    def __init__(self, callback=None, total=0):
+        """Initialize with the callback and the bytes expected so far"""
+        self.callback = callback
+        self.total = total
+        self.done = 0
+
+    def add_total(self, nbytes):
+        """Add bytes to the expected total"""
+        self.total += nbytes
+
+    def advance(self, nbytes):
+        """Record nbytes of work and report it"""
+        self.done += nbytes
+        if self.callback:
+            self.callback(self.done, max(self.total, self.done))
+
+
+def compress_level_for(level=DEFAULT_COMPRESS_LEVEL, fast=False):
+    """zlib level for a configured level or fast mode"""
+    if fast:
+        return FAST_COMPRESS_LEVEL
+    return max(0, min(9, int(level)))
+
+
+def snapshot_database(db_path, snapshot_path, pages=SNAPSHOT_STEP_PAGES, sleep=SNAPSHOT_STEP_SLEEP,
+                      progress=None, timeout=30, max_restarts=SNAPSHOT_MAX_RESTARTS, throttle=None):
+    """Copy a live database into snapshot_path with the SQLite online backup API
+
+    The copy is made in steps of `pages` pages with a short sleep between
+    them, so billing can keep writing while the snapshot is taken. If the
+    database changes during the copy SQLite restarts it, so the snapshot is
+    always a consistent point-in-time image. progress(copied_bytes,
+    total_bytes) is called after every step.
+    """
+    source = sqlite3.connect(db_path, timeout=timeout)
+    try:
+        page_size = source.execute("PRAGMA page_size").fetchone()[0]
+        target = sqlite3.connect(snapshot_path)
+        try:
+            state = {"remaining": None, "total": 0, "restarts": 0}
+
+            def step_done(status, remaining, total):
+                if state["remaining"] is not None and remaining > state["remaining"]:
+                    state["restarts"] += 1
+                    if state["restarts"] > max_restarts:
+                        raise _SnapshotRestarted()
+                copied = (state["remaining"] - remaining) if state["remaining"] is not None else total - remaining
+                state["remaining"] = remaining
+                state["total"] = total
+                if throttle:
+                    throttle.consume(max(copied, 0) * page_size)
+                if progress:
+                    progress((total - remaining) * page_size, total * page_size)
+                if remaining and sleep:
+                    time.sleep(sleep)
+
+            try:
+                source.backup(target, pages=pages, progress=step_done, sleep=sleep)
+            except _SnapshotRestarted:
+                source.backup(target, pages=-1, sleep=sleep)
+                if progress:
+                    progress(state["total"] * page_size, state["total"] * page_size)
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+    finally:
+        source.close()
+    return snapshot_path
+
+
+def write_snapshot_archive(db_path, backup_path, extra_paths=(), pages=SNAPSHOT_STEP_PAGES,
+                           sleep=SNAPSHOT_STEP_SLEEP, progress=None, compress_level=DEFAULT_COMPRESS_LEVEL,
+                           throttle=None):
+    """Snapshot the database and stream it with extra files into a zip at backup_path
+
+    extra_paths lists (path, arcname) pairs; missing files are skipped and
+    directories are added recursively. The snapshot and the archive are built
+    under temporary names next to backup_path, so a failed backup never
+    leaves a partial file behind. progress(done_bytes, total_bytes) counts
+    the snapshot copy and every byte compressed into the archive.
+    """
+    backup_dir = os.path.dirname(os.path.abspath(backup_path))
+    os.makedirs(backup_dir, exist_ok=True)
+
+    files = list(walk_backup_paths(extra_paths))
+    db_size = os.path.getsize(db_path)
+    tracker = BackupProgress(progress, 2 * db_size + sum(os.path.getsize(path) for path, arcname in files))
+
+    def snapshot_progress(copied, total):
+        tracker.advance(copied - snapshot_progress.copied)
+        snapshot_progress.copied = copied
+    snapshot_progress.copied = 0
+
+    compression = zipfile.ZIP_DEFLATED if compress_level else zipfile.ZIP_STORED
+    with tempfile.TemporaryDirectory(prefix=".snapshot_", dir=backup_dir) as work_dir:
+        snapshot_path = os.path.join(work_dir, os.path.basename(db_path))
+        snapshot_database(db_path, snapshot_path, pages=pages, sleep=sleep, progress=snapshot_progress,
+                          throttle=throttle)
+        tracker.add_total(os.path.getsize(snapshot_path) - db_size)
+
+        temp_archive = os.path.join(work_dir, "archive.zip")
+        with zipfile.ZipFile(temp_archive, 'w', compression, compresslevel=compress_level or None) as zipf:
+            stream_into_zip(zipf, snapshot_path, os.path.basename(db_path), tracker, throttle)
+            for path, arcname in files:
+                stream_into_zip(zipf, path, arcname, tracker, throttle)
+
+        os.replace(temp_archive, backup_path)
+
+    return backup_path
+
+
+def stream_into_zip(zipf, path, arcname, tracker=None, throttle=None):
+    """Compress one file into an open zip in blocks, reporting progress as it goes"""
+    zip_info = zipfile.ZipInfo.from_file(path, arcname)
+    zip_info.compress_type = zipf.compression
+    with open(path, "rb") as source, zipf.open(zip_info, "w") as target:
+        while True:
+            block = source.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            if throttle:
+                throttle.consume(len(block))
+            target.write(block)
+            if tracker:
+                tracker.advance(len(block))
+
+
+# Folders never copied into backups: invoice PDF content hashes
+# (invoice_template.HASH_DIR_NAME) are only a render cache and are rebuilt
+# on demand
+SKIPPED_DIR_NAMES = {".hashes"}
+
+
+def walk_backup_paths(extra_paths):
+    """Yield (path, arcname) for every file under the given (path, arcname) pairs"""
+    for path, arcname in extra_paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith(".snapshot_") and d not in SKIPPED_DIR_NAMES)
+                for file in sorted(files):
+                    file_path = os.path.join(root, file)
+                    relative = os.path.relpath(file_path, path).replace(os.sep, "/")
+                    yield file_path, f"{arcname}/{relative}"
+        elif os.path.exists(path):
+            yield path, arcname
+
 
 class BackupManager:
-    """Backup system for the application"""
+    """Backup service for the application
+    
+    The app's backup timer, the backup settings tab and the command line all
+    go through this class. Backups are incremental snapshots in a
+    BackupStore under backup_dir; full zip archives can still be exported
+    for copying elsewhere.
+    """
     
-    def __init__(self, db_path, backup_dir="backups"):
+    def __init__(self, db_path, backup_dir="backups", extra_paths=None, compress_level=DEFAULT_COMPRESS_LEVEL,
+                 fast=False, io_limit_mb=0, retention_days=None):
         """Initialize backup manager"""
+        from utils.backup_store import get_backup_store, DEFAULT_RETENTION_DAYS
+        
         self.db_path = db_path
         self.backup_dir = backup_dir
+        self.extra_paths = list(DEFAULT_BACKUP_PATHS if extra_paths is None else extra_paths)
+        self.compress_level = compress_level_for(compress_level, fast)
+        self.io_limit_mb = io_limit_mb or 0
+        self.retention_days = retention_days or DEFAULT_RETENTION_DAYS
         
         # Create backup directory if it doesn't exist
         if not os.path.exists(self.backup_dir):
             os.makedirs(self.backup_dir)
+        
+        self.store = get_backup_store(self.backup_dir)
     
-    def create_backup(self):
-        """Create a backup of the database"""
-        try:
-            # Generate backup filename with timestamp
+    def create_backup(self, progress=None):
+        """Add an incremental snapshot of the database and files; returns its manifest
+        
+        progress(done_bytes, total_bytes) is called as data is copied and
+        compressed; it may raise BackupCancelled to stop the backup. Errors
+        are raised so the caller can report them.
+        """
+        return self.store.create_snapshot(self.db_path, self.extra_paths, progress=progress,
+                                          compress_level=self.compress_level, throttle=self.make_throttle())
+    
+    def export_archive(self, backup_path=None, progress=None):
+        """Write a full zip of the database and files (for copying off this computer)"""
+        if backup_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"backup_{timestamp}.zip"
-            backup_path = os.path.join(self.backup_dir, backup_filename)
-            
-            # Create a zip file
-            with zipfile.ZipFile(backup_path, 'w') as zipf:
-                # Add database file
-                zipf.write(self.db_path, os.path.basename(self.db_path))
-                
-                # Add config files if they exist
-                config_dir = "config"
-                if os.path.exists(config_dir):
-                    for root, dirs, files in os.walk(config_dir):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            arcname = os.path.relpath(file_path, os.path.dirname(config_dir))
-                            zipf.write(file_path, arcname)
-            
-            # Update last backup date in settings
-            self.update_last_backup_date()
-            
-            return backup_path
-            
-        except Exception as e:
-            print(f"Error creating backup: {e}")
-            return None
+            backup_path = os.path.join(self.backup_dir, f"ganesh_toughened_industry_backup_{timestamp}.zip")
+        return write_snapshot_archive(self.db_path, backup_path, self.extra_paths, progress=progress,
+                                      compress_level=self.compress_level, throttle=self.make_throttle())
+    
+    def make_throttle(self):
+        """I/O throttle for one backup run"""
+        return IOThrottle(self.io_limit_mb * 1024 * 1024) if self.io_limit_mb else None
     
     def restore_backup(self, backup_path):
-        """Restore database from backup"""
+        """Restore database from backup, swapping it in only after it is verified
+        
+        backup_path is a store snapshot (its manifest path or id) or a zip
+        backup. The app's database connections must be closed first.
+        """
         try:
-            # Extract the backup
+            from utils.backup_store import check_database, swap_database
+            
+            if not backup_path.endswith(".zip"):
+                snapshot_id = os.path.basename(backup_path)
+                if snapshot_id.endswith(".json"):
+                    snapshot_id = snapshot_id[:-5]
+                self.store.restore_database(snapshot_id, self.db_path)
+                return True
+            
+            db_name = os.path.basename(self.db_path)
+            target_dir = os.path.dirname(os.path.abspath(self.db_path))
+            
             with zipfile.ZipFile(backup_path, 'r') as zipf:
-                # Extract all files
-                zipf.extractall(os.path.dirname(self.db_path))
+                # Check the database copy before it replaces the live one
+                with tempfile.TemporaryDirectory(prefix=".restore_", dir=target_dir) as work_dir:
+                    restored_path = zipf.extract(db_name, work_dir)
+                    problems = check_database(restored_path)
+                    if problems:
+                        raise ValueError(f"Backup failed verification: {'; '.join(problems)}")
+                    swap_database(restored_path, self.db_path)
+                
+                # Extract the remaining files (config)
+                for member in zipf.namelist():
+                    if member != db_name:
+                        zipf.extract(member, target_dir)
             
             return True
-            
+        
         except Exception as e:
             print(f"Error restoring backup: {e}")
             return False
     
+    def verify_backups(self, max_workers=None, progress=None):
+        """Verify every snapshot in the backup store concurrently"""
+        try:
+            return self.store.verify_snapshots(max_workers=max_workers, progress=progress)
+        except Exception as e:
+            print(f"Error verifying backups: {e}")
+            return []
+    
+    def prune(self, retention_days=None):
+        """Apply the retention policy; returns the prune summary"""
+        return self.store.prune(retention_days or self.retention_days)
+    
     def list_backups(self):
-        """List all available backups"""
+        """List all available backups, newest first
+        
+        Snapshots come from the backup store's cached index, so nothing is
+        parsed or re-read; older zip backups are listed by their file times.
+        """
         try:
             backups = []
             
-            for file in os.listdir(self.backup_dir):
-                if file.endswith(".zip"):
-                    file_path = os.path.join(self.backup_dir, file)
-                    file_stat = os.stat(file_path)
-                    
-                    # Extract timestamp from filename
-                    timestamp_str = file.replace("backup_", "").replace(".zip", "")
-                    try:
-                        timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                        date_str = timestamp.strftime("%d/%m/%Y %H:%M:%S")
-                    except ValueError:
-                        date_str = "Unknown"
-                    
+            for entry in self.store.snapshot_index():
+                created = datetime.strptime(entry["created"], "%Y-%m-%d %H:%M:%S")
+                backups.append({
+                    "filename": entry["id"],
+                    "path": self.store.manifest_path(entry["id"]),
+                    "date": created.strftime("%d/%m/%Y %H:%M:%S"),
+                    "size": entry["total_bytes"],
+                    "new_bytes": entry["new_bytes"],
+                    "timestamp": created.timestamp()
+                })
+            
+            for entry in os.scandir(self.backup_dir):
+                if entry.is_file() and entry.name.endswith(".zip"):
+                    file_stat = entry.stat()
                     backups.append({
-                        "filename": file,
-                        "path": file_path,
-                        "date": date_str,
-                        "size": file_stat.st_size
+                        "filename": entry.name,
+                        "path": entry.path,
+                        "date": datetime.fromtimestamp(file_stat.st_mtime).strftime("%d/%m/%Y %H:%M:%S"),
+                        "size": file_stat.st_size,
+                        "new_bytes": file_stat.st_size,
+                        "timestamp": file_stat.st_mtime
                     })
             
             # Sort by date (newest first)
-            backups.sort(key=lambda x: x["filename"], reverse=True)
+            backups.sort(key=lambda x: x["timestamp"], reverse=True)
             
             return backups
-            
+        
         except Exception as e:
             print(f"Error listing backups: {e}")
             return []
     
     def delete_backup(self, backup_path):
-        """Delete a backup file"""
+        """Delete a backup (a snapshot's chunks are freed by the next prune)"""
         try:
-            os.remove(backup_path)
+            if backup_path.endswith(".zip"):
+                os.remove(backup_path)
+            else:
+                self.store.delete_snapshot(os.path.basename(backup_path).replace(".json", ""))
             return True
         except Exception as e:
             print(f"Error deleting backup: {e}")
             return False
     
-    def check_backup_needed(self):
-        """Check if a backup is needed (weekly)"""
+    def get_last_backup(self):
+        """Time of the newest snapshot, or None if there are no backups"""
         try:
-            # Get last backup date from settings
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT value FROM settings WHERE key = 'last_backup'")
-                result = cursor.fetchone()
-                
-                if result:
-                    last_backup_str = result[0]
-                    if last_backup_str == "Never":
-                        return True
-                    
-                    last_backup = datetime.strptime(last_backup_str, "%Y-%m-%d")
-                    
-                    # Check if a week has passed
-                    if datetime.now() - last_backup >= timedelta(days=7):
-                        return True
-                
-                return True
-                
+            index = self.store.snapshot_index()
+            if index:
+                return datetime.strptime(index[0]["created"], "%Y-%m-%d %H:%M:%S")
         except Exception as e:
-            print(f"Error checking backup needed: {e}")
-            return True
+            print(f"Error loading last backup time: {e}")
+        return None
     
-    def update_last_backup_date(self):
-        """Update the last backup date in settings"""
+    def get_status(self):
+        """Summary for status displays: last backup, snapshot count and bytes stored"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Check if setting exists
-                cursor.execute("SELECT 1 FROM settings WHERE key = 'last_backup'")
-                if cursor.fetchone():
-                    # Update existing setting
-                    cursor.execute("""
-                    UPDATE settings SET value = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE key = 'last_backup'
-                    """, (datetime.now().strftime("%Y-%m-%d"),))
-                else:
-                    # Insert new setting
-                    cursor.execute("""
-                    INSERT INTO settings (key, value, updated_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                    """, ("last_backup", datetime.now().strftime("%Y-%m-%d")))
-                
-                conn.commit()
-                
+            index = self.store.snapshot_index()
+            return {
+                "last_backup": datetime.strptime(index[0]["created"], "%Y-%m-%d %H:%M:%S") if index else None,
+                "snapshots": len(index),
+                "stored_bytes": self.store.stored_bytes(),
+                "latest_bytes": index[0]["total_bytes"] if index else 0
+            }
         except Exception as e:
-            print(f"Error updating last backup date: {e}")
+            print(f"Error loading backup status: {e}")
+            return {"last_backup": None, "snapshots": 0, "stored_bytes": 0, "latest_bytes": 0}
+    
+    def check_backup_needed(self, interval_hours=168):
+        """Check if a backup is needed (weekly by default)"""
+        last_backup = self.get_last_backup()
+        return last_backup is None or datetime.now() - last_backup >= timedelta(hours=interval_hours)
     
-    def auto_backup(self):
-        """Automatically create backup if needed"""
-        if self.check_backup_needed():
-            backup_path = self.create_backup()
-            if backup_path:
-                print(f"Automatic backup created: {backup_path}")
+    def auto_backup(self, interval_hours=168):
+        """Automatically create backup if needed, then apply the retention policy"""
+        if self.check_backup_needed(interval_hours):
+            try:
+                manifest = self.create_backup()
+                print(f"Automatic backup created: {manifest['id']}")
+                self.prune()
                 return True
-        return False
\ No newline at end of file
+            except Exception as e:
+                print(f"Error creating backup: {e}")
+        return False
+
+
+def backup_manager_from_config(config, db_path=None, backup_dir=None, extra_paths=None):
+    """Create the BackupManager described by config/database_config.json settings"""
+    return BackupManager(
+        db_path or config.get("database_path", "ganesh_toughened_industry.db"),
+        backup_dir or config.get("backup_directory", "backups"),
+        extra_paths=extra_paths,
+        compress_level=config.get("backup_compression_level", DEFAULT_COMPRESS_LEVEL),
+        fast=config.get("backup_fast_mode", False),
+        io_limit_mb=config.get("backup_io_limit_mb", 0),
+        retention_days=config.get("backup_retention_days")
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database_manager import load_database_config
+
+    parser = argparse.ArgumentParser(description="Create, list, verify, prune and restore backups")
+    parser.add_argument("command", choices=["create", "export", "list", "verify", "prune", "restore"])
+    parser.add_argument("snapshot", nargs="?", help="snapshot id or zip file to restore (restore only)")
+    parser.add_argument("--dir", help="backup directory (default: backup_directory from the config)")
+    parser.add_argument("--db", help="database file (default: database_path from the config)")
+    parser.add_argument("--level", type=int, help="compression level 0-9")
+    parser.add_argument("--fast", action="store_true", help="fast compression")
+    parser.add_argument("--limit-mb", type=float, help="limit backup I/O to this many MB per second")
+    parser.add_argument("--workers", type=int, help="verify worker threads (default: all cores)")
+    args = parser.parse_args()
+
+    config = load_database_config()
+    if args.level is not None:
+        config["backup_compression_level"] = args.level
+    if args.fast:
+        config["backup_fast_mode"] = True
+    if args.limit_mb is not None:
+        config["backup_io_limit_mb"] = args.limit_mb
+    manager = backup_manager_from_config(config, args.db, args.dir)
+
+    def print_progress(done, total):
+        percent = done * 100 // total if total else 100
+        print(f"\r{percent:3d}%  {done / 1048576:.1f} of {total / 1048576:.1f} MB", end="", flush=True)
+
+    started = datetime.now()
+    if args.command == "create":
+        manifest = manager.create_backup(print_progress)
+        print(f"\nCreated backup {manifest['id']}: {manifest['total_bytes'] / 1048576:.1f} MB protected, "
+              f"{manifest['new_bytes'] / 1024:.1f} KB new")
+    elif args.command == "export":
+        print(f"\nWrote {manager.export_archive(progress=print_progress)}")
+    elif args.command == "list":
+        for backup in manager.list_backups():
+            print(f"{backup['filename']:32} {backup['date']}  {backup['size'] / 1048576:8.1f} MB  "
+                  f"{backup['new_bytes'] / 1024:10.1f} KB new")
+        print(f"Store uses {manager.store.stored_bytes() / 1048576:.1f} MB")
+    elif args.command == "verify":
+        results = manager.verify_backups(args.workers)
+        for result in results:
+            status = "ok" if result["ok"] else "FAILED: " + "; ".join(result["problems"])
+            print(f"{result['id']:32} {status}")
+        failed = [result for result in results if not result["ok"]]
+        print(f"Verified {len(results)} backup(s), {len(failed)} failed")
+        sys.exit(1 if failed else 0)
+    elif args.command == "prune":
+        summary = manager.prune()
+        print(f"Removed {len(summary['removed'])} snapshot(s) and {summary['archives_removed']} archive(s), "
+              f"kept {summary['kept']}, freed {summary['bytes_freed'] / 1048576:.1f} MB")
+    elif args.command == "restore":
+        if not args.snapshot:
+            parser.error("restore needs a snapshot id or zip file (close the app first)")
+        if not manager.restore_backup(args.snapshot):
+            sys.exit(1)
+        print(f"Restored {args.snapshot} into {manager.db_path}")
+    print(f"Done in {(datetime.now() - started).total_seconds():.1f}s")
@@ -0,0 +1,665 @@
+import os
+import json
+import shutil
+import time
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from utils.backup import (snapshot_database, walk_backup_paths, BackupProgress, DEFAULT_COMPRESS_LEVEL)
+
+# The database is split on page boundaries so an edit to a few rows only
+# produces a few new chunks; other files are split into larger fixed chunks
+DB_CHUNK_SIZE = 64 * 1024
+FILE_CHUNK_SIZE = 1024 * 1024
+
+OBJECTS_DIR = "objects"
+MANIFESTS_DIR = "manifests"
+INDEX_FILE = "index.json"
+
+# Retention: the newest snapshot of each of the most recent N hours, days,
+# ISO weeks and months is kept, and nothing older than the retention window
+# (backup_retention_days in config/database_config.json) survives
+RETENTION_TIERS = (
+    ("hourly", 24),
+    ("daily", 14),
+    ("weekly", 8),
+    ("monthly", 4)
+)
+DEFAULT_RETENTION_DAYS = 90
+
+# Chunks written this recently are never garbage collected, so a snapshot
+# being written by another process keeps its new chunks
+GC_GRACE_SECONDS = 3600
+
+# Legacy full-zip backups that retention also cleans up
+LEGACY_ARCHIVE_PREFIXES = ("ganesh_toughened_industry_backup_", "backup_")
+
+# Declared column types whose values are summed into the verify checksums
+NUMERIC_TYPE_MARKERS = ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")
+
+# Suffix of the copy of the live database kept aside by a restore
+PRE_RESTORE_SUFFIX = ".before_restore"
+
+# Object files start with a marker saying whether the chunk is zlib
+# compressed or stored as is (PDFs and images rarely shrink)
+_COMPRESSED = b"z"
+_STORED = b"r"
+
+
+def _tier_period(tier, created):
+    """Bucket a snapshot time falls into for a retention tier"""
+    if tier == "hourly":
+        return created.strftime("%Y-%m-%d %H")
+    if tier == "daily":
+        return created.date()
+    if tier == "weekly":
+        return created.isocalendar()[:2]
+    return (created.year, created.month)
+
+
+def database_checksums(db_path):
+    """Row count and sums of the numeric columns of every table
+
+    Stored in each snapshot manifest so a restored copy can be compared
+    against the data that was backed up.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        checksums = {}
+        for table in tables:
+            quoted = '"' + table.replace('"', '""') + '"'
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({quoted})")
+                       if any(marker in (row[2] or "").upper() for marker in NUMERIC_TYPE_MARKERS)]
+            expressions = ["COUNT(*)"] + ['TOTAL("' + column.replace('"', '""') + '")' for column in columns]
+            values = conn.execute(f"SELECT {', '.join(expressions)} FROM {quoted}").fetchone()
+            checksums[table] = {
+                "rows": values[0],
+                "sums": {column: round(value, 6) for column, value in zip(columns, values[1:])}
+            }
+        return checksums
+    finally:
+        conn.close()
+
+
+def check_database(db_path, checksums=None):
+    """Run integrity and (when given) checksum checks on a database copy
+
+    Foreign keys are not checked: the app does not enforce them, so a sound
+    copy of a live database may hold rows whose parent was deleted. Returns a
+    list of problems; an empty list means the copy is sound.
+    """
+    problems = []
+    conn = sqlite3.connect(db_path)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if result != ["ok"]:
+            problems.append("integrity_check: " + "; ".join(str(line) for line in result[:5]))
+    except sqlite3.DatabaseError as e:
+        problems.append(f"database cannot be read: {e}")
+    finally:
+        conn.close()
+
+    if checksums is not None and not problems:
+        actual = database_checksums(db_path)
+        for table, expected in sorted(checksums.items()):
+            found = actual.get(table)
+            if found is None:
+                problems.append(f"table {table} is missing")
+            elif found["rows"] != expected["rows"]:
+                problems.append(f"table {table} has {found['rows']} rows, expected {expected['rows']}")
+            elif found["sums"] != expected["sums"]:
+                problems.append(f"table {table} column sums do not match")
+    return problems
+
+
+def swap_database(new_db_path, db_path):
+    """Atomically put a verified database copy in place of db_path
+
+    The current database and its WAL/shared-memory files are moved aside
+    first (so no stale WAL is applied to the restored copy) and kept as
+    db_path + PRE_RESTORE_SUFFIX. The app's connections must be closed.
+    Returns the path of the copy kept aside, or None if there was none.
+    """
+    kept_path = None
+    if os.path.exists(db_path):
+        kept_path = db_path + PRE_RESTORE_SUFFIX
+        os.replace(db_path, kept_path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.replace(db_path + suffix, db_path + PRE_RESTORE_SUFFIX + suffix)
+        elif kept_path and os.path.exists(kept_path + suffix):
+            os.remove(kept_path + suffix)
+    os.replace(new_db_path, db_path)
+    return kept_path
+
+
+def select_snapshots_to_keep(snapshots, retention_days=DEFAULT_RETENTION_DAYS, tiers=RETENTION_TIERS, now=None):
+    """Pick the snapshot ids the retention policy keeps
+
+    snapshots is a list of (snapshot_id, created datetime). For every tier
+    the newest snapshot of each of its most recent periods is kept. The
+    newest snapshot overall is always kept, even past the retention window.
+    """
+    if not snapshots:
+        return set()
+
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=retention_days)
+    newest_first = sorted(snapshots, key=lambda snapshot: (snapshot[1], snapshot[0]), reverse=True)
+
+    keep = {newest_first[0][0]}
+    for tier, count in tiers:
+        periods = set()
+        for snapshot_id, created in newest_first:
+            if created < cutoff or len(periods) >= count:
+                break
+            period = _tier_period(tier, created)
+            if period not in periods:
+                periods.add(period)
+                keep.add(snapshot_id)
+    return keep
+
+
+class BackupStore:
+    """Content-addressed, deduplicated backup store
+
+    Every file is cut into chunks that are stored once under their SHA-256
+    hash in objects/, and each snapshot is a JSON manifest in manifests/
+    listing the chunks of the database and of every protected file. A new
+    snapshot only writes the chunks that no earlier snapshot has, so
+    unchanged photos, logos, PDFs and database pages cost nothing, and any
+    snapshot can be restored on its own.
+    """
+
+    def __init__(self, root):
+        """Initialize the store rooted at a backup directory"""
+        self.root = root
+        self.objects_dir = os.path.join(root, OBJECTS_DIR)
+        self.manifests_dir = os.path.join(root, MANIFESTS_DIR)
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self._lock = threading.RLock()
+        self._index = None
+        self._index_mtime = None
+
+    def create_snapshot(self, db_path, extra_paths=(), progress=None, compress_level=DEFAULT_COMPRESS_LEVEL,
+                        throttle=None):
+        """Snapshot the database and the extra files; returns the new manifest
+
+        extra_paths lists (path, arcname) pairs like write_snapshot_archive;
+        directories are added recursively and missing paths are skipped.
+        Files whose size and modification time match the previous snapshot
+        reuse its chunks without being read again. progress(done_bytes,
+        total_bytes) covers the database copy and every byte read; raising
+        from it abandons the snapshot.
+        """
+        with self._lock:
+            os.makedirs(self.objects_dir, exist_ok=True)
+            os.makedirs(self.manifests_dir, exist_ok=True)
+            index = self._load_index()
+
+            previous = self.latest_manifest()
+            previous_files = {entry["path"]: entry for entry in previous["files"]} if previous else {}
+            stats = {"new_objects": 0, "new_bytes": 0}
+
+            # Decide up front which files must be read, so progress has a total
+            files = []
+            changed_bytes = 0
+            for path, arcname in walk_backup_paths(extra_paths):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = previous_files.get(arcname)
+                if (entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+                        and all(self.has_object(digest) for digest in entry["chunks"])):
+                    files.append((None, arcname, stat, dict(entry)))
+                else:
+                    files.append((path, arcname, stat, None))
+                    changed_bytes += stat.st_size
+
+            db_size = os.path.getsize(db_path)
+            tracker = BackupProgress(progress, 2 * db_size + changed_bytes)
+
+            def snapshot_progress(copied, total):
+                tracker.advance(copied - snapshot_progress.copied)
+                snapshot_progress.copied = copied
+            snapshot_progress.copied = 0
+
+            with tempfile.TemporaryDirectory(prefix=".snapshot_", dir=self.root) as work_dir:
+                snapshot_path = os.path.join(work_dir, os.path.basename(db_path))
+                snapshot_database(db_path, snapshot_path, progress=snapshot_progress, throttle=throttle)
+                tracker.add_total(os.path.getsize(snapshot_path) - db_size)
+                database = self._store_file(snapshot_path, DB_CHUNK_SIZE, stats, compress_level, throttle, tracker)
+                database["name"] = os.path.basename(db_path)
+                database["checksums"] = database_checksums(snapshot_path)
+
+            stored_files = []
+            for path, arcname, stat, entry in files:
+                if entry is None:
+                    entry = self._store_file(path, FILE_CHUNK_SIZE, stats, compress_level, throttle, tracker)
+                    entry["path"] = arcname
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                stored_files.append(entry)
+            files = stored_files
+
+            created = datetime.now()
+            manifest = {
+                "id": self._new_snapshot_id(created),
+                "created": created.strftime("%Y-%m-%d %H:%M:%S"),
+                "database": database,
+                "files": files,
+                "total_bytes": database["size"] + sum(entry["size"] for entry in files),
+                "new_objects": stats["new_objects"],
+                "new_bytes": stats["new_bytes"]
+            }
+            self._write_json(self.manifest_path(manifest["id"]), manifest)
+
+            index["snapshots"][manifest["id"]] = self._index_entry(manifest)
+            index["stored_bytes"] += stats["new_bytes"]
+            self._save_index(index)
+            return manifest
+
+    def prune(self, retention_days=DEFAULT_RETENTION_DAYS, tiers=RETENTION_TIERS, now=None):
+        """Apply the retention policy and free the chunks no snapshot uses any more
+
+        Legacy zip backups older than the retention window are removed too.
+        Returns a summary with the removed snapshot ids and the bytes freed.
+        """
+        with self._lock:
+            index = self._load_index()
+            snapshots = [(snapshot_id, datetime.strptime(entry["created"], "%Y-%m-%d %H:%M:%S"))
+                         for snapshot_id, entry in index["snapshots"].items()]
+            keep = select_snapshots_to_keep(snapshots, retention_days, tiers, now)
+            removed = sorted(snapshot_id for snapshot_id, created in snapshots if snapshot_id not in keep)
+
+            for snapshot_id in removed:
+                try:
+                    os.remove(self.manifest_path(snapshot_id))
+                except FileNotFoundError:
+                    pass
+                del index["snapshots"][snapshot_id]
+
+            objects_removed, bytes_freed, stored_bytes = self._collect_garbage()
+            index["stored_bytes"] = stored_bytes
+            self._save_index(index)
+
+            archives_removed = self._prune_legacy_archives(retention_days, now)
+            return {
+                "removed": removed,
+                "kept": len(index["snapshots"]),
+                "objects_removed": objects_removed,
+                "bytes_freed": bytes_freed,
+                "archives_removed": archives_removed
+            }
+
+    def snapshot_index(self):
+        """Cached list of snapshots with their sizes, newest first
+
+        Each entry has id, created, total_bytes (size of everything the
+        snapshot restores), new_bytes (what it added to the store) and files.
+        """
+        with self._lock:
+            index = self._load_index()
+            entries = [dict(entry, id=snapshot_id) for snapshot_id, entry in index["snapshots"].items()]
+        entries.sort(key=lambda entry: entry["id"], reverse=True)
+        return entries
+
+    def stored_bytes(self):
+        """Bytes used by all chunks in the store"""
+        with self._lock:
+            return self._load_index()["stored_bytes"]
+
+    def restore_snapshot(self, snapshot_id, target_dir, include_files=True):
+        """Rebuild a snapshot's database (and optionally its files) under target_dir
+
+        Returns the path of the restored database file.
+        """
+        manifest = self.load_manifest(snapshot_id)
+        os.makedirs(target_dir, exist_ok=True)
+
+        db_path = os.path.join(target_dir, manifest["database"]["name"])
+        self._restore_file(manifest["database"], db_path)
+
+        if include_files:
+            for entry in manifest["files"]:
+                self._restore_file(entry, os.path.join(target_dir, *entry["path"].split("/")))
+        return db_path
+
+    def verify_snapshot(self, snapshot_id):
+        """Check that a snapshot restores to a sound database matching its manifest
+
+        Returns {"id", "ok", "problems", "seconds"}.
+        """
+        with self._lock:
+            return self._verify_snapshot(snapshot_id, set(), threading.Lock())
+
+    def verify_snapshots(self, snapshot_ids=None, max_workers=None, progress=None):
+        """Verify many snapshots (all by default) concurrently on a thread pool
+
+        Chunks shared between snapshots are only read and hashed once.
+        progress(done, total, result) is called as each snapshot finishes.
+        Returns the results, newest snapshot first.
+        """
+        with self._lock:
+            snapshot_ids = list(snapshot_ids) if snapshot_ids is not None else self.list_snapshots()
+            if not snapshot_ids:
+                return []
+
+            verified_chunks = set()
+            chunks_lock = threading.Lock()
+            results = []
+            workers = min(max_workers or os.cpu_count() or 1, len(snapshot_ids))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gti-verify") as executor:
+                futures = [executor.submit(self._verify_snapshot, snapshot_id, verified_chunks, chunks_lock)
+                           for snapshot_id in snapshot_ids]
+                for done, future in enumerate(as_completed(futures), 1):
+                    result = future.result()
+                    results.append(result)
+                    if progress:
+                        progress(done, len(futures), result)
+
+            results.sort(key=lambda result: result["id"], reverse=True)
+            return results
+
+    def restore_database(self, snapshot_id, db_path):
+        """Restore a snapshot's database over db_path, only if it passes verification
+
+        The snapshot is rebuilt and checked next to db_path and then swapped
+        in atomically; a snapshot that fails raises ValueError and the live
+        database is left untouched. The app's connections must be closed.
+        Returns the path where the previous database was kept.
+        """
+        with self._lock:
+            manifest = self.load_manifest(snapshot_id)
+            work_dir = tempfile.mkdtemp(prefix=".restore_", dir=os.path.dirname(os.path.abspath(db_path)))
+            try:
+                restored_path = os.path.join(work_dir, manifest["database"]["name"])
+                self._restore_file(manifest["database"], restored_path)
+
+                problems = check_database(restored_path, manifest["database"].get("checksums"))
+                if problems:
+                    raise ValueError(f"Backup {snapshot_id} failed verification: {'; '.join(problems)}")
+
+                return swap_database(restored_path, db_path)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def delete_snapshot(self, snapshot_id):
+        """Remove a snapshot; its chunks are freed by the next prune"""
+        with self._lock:
+            index = self._load_index()
+            os.remove(self.manifest_path(snapshot_id))
+            index["snapshots"].pop(snapshot_id, None)
+            self._save_index(index)
+
+    def list_snapshots(self):
+        """Snapshot ids in the store, oldest first"""
+        return sorted(entry["id"] for entry in self.snapshot_index())
+
+    def latest_manifest(self):
+        """Manifest of the newest snapshot, or None"""
+        snapshots = self.list_snapshots()
+        return self.load_manifest(snapshots[-1]) if snapshots else None
+
+    def load_manifest(self, snapshot_id):
+        """Read a snapshot manifest"""
+        with open(self.manifest_path(snapshot_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def manifest_path(self, snapshot_id):
+        """Path of a snapshot manifest"""
+        return os.path.join(self.manifests_dir, f"{snapshot_id}.json")
+
+    def object_path(self, digest):
+        """Path of a stored chunk"""
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def has_object(self, digest):
+        """Check whether a chunk is already stored"""
+        return os.path.exists(self.object_path(digest))
+
+    def read_object(self, digest):
+        """Read a chunk back, checking it against its hash"""
+        with open(self.object_path(digest), "rb") as f:
+            data = f.read()
+        try:
+            data = zlib.decompress(data[1:]) if data[:1] == _COMPRESSED else data[1:]
+        except zlib.error:
+            raise ValueError(f"Backup chunk {digest} is corrupt")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup chunk {digest} is corrupt")
+        return data
+
+    def _store_file(self, path, chunk_size, stats, compress_level=DEFAULT_COMPRESS_LEVEL, throttle=None, tracker=None):
+        """Store a file's chunks; returns its manifest entry"""
+        chunks = []
+        size = 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                if throttle:
+                    throttle.consume(len(data))
+                size += len(data)
+                chunks.append(self._store_object(data, stats, compress_level))
+                if tracker:
+                    tracker.advance(len(data))
+        return {"size": size, "chunks": chunks}
+
+    def _store_object(self, data, stats, compress_level=DEFAULT_COMPRESS_LEVEL):
+        """Store one chunk unless it is already present; returns its hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            return digest
+
+        compressed = zlib.compress(data, compress_level) if compress_level else data
+        payload = _COMPRESSED + compressed if len(compressed) < len(data) else _STORED + data
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+
+        stats["new_objects"] += 1
+        stats["new_bytes"] += len(payload)
+        return digest
+
+    def _verify_snapshot(self, snapshot_id, verified_chunks, chunks_lock):
+        """Verify one snapshot (runs on a verify worker)"""
+        started = time.monotonic()
+        problems = []
+        try:
+            manifest = self.load_manifest(snapshot_id)
+            with tempfile.TemporaryDirectory(prefix=".verify_", dir=self.root) as work_dir:
+                db_path = os.path.join(work_dir, manifest["database"]["name"])
+                self._restore_file(manifest["database"], db_path)
+                problems.extend(check_database(db_path, manifest["database"].get("checksums")))
+
+            for entry in manifest["files"]:
+                for digest in entry["chunks"]:
+                    with chunks_lock:
+                        if digest in verified_chunks:
+                            continue
+                    try:
+                        self.read_object(digest)
+                    except (OSError, ValueError) as e:
+                        problems.append(f"{entry['path']}: {e}")
+                        break
+                    with chunks_lock:
+                        verified_chunks.add(digest)
+        except Exception as e:
+            problems.append(str(e))
+
+        return {
+            "id": snapshot_id,
+            "ok": not problems,
+            "problems": problems,
+            "seconds": round(time.monotonic() - started, 3)
+        }
+
+    def _restore_file(self, entry, path):
+        """Write a file back from its chunks (via a temporary name)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.restore.tmp"
+        with open(temp_path, "wb") as f:
+            for digest in entry["chunks"]:
+                f.write(self.read_object(digest))
+        os.replace(temp_path, path)
+        if "mtime_ns" in entry:
+            os.utime(path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+
+    def _load_index(self):
+        """Load the snapshot index, rebuilding it from the manifests if it is missing"""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        if self._index is not None and mtime == self._index_mtime:
+            return self._index
+
+        index = None
+        if mtime is not None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading backup index, rebuilding it: {e}")
+
+        if index is None:
+            index = self._rebuild_index()
+            if os.path.isdir(self.root):
+                self._save_index(index)
+            return index
+
+        self._index = index
+        self._index_mtime = mtime
+        return index
+
+    def _rebuild_index(self):
+        """Build the snapshot index by reading every manifest"""
+        index = {"snapshots": {}, "stored_bytes": 0}
+        if os.path.isdir(self.manifests_dir):
+            for name in os.listdir(self.manifests_dir):
+                if name.endswith(".json"):
+                    try:
+                        manifest = self.load_manifest(name[:-5])
+                    except (OSError, ValueError) as e:
+                        print(f"Error reading backup manifest {name}: {e}")
+                        continue
+                    index["snapshots"][manifest["id"]] = self._index_entry(manifest)
+        index["stored_bytes"] = sum(size for path, size, mtime in self._iter_objects())
+        return index
+
+    def _save_index(self, index):
+        """Write the snapshot index and remember it in memory"""
+        self._write_json(self.index_path, index)
+        self._index = index
+        self._index_mtime = os.stat(self.index_path).st_mtime_ns
+
+    def _index_entry(self, manifest):
+        """Summary of a manifest kept in the index"""
+        return {
+            "created": manifest["created"],
+            "total_bytes": manifest["total_bytes"],
+            "new_bytes": manifest["new_bytes"],
+            "files": len(manifest["files"])
+        }
+
+    def _iter_objects(self):
+        """Yield (path, size, mtime) for every stored chunk"""
+        if not os.path.isdir(self.objects_dir):
+            return
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for entry in os.scandir(prefix_dir):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _collect_garbage(self):
+        """Delete chunks that no manifest references; returns (removed, bytes_freed, bytes_left)"""
+        referenced = set()
+        for snapshot_id in self._load_index()["snapshots"]:
+            manifest = self.load_manifest(snapshot_id)
+            referenced.update(manifest["database"]["chunks"])
+            for entry in manifest["files"]:
+                referenced.update(entry["chunks"])
+
+        grace_cutoff = time.time() - GC_GRACE_SECONDS
+        removed = bytes_freed = bytes_left = 0
+        for path, size, mtime in list(self._iter_objects()):
+            digest = os.path.basename(os.path.dirname(path)) + os.path.basename(path)
+            if digest in referenced or mtime > grace_cutoff:
+                bytes_left += size
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+                bytes_freed += size
+            except OSError as e:
+                print(f"Error removing backup chunk {digest}: {e}")
+                bytes_left += size
+        return removed, bytes_freed, bytes_left
+
+    def _prune_legacy_archives(self, retention_days, now=None):
+        """Remove full-zip backups older than the retention window; returns how many"""
+        cutoff = ((now or datetime.now()) - timedelta(days=retention_days)).timestamp()
+        removed = 0
+        try:
+            for entry in os.scandir(self.root):
+                if (entry.is_file() and entry.name.endswith(".zip")
+                        and entry.name.startswith(LEGACY_ARCHIVE_PREFIXES)
+                        and entry.stat().st_mtime < cutoff):
+                    os.remove(entry.path)
+                    removed += 1
+        except OSError as e:
+            print(f"Error pruning old backup archives: {e}")
+        return removed
+
+    def _new_snapshot_id(self, created):
+        """Timestamped snapshot id that does not clash with an existing one"""
+        base = created.strftime("%Y%m%d_%H%M%S")
+        snapshot_id = base
+        counter = 1
+        while os.path.exists(self.manifest_path(snapshot_id)):
+            snapshot_id = f"{base}_{counter}"
+            counter += 1
+        return snapshot_id
+
+    def _write_json(self, path, data):
+        """Write a JSON file atomically"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, path)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_backup_store(root):
+    """Get the shared BackupStore for a backup directory
+
+    Backups and pruning of the same directory go through one instance, so
+    they are serialized and share its cached index.
+    """
+    key = os.path.normcase(os.path.abspath(root))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = BackupStore(root)
+        return store
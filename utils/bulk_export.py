@@ -0,0 +1,132 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, date
+
+INVOICES_DIR = "invoices"
+
+
+def invoice_pdf_path(invoice_number, is_pending=False, directory=INVOICES_DIR):
+    """Path of an invoice PDF, named the same way as the billing screen names it"""
+    prefix = "Pending_Invoice_" if is_pending else "Invoice_"
+    safe_invoice_number = invoice_number.replace('/', '_')
+    return os.path.join(directory, f"{prefix}{safe_invoice_number}.pdf")
+
+
+def render_invoice_job(invoice, file_path):
+    """Render one invoice PDF in a worker process; returns (invoice_number, file_path, rendered, error)
+
+    rendered is False when the existing PDF was already up to date.
+    """
+    from utils.invoice_template import get_invoice_template
+
+    try:
+        invoice_date = invoice["date"]
+        if isinstance(invoice_date, str):
+            try:
+                invoice_date = datetime.strptime(invoice_date, "%Y-%m-%d").date()
+            except ValueError:
+                invoice_date = date.today()
+
+        customer = {
+            "name": invoice["customer_name"],
+            "place": invoice["customer_place"],
+            "phone": invoice["customer_phone"],
+            "gst": invoice["customer_gst"],
+            "email": invoice.get("customer_email", "")
+        }
+
+        # Each worker process compiles the template once and reuses it
+        rendered = get_invoice_template().render_if_changed(
+            file_path, invoice["invoice_number"], customer, invoice["items"], invoice_date,
+            invoice["subtotal"], invoice["extra_charges"], invoice["total"],
+            invoice["payment_mode"], invoice["p_pay_no"], invoice.get("extra_charges_breakdown")
+        )
+        return invoice["invoice_number"], file_path, rendered, None
+    except Exception as e:
+        return invoice["invoice_number"], None, False, str(e)
+
+
+def export_invoices(invoices, directory=INVOICES_DIR, max_workers=None, progress=None, should_cancel=None):
+    """Render PDFs for many invoices in parallel on a process pool
+
+    invoices come from DatabaseManager.get_invoices_for_export. progress(done,
+    total, invoice_number, error) is called as each PDF finishes, and
+    should_cancel() is checked between PDFs. PDFs whose content has not changed
+    are kept as they are. Returns a summary dict with the written paths, the
+    number left unchanged, the failures and whether the export was cancelled.
+    """
+    result = {"total": len(invoices), "written": [], "unchanged": 0, "failed": [], "cancelled": False}
+    if not invoices:
+        return result
+
+    os.makedirs(directory, exist_ok=True)
+    workers = min(max_workers or os.cpu_count() or 1, len(invoices))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(render_invoice_job, invoice, invoice_pdf_path(invoice["invoice_number"], directory=directory))
+            for invoice in invoices
+        ]
+
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                invoice_number, file_path, rendered, error = future.result()
+            except Exception as e:
+                # The worker process itself failed (e.g. it was killed)
+                invoice_number, file_path, rendered, error = None, None, False, str(e)
+
+            if error:
+                result["failed"].append((invoice_number, error))
+            elif rendered:
+                result["written"].append(file_path)
+            else:
+                result["unchanged"] += 1
+
+            if progress:
+                progress(done, len(futures), invoice_number, error)
+
+            if should_cancel and should_cancel():
+                for pending in futures:
+                    pending.cancel()
+                result["cancelled"] = True
+                break
+
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from database_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Regenerate invoice PDFs in bulk")
+    parser.add_argument("--from", dest="from_date", help="first invoice date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", help="last invoice date (YYYY-MM-DD)")
+    parser.add_argument("--customer", help="only invoices for customers whose name contains this text")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default=INVOICES_DIR, help="output directory (default: invoices)")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    try:
+        invoices = db.get_invoices_for_export(args.customer, args.from_date, args.to_date)
+    finally:
+        db.close()
+
+    if not invoices:
+        print("No invoices match")
+        sys.exit(0)
+
+    def print_progress(done, total, invoice_number, error):
+        status = f"failed: {error}" if error else "ok"
+        print(f"[{done}/{total}] {invoice_number} {status}", flush=True)
+
+    started = datetime.now()
+    summary = export_invoices(invoices, args.output, args.workers, print_progress)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    print(f"Wrote {len(summary['written'])} of {summary['total']} invoice PDF(s) to {args.output} "
+          f"({summary['unchanged']} unchanged) in {elapsed:.1f}s")
+    sys.exit(1 if summary["failed"] else 0)
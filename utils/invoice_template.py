@@ -0,0 +1,472 @@
+import os
+import io
+import json
+import hashlib
+import threading
+from datetime import datetime
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch, cm
+from reportlab.lib.colors import HexColor
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+from .qr_cache import get_qr_cache
+
+# Bump when the invoice layout changes so existing PDFs are re-rendered
+TEMPLATE_VERSION = 1
+
+SETTINGS_PATH = "config/settings.json"
+LOGO_PATHS = ["assets/images/logo.png", "ganesh_toughened_industry/assets/images/logo.png"]
+
+# Modern color scheme
+PRIMARY_COLOR = "#000080"  # dark blue
+LIGHT_GRAY = "#D3D3D3"  # light gray
+
+# Settings that appear on the invoice (part of each PDF's content hash)
+INVOICE_SETTINGS = ["company_name", "company_address", "company_phone", "company_gst",
+                    "upi_id", "upi_name", "bank_name", "bank_account", "bank_ifsc", "bank_branch"]
+
+# Item fields printed on the invoice
+INVOICE_ITEM_FIELDS = ["product_name", "actual_height", "actual_width", "chargeable_height",
+                       "chargeable_width", "sqft", "rounded_sqft", "rate", "quantity", "amount"]
+
+# Content hashes are kept next to the PDFs, in a hidden sub-folder
+HASH_DIR_NAME = ".hashes"
+
+# Logo box on the invoice and the resolution it is pre-scaled to
+LOGO_WIDTH = 2 * inch
+LOGO_HEIGHT = 1.5 * inch
+LOGO_DPI = 300
+
+
+class InvoiceTemplate:
+    """Compiled invoice layout: styles, table styles, the scaled logo and the
+    static header, bank and footer blocks, built once per settings version
+
+    Rendering an invoice only binds the per-invoice data (details, items,
+    charges, totals, payment and QR code) to the prepared pieces.
+    """
+
+    def __init__(self, settings, logo_path=None):
+        """Build everything that does not depend on the invoice"""
+        self.settings = settings
+
+        self.company_name = settings.get("company_name", "GANESH TOUGHEN INDUSTRY")
+        self.company_address = settings.get("company_address", "Plot no:B13, Industrial Estate, Madanapalli")
+        self.company_phone = settings.get("company_phone", "9398530499, 7013374872")
+        self.company_gst = settings.get("company_gst", "37EXFPK2395C1ZE")
+
+        self.styles = self._build_styles()
+        self.table_styles = self._build_table_styles()
+        self.logo = self._load_logo(logo_path)
+
+        # Everything about the template that affects the output
+        self.fingerprint = hashlib.sha256(json.dumps({
+            "version": TEMPLATE_VERSION,
+            "settings": {key: settings.get(key) for key in INVOICE_SETTINGS},
+            "logo": hashlib.sha256(self.logo).hexdigest() if self.logo else None
+        }, sort_keys=True).encode("utf-8")).hexdigest()
+
+        self.header = self._build_header()
+        self.titles = {
+            False: Paragraph("<b>INVOICE</b>", self.styles["CustomHeading"]),
+            True: Paragraph("<b>PENDING INVOICE</b>", self.styles["CustomHeading"])
+        }
+        self.bank_details = [
+            Paragraph("<b>Bank Details</b>", self.styles["CustomHeading"]),
+            Spacer(1, 0.1*inch),
+            Paragraph(f"Bank: {settings.get('bank_name', '')}", self.styles["CustomNormal"]),
+            Paragraph(f"Account: {settings.get('bank_account', '')}", self.styles["CustomNormal"]),
+            Paragraph(f"IFSC: {settings.get('bank_ifsc', '')}", self.styles["CustomNormal"]),
+            Paragraph(f"Branch: {settings.get('bank_branch', '')}", self.styles["CustomNormal"])
+        ]
+        self.payment_heading = Paragraph("<b>Payment Details</b>", self.styles["CustomHeading"])
+        self.upi_heading = [
+            Paragraph("<b>UPI Payment</b>", self.styles["CustomHeading"]),
+            Spacer(1, 0.1*inch)
+        ]
+
+    def _build_styles(self):
+        """Sample stylesheet plus the custom invoice paragraph styles"""
+        styles = getSampleStyleSheet()
+
+        styles.add(ParagraphStyle(
+            name='CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=20,
+            textColor=HexColor(PRIMARY_COLOR),
+            alignment=TA_CENTER,
+            borderWidth=1,
+            borderColor=HexColor(PRIMARY_COLOR),
+            borderPadding=5
+        ))
+
+        styles.add(ParagraphStyle(
+            name='CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            textColor=HexColor(PRIMARY_COLOR),
+            borderWidth=1,
+            borderColor=HexColor(PRIMARY_COLOR),
+            borderPadding=3
+        ))
+
+        styles.add(ParagraphStyle(
+            name='CustomNormal',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=HexColor("#000000"),  # black
+            spaceAfter=6
+        ))
+
+        return styles
+
+    def _build_table_styles(self):
+        """Table styles for every section of the invoice"""
+        return {
+            "company": TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ]),
+            "company_layout": TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ]),
+            "invoice": TableStyle([
+                ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                ('BACKGROUND', (0, 0), (-1, -1), HexColor(LIGHT_GRAY)),
+                ('BOX', (0, 0), (-1, -1), 1, HexColor(PRIMARY_COLOR)),
+                ('ROUNDEDCORNERS', [10, 10, 10, 10]),
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ]),
+            "items": TableStyle([
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('BACKGROUND', (0, 0), (-1, 0), HexColor(PRIMARY_COLOR)),
+                ('TEXTCOLOR', (0, 0), (-1, 0), HexColor("#FFFFFF")),  # white
+                ('GRID', (0, 0), (-1, -1), 1, HexColor(PRIMARY_COLOR)),
+                ('FONTSIZE', (0, 0), (-1, 0), 9),  # Reduced font size
+                ('FONTSIZE', (0, 1), (-1, -1), 8),  # Reduced font size
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('TOPPADDING', (0, 1), (-1, -1), 6),
+                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('ROUNDEDCORNERS', [10, 10, 10, 10]),
+            ]),
+            "extra_charges": TableStyle([
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+                ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('BACKGROUND', (0, 0), (-1, 0), HexColor(PRIMARY_COLOR)),
+                ('TEXTCOLOR', (0, 0), (-1, 0), HexColor("#FFFFFF")),  # white
+                ('GRID', (0, 0), (-1, -1), 1, HexColor(PRIMARY_COLOR)),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('FONTSIZE', (0, 1), (-1, -1), 9),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('TOPPADDING', (0, 1), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ]),
+            "summary": TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('BACKGROUND', (0, 0), (-1, -1), HexColor(LIGHT_GRAY)),
+                ('GRID', (0, 0), (-1, -1), 1, HexColor(PRIMARY_COLOR)),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                ('TOPPADDING', (0, 0), (-1, -1), 6),
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+                ('ROUNDEDCORNERS', [10, 10, 10, 10]),
+            ]),
+            "payment": TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ])
+        }
+
+    def _load_logo(self, logo_path):
+        """Scale the logo to the printed size once and keep the decoded image
+
+        The source logo is far larger than its 2" x 1.5" box, and embedding it
+        at full size made compressing the image the slowest part of every PDF.
+        """
+        if not logo_path:
+            return None
+
+        try:
+            from PIL import Image
+
+            with Image.open(logo_path) as img:
+                img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("RGBA", "LA") else "RGB")
+                size = (int(LOGO_WIDTH / inch * LOGO_DPI), int(LOGO_HEIGHT / inch * LOGO_DPI))
+                if img.width > size[0] or img.height > size[1]:
+                    img = img.resize(size, Image.LANCZOS)
+
+                buffer = io.BytesIO()
+                img.save(buffer, format="PNG")
+            return buffer.getvalue()
+        except Exception as e:
+            print(f"Error loading invoice logo: {e}")
+            return None
+
+    def _build_header(self):
+        """Logo and company details side by side"""
+        company_details = [
+            [Paragraph(f"<b>{self.company_name}</b>", self.styles["CustomTitle"])],
+            [Paragraph(self.company_address, self.styles["CustomNormal"])],
+            [Paragraph(f"Phone: {self.company_phone}", self.styles["CustomNormal"])],
+            [Paragraph(f"GST: {self.company_gst}", self.styles["CustomNormal"])]
+        ]
+
+        company_table = Table(company_details, colWidths=[10*cm])
+        company_table.setStyle(self.table_styles["company"])
+
+        if self.logo:
+            logo = RLImage(io.BytesIO(self.logo), width=LOGO_WIDTH, height=LOGO_HEIGHT)
+            company_layout_table = Table([[logo, company_table]], colWidths=[2*inch, 10*cm])
+        else:
+            company_layout_table = company_table
+
+        company_layout_table.setStyle(self.table_styles["company_layout"])
+        return company_layout_table
+
+    def upi_qr_image(self, total):
+        """UPI payment QR code for the invoice total as an image flowable"""
+        # Invoices for the same amount share one cached PNG
+        png = get_qr_cache().get_png(
+            self.settings.get("upi_id", ""), self.settings.get("upi_name", ""), total,
+            fill_color=(0, 0, 128), back_color=(255, 255, 255)  # darkblue and white as RGB
+        )
+        return RLImage(io.BytesIO(png), width=1.5*inch, height=1.5*inch)
+
+    def build_elements(self, invoice_number, customer, items, invoice_date, subtotal, total_extra, total,
+                       payment_mode, ppay_no, extra_charges_breakdown=None, is_pending=False):
+        """Bind one invoice's data to the template and return its flowables"""
+        elements = [self.header, Spacer(1, 0.3*inch)]
+
+        # Invoice title
+        elements.append(self.titles[bool(is_pending)])
+        elements.append(Spacer(1, 0.2*inch))
+
+        # Invoice details
+        invoice_data = [
+            ["Invoice #:", invoice_number],
+            ["Date:", invoice_date.strftime("%d/%m/%Y")],
+            ["Customer:", customer["name"]],
+            ["Place:", customer["place"] or ""],
+            ["Phone:", customer["phone"] or ""],
+            ["GST:", customer["gst"] or ""]
+        ]
+
+        if is_pending:
+            invoice_data.append(["Status:", "PENDING"])
+
+        invoice_table = Table(invoice_data, colWidths=[4*cm, 12*cm])
+        invoice_table.setStyle(self.table_styles["invoice"])
+
+        elements.append(invoice_table)
+        elements.append(Spacer(1, 0.3*inch))
+
+        # Items
+        items_data = [[
+            "Product", "Actual Size", "Chargeable Size", "SQ.FT", "Rounded SQ.FT", "Rate", "Qty", "Amount"
+        ]]
+
+        for item in items:
+            actual_size = f"{item['actual_height']}\" x {item['actual_width']}\""
+            chargeable_size = f"{item['chargeable_height']}\" x {item['chargeable_width']}\""
+            items_data.append([
+                item["product_name"],
+                actual_size,
+                chargeable_size,
+                f"{item['sqft']:.2f}",
+                f"{item['rounded_sqft']:.1f}",
+                f"{item['rate']:.2f}",
+                str(item["quantity"]),
+                f"{item['amount']:.2f}"
+            ])
+
+        items_table = Table(items_data, colWidths=[3.5*cm, 2.5*cm, 2.5*cm, 1.5*cm, 2*cm, 1.5*cm, 1*cm, 2*cm])
+        items_table.setStyle(self.table_styles["items"])
+
+        elements.append(items_table)
+        elements.append(Spacer(1, 0.3*inch))
+
+        # Extra charges - always show the full breakdown
+        extra_charges = {}
+        if extra_charges_breakdown:
+            try:
+                extra_charges = json.loads(extra_charges_breakdown)
+            except:
+                pass
+
+        extra_charges_data = [
+            ["Description", "Amount"],
+            ["Cut Out Charges", f"{float(extra_charges.get('cutout', 0)):.2f}"],
+            ["Hole Charges", f"{float(extra_charges.get('hole', 0)):.2f}"],
+            ["Door Handle Hole Charges", f"{float(extra_charges.get('handle', 0)):.2f}"],
+            ["Jumbo Size Charges", f"{float(extra_charges.get('jumbo', 0)):.2f}"]
+        ]
+
+        extra_charges_table = Table(extra_charges_data, colWidths=[8*cm, 4*cm])
+        extra_charges_table.setStyle(self.table_styles["extra_charges"])
+
+        elements.append(extra_charges_table)
+        elements.append(Spacer(1, 0.3*inch))
+
+        # Summary
+        summary_data = [
+            ["Subtotal:", f"{subtotal:.2f}"],
+            ["Extra Charges:", f"{total_extra:.2f}"],
+            ["Total:", f"{total:.2f}"]
+        ]
+
+        summary_table = Table(summary_data, colWidths=[12*cm, 4*cm])
+        summary_table.setStyle(self.table_styles["summary"])
+
+        elements.append(summary_table)
+        elements.append(Spacer(1, 0.3*inch))
+
+        # Payment details with bank info and QR code heading side by side
+        payment_layout = Table([
+            [
+                [
+                    self.payment_heading,
+                    Spacer(1, 0.2*inch),
+                    Paragraph(f"Payment Mode: {payment_mode or ''}", self.styles["CustomNormal"]),
+                    Paragraph(f"P-PAY No.: {ppay_no or ''}", self.styles["CustomNormal"]),
+                    Spacer(1, 0.3*inch)
+                ] + self.bank_details,
+                self.upi_heading
+            ]
+        ], colWidths=[10*cm, 5*cm])
+        payment_layout.setStyle(self.table_styles["payment"])
+
+        elements.append(payment_layout)
+        elements.append(Spacer(1, 0.3*inch))
+
+        # UPI QR code
+        elements.append(self.upi_qr_image(total))
+
+        # Footer
+        footer_text = f"Generated on {datetime.now().strftime('%d/%m/%Y %H:%M:%S')} | {self.company_name}"
+        if is_pending:
+            footer_text += " | PENDING INVOICE"
+        elements.append(Spacer(1, 0.5*inch))
+        elements.append(Paragraph(footer_text, self.styles["CustomNormal"]))
+
+        return elements
+
+    def render(self, file_path, *args, **kwargs):
+        """Write one invoice PDF; arguments are those of build_elements"""
+        doc = SimpleDocTemplate(file_path, pagesize=A4,
+                                rightMargin=30, leftMargin=30,
+                                topMargin=30, bottomMargin=30)
+        doc.build(self.build_elements(*args, **kwargs))
+        return True
+
+    def content_hash(self, invoice_number, customer, items, invoice_date, subtotal, total_extra, total,
+                     payment_mode, ppay_no, extra_charges_breakdown=None, is_pending=False):
+        """Hash of everything an invoice PDF is rendered from"""
+        data = {
+            "template": self.fingerprint,
+            "invoice": [invoice_number, str(invoice_date), subtotal, total_extra, total,
+                        payment_mode, ppay_no, extra_charges_breakdown, bool(is_pending)],
+            "customer": [customer.get("name"), customer.get("place"), customer.get("phone"), customer.get("gst")],
+            "items": [[item.get(field) for field in INVOICE_ITEM_FIELDS] for item in items]
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def render_if_changed(self, file_path, *args, **kwargs):
+        """Render an invoice PDF unless the existing file was rendered from the same content
+
+        Returns True if the PDF was written, False if the existing file was kept.
+        """
+        digest = self.content_hash(*args, **kwargs)
+        hash_path = get_hash_path(file_path)
+
+        # The hash is only trusted for the exact PDF it was written for, so a
+        # PDF copied back from a backup (hashes are not backed up) is re-rendered
+        version = _file_version(file_path)
+        if version is not None:
+            try:
+                with open(hash_path, "r") as f:
+                    if f.read().strip() == _hash_record(digest, version):
+                        return False
+            except OSError:
+                pass
+
+        # Drop the old hash first so a failed render is never mistaken for a current one
+        try:
+            os.remove(hash_path)
+        except OSError:
+            pass
+
+        self.render(file_path, *args, **kwargs)
+
+        try:
+            version = _file_version(file_path)
+            if version is not None:
+                os.makedirs(os.path.dirname(hash_path), exist_ok=True)
+                with open(hash_path, "w") as f:
+                    f.write(_hash_record(digest, version))
+        except OSError as e:
+            print(f"Error saving invoice hash: {e}")
+        return True
+
+
+def _hash_record(digest, version):
+    """Sidecar contents: the content hash plus the (mtime, size) of the PDF it rendered"""
+    mtime_ns, size = version
+    return f"{digest} {mtime_ns} {size}"
+
+
+def get_hash_path(file_path):
+    """Where the content hash of a rendered PDF is stored"""
+    directory, name = os.path.split(file_path)
+    return os.path.join(directory, HASH_DIR_NAME, f"{name}.sha256")
+
+
+# Compiled templates are cached per thread: reportlab flowables keep layout
+# state while a document is built, so concurrent renders must not share them
+_local = threading.local()
+
+
+def _file_version(path):
+    """(mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def get_invoice_template(settings_path=SETTINGS_PATH):
+    """Get the compiled invoice template, rebuilding it when settings or the logo change"""
+    logo_path = next((path for path in LOGO_PATHS if os.path.exists(path)), None)
+    version = (settings_path, _file_version(settings_path), logo_path, logo_path and _file_version(logo_path))
+
+    cached = getattr(_local, "template", None)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # Load settings from JSON file
+    settings = {}
+    try:
+        with open(settings_path, 'r') as f:
+            settings = json.load(f)
+    except:
+        settings = {}
+
+    template = InvoiceTemplate(settings, logo_path)
+    _local.template = (version, template)
+    return template
@@ -0,0 +1,338 @@
+import os
+import sqlite3
+from datetime import datetime
+
+
+def _add_rounded_sqft_column(cursor):
+    """Add invoice_items.rounded_sqft on databases created before it existed"""
+    cursor.execute("PRAGMA table_info(invoice_items)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'rounded_sqft' not in columns:
+        cursor.execute("ALTER TABLE invoice_items ADD COLUMN rounded_sqft REAL")
+
+
+def _add_inventory_invoice_column(cursor):
+    """Add inventory.invoice_id so an invoice's stock movements can be found again"""
+    cursor.execute("PRAGMA table_info(inventory)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'invoice_id' not in columns:
+        cursor.execute("ALTER TABLE inventory ADD COLUMN invoice_id INTEGER")
+
+
+# Documents in the full-text search index:
+# (kind, table, id column, kind code, customer id, title, details).
+# Expressions use {row} for the indexed row (NEW/OLD in triggers). Each
+# document's rowid is id * 8 + kind code, so triggers update it by rowid.
+SEARCH_DOCUMENTS = [
+    ("customer", "customers", "customer_id", 1,
+     "{row}.customer_id",
+     "{row}.name",
+     "COALESCE({row}.place, '') || ' ' || COALESCE({row}.phone, '') || ' ' || COALESCE({row}.gst, '')"),
+    ("invoice", "invoices", "invoice_id", 2,
+     "{row}.customer_id",
+     "{row}.invoice_number",
+     "COALESCE({row}.date, '') || ' ' || COALESCE({row}.payment_mode, '') || ' ' || COALESCE({row}.p_pay_no, '')"),
+    ("pending_invoice", "pending_invoices", "pending_invoice_id", 3,
+     "{row}.customer_id",
+     "{row}.invoice_number",
+     "COALESCE({row}.date, '') || ' ' || COALESCE({row}.payment_mode, '') || ' ' || COALESCE({row}.p_pay_no, '')"),
+    ("visit", "customer_visits", "visit_id", 4,
+     "{row}.customer_id",
+     "{row}.name",
+     "COALESCE({row}.date, '') || ' ' || COALESCE({row}.city, '') || ' ' || COALESCE({row}.purpose, '')"),
+    ("work", "works", "work_id", 5,
+     "(SELECT customer_id FROM invoices WHERE invoice_id = {row}.invoice_id)",
+     "{row}.type",
+     "COALESCE({row}.date, '') || ' ' || COALESCE({row}.size, '') || ' ' || COALESCE({row}.status, '')"),
+    ("payment", "payments", "payment_id", 6,
+     "{row}.customer_id",
+     "{row}.reference",
+     "COALESCE({row}.date, '') || ' ' || COALESCE({row}.mode, '') || ' ' || COALESCE({row}.notes, '')"),
+]
+
+
+def _search_index_steps():
+    """SQL that creates, seeds and maintains the search_index FTS5 table"""
+    steps = ["""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            kind UNINDEXED, ref_id UNINDEXED, customer_id UNINDEXED, title, details,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+        )
+        """]
+
+    for kind, table, id_column, code, customer, title, details in SEARCH_DOCUMENTS:
+        def document(row):
+            return (f"{row}.{id_column} * 8 + {code}, '{kind}', {row}.{id_column}, "
+                    f"{customer.format(row=row)}, {title.format(row=row)}, {details.format(row=row)}")
+
+        insert = "INSERT INTO search_index (rowid, kind, ref_id, customer_id, title, details)"
+        delete = f"DELETE FROM search_index WHERE rowid = OLD.{id_column} * 8 + {code};"
+        steps += [
+            f"{insert} SELECT {document('r')} FROM {table} r",
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table}
+            BEGIN
+                {insert} VALUES ({document('NEW')});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE ON {table}
+            BEGIN
+                {delete}
+                {insert} VALUES ({document('NEW')});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table}
+            BEGIN
+                {delete}
+            END
+            """,
+        ]
+    return steps
+
+
+# Ordered schema migrations: (version, description, steps).
+# A step is either an SQL statement or a callable taking a cursor.
+# Never edit or reorder an applied migration; append a new one instead.
+MIGRATIONS = [
+    (1, "Add rounded_sqft to invoice items", [
+        _add_rounded_sqft_column,
+    ]),
+    (2, "Add indexes for customer and date lookups", [
+        # Invoices: per-customer history/outstanding and date-range searches
+        "CREATE INDEX IF NOT EXISTS idx_invoices_customer_date ON invoices (customer_id, date, total)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices (date, customer_id, total)",
+        "CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice ON invoice_items (invoice_id, product_id)",
+
+        # Payments: per-customer ledgers, invoice links and date-range reports
+        "CREATE INDEX IF NOT EXISTS idx_payments_customer_date ON payments (customer_id, date, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_payments_invoice ON payments (invoice_id)",
+        "CREATE INDEX IF NOT EXISTS idx_payments_date ON payments (date, mode)",
+
+        # Pending invoices mirror the invoice lookups
+        "CREATE INDEX IF NOT EXISTS idx_pending_invoices_customer_date ON pending_invoices (customer_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_pending_invoices_date ON pending_invoices (date)",
+        "CREATE INDEX IF NOT EXISTS idx_pending_invoice_items_invoice ON pending_invoice_items (pending_invoice_id)",
+
+        # Daily views (worker_id, date is already covered by the UNIQUE constraint)
+        "CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date, worker_id)",
+        "CREATE INDEX IF NOT EXISTS idx_inventory_product_date ON inventory (product_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_inventory_date ON inventory (date)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_visits_date ON customer_visits (date)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_visits_customer ON customer_visits (customer_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_works_date ON works (date, status)",
+        "CREATE INDEX IF NOT EXISTS idx_works_status_date ON works (status, date)",
+        "CREATE INDEX IF NOT EXISTS idx_works_invoice ON works (invoice_id)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date, category)",
+
+        # Customer lookups by name (combobox selection, name filters)
+        "CREATE INDEX IF NOT EXISTS idx_customers_name ON customers (name)",
+
+        "ANALYZE",
+    ]),
+    (3, "Add customer balance ledger maintained by triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS customer_balances (
+            customer_id INTEGER PRIMARY KEY,
+            total_invoices REAL NOT NULL DEFAULT 0,
+            total_payments REAL NOT NULL DEFAULT 0
+        )
+        """,
+        # Seed the ledger from existing history
+        """
+        INSERT OR REPLACE INTO customer_balances (customer_id, total_invoices, total_payments)
+        SELECT c.customer_id,
+               COALESCE((SELECT SUM(total) FROM invoices i WHERE i.customer_id = c.customer_id), 0),
+               COALESCE((SELECT SUM(amount) FROM payments p WHERE p.customer_id = c.customer_id), 0)
+        FROM customers c
+        """,
+
+        # Invoices
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_invoices_balance_insert
+        AFTER INSERT ON invoices WHEN NEW.customer_id IS NOT NULL
+        BEGIN
+            INSERT INTO customer_balances (customer_id, total_invoices)
+            VALUES (NEW.customer_id, COALESCE(NEW.total, 0))
+            ON CONFLICT(customer_id) DO UPDATE
+            SET total_invoices = total_invoices + excluded.total_invoices;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_invoices_balance_delete
+        AFTER DELETE ON invoices WHEN OLD.customer_id IS NOT NULL
+        BEGIN
+            UPDATE customer_balances
+            SET total_invoices = total_invoices - COALESCE(OLD.total, 0)
+            WHERE customer_id = OLD.customer_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_invoices_balance_update
+        AFTER UPDATE OF customer_id, total ON invoices
+        BEGIN
+            UPDATE customer_balances
+            SET total_invoices = total_invoices - COALESCE(OLD.total, 0)
+            WHERE customer_id = OLD.customer_id;
+            INSERT INTO customer_balances (customer_id, total_invoices)
+            SELECT NEW.customer_id, COALESCE(NEW.total, 0) WHERE NEW.customer_id IS NOT NULL
+            ON CONFLICT(customer_id) DO UPDATE
+            SET total_invoices = total_invoices + excluded.total_invoices;
+        END
+        """,
+
+        # Payments
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_balance_insert
+        AFTER INSERT ON payments WHEN NEW.customer_id IS NOT NULL
+        BEGIN
+            INSERT INTO customer_balances (customer_id, total_payments)
+            VALUES (NEW.customer_id, COALESCE(NEW.amount, 0))
+            ON CONFLICT(customer_id) DO UPDATE
+            SET total_payments = total_payments + excluded.total_payments;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_balance_delete
+        AFTER DELETE ON payments WHEN OLD.customer_id IS NOT NULL
+        BEGIN
+            UPDATE customer_balances
+            SET total_payments = total_payments - COALESCE(OLD.amount, 0)
+            WHERE customer_id = OLD.customer_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_balance_update
+        AFTER UPDATE OF customer_id, amount ON payments
+        BEGIN
+            UPDATE customer_balances
+            SET total_payments = total_payments - COALESCE(OLD.amount, 0)
+            WHERE customer_id = OLD.customer_id;
+            INSERT INTO customer_balances (customer_id, total_payments)
+            SELECT NEW.customer_id, COALESCE(NEW.amount, 0) WHERE NEW.customer_id IS NOT NULL
+            ON CONFLICT(customer_id) DO UPDATE
+            SET total_payments = total_payments + excluded.total_payments;
+        END
+        """,
+
+        # Deleted customers take their ledger row with them
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_customers_balance_delete
+        AFTER DELETE ON customers
+        BEGIN
+            DELETE FROM customer_balances WHERE customer_id = OLD.customer_id;
+        END
+        """,
+    ]),
+    (4, "Add index for sorting invoice history by total", [
+        "CREATE INDEX IF NOT EXISTS idx_invoices_total ON invoices (COALESCE(total, 0))",
+    ]),
+    (5, "Add full-text search index over customers, invoices, visits, works and payments",
+     _search_index_steps()),
+    (6, "Link invoice stock movements to their invoice", [
+        # Rows written before this have no invoice_id and are left as they are
+        _add_inventory_invoice_column,
+        "CREATE INDEX IF NOT EXISTS idx_inventory_invoice ON inventory (invoice_id)",
+    ]),
+]
+
+
+class MigrationError(Exception):
+    """A schema migration failed; the database is left at the last good version"""
+
+
+class MigrationRunner:
+    """Apply versioned schema migrations to the application database"""
+
+    def __init__(self, db_path, migrations=None):
+        """Initialize with the database path and the ordered migration list"""
+        self.db_path = db_path
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m[0])
+
+    def _ensure_version_table(self, conn):
+        """Create the schema_version table if it does not exist"""
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT NOT NULL
+        )
+        """)
+        conn.commit()
+
+    def get_current_version(self, conn):
+        """Get the highest applied migration version (0 for a fresh schema)"""
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        return row[0] or 0
+
+    def pending_migrations(self, conn):
+        """List migrations newer than the current schema version"""
+        current = self.get_current_version(conn)
+        return [m for m in self.migrations if m[0] > current]
+
+    def apply_migration(self, conn, version, description, steps):
+        """Apply one migration and record it, all in a single transaction"""
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute("""
+            INSERT INTO schema_version (version, description, applied_at)
+            VALUES (?, ?, ?)
+            """, (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def run(self):
+        """Bring the schema up to date; returns the list of applied versions"""
+        applied = []
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            self._ensure_version_table(conn)
+            for version, description, steps in self.pending_migrations(conn):
+                try:
+                    self.apply_migration(conn, version, description, steps)
+                except Exception as e:
+                    raise MigrationError(f"Migration {version} ({description}) failed: {e}") from e
+                print(f"Applied migration {version}: {description}")
+                applied.append(version)
+        finally:
+            conn.close()
+        return applied
+
+    def get_status(self):
+        """Get (current_version, latest_version) without applying anything"""
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            self._ensure_version_table(conn)
+            current = self.get_current_version(conn)
+        finally:
+            conn.close()
+        latest = self.migrations[-1][0] if self.migrations else 0
+        return current, latest
+
+
+def apply_migrations(db_path="ganesh_toughened_industry.db"):
+    """Apply all pending migrations to the given database"""
+    return MigrationRunner(db_path).run()
+
+
+if __name__ == "__main__":
+    db_name = "ganesh_toughened_industry.db"
+
+    if not os.path.exists(db_name):
+        print("Database does not exist. Run the main application to create it.")
+    else:
+        runner = MigrationRunner(db_name)
+        applied = runner.run()
+        current, latest = runner.get_status()
+        if not applied:
+            print("Database schema is already up to date.")
+        print(f"Schema version: {current} (latest {latest})")
@@ -12,8 +12,8 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.lib import colors
 from PIL import Image
 import io
-import qrcode
 import json
+from .qr_cache import get_qr_cache
 
 class PDFGenerator:
     """PDF generation utilities for the application"""
@@ -305,24 +305,9 @@ class PDFGenerator:
             upi_id = self.db.get_setting("upi_id") or ""
             upi_name = self.db.get_setting("upi_name") or ""
             
-            # Generate QR code
-            upi_string = f"upi://pay?pa={upi_id}&pn={upi_name}&am={invoice['total']:.2f}&cu=INR"
-            
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(upi_string)
-            qr.make(fit=True)
-            
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            qr_buffer = io.BytesIO()
-            qr_img.save(qr_buffer, format="PNG")
-            qr_buffer.seek(0)
-            
-            qr_image = RLImage(qr_buffer, width=3*cm, height=3*cm)
+            # QR code (cached per payee and amount)
+            qr_png = get_qr_cache().get_png(upi_id, upi_name, invoice['total'])
+            qr_image = RLImage(io.BytesIO(qr_png), width=3*cm, height=3*cm)
             
             # Create UPI details without the "Click to Pay via UPI" text
             upi_details = [
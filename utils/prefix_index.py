@@ -0,0 +1,71 @@
+import re
+from bisect import bisect_left
+
+
+def normalize_key(text):
+    """Case-fold text and collapse whitespace so keys and typed prefixes compare alike"""
+    return " ".join(str(text or "").casefold().split())
+
+
+class PrefixIndex:
+    """Sorted prefix index for type-ahead lookups
+
+    Values are indexed under one or more keys, each with a rank. Keys of a
+    rank are kept in one sorted list, so a lookup is a binary search to the
+    first key with the prefix followed by a short scan; it stays instant
+    with tens of thousands of entries. Matches of a lower rank come first.
+    """
+
+    def __init__(self, entries, ranks=1):
+        """Build the index from (rank, key, value) entries"""
+        buckets = [[] for _ in range(ranks)]
+        for rank, key, value in entries:
+            if key:
+                buckets[rank].append((normalize_key(key), value))
+        for bucket in buckets:
+            bucket.sort(key=lambda entry: entry[0])
+
+        self._keys = [[key for key, value in bucket] for bucket in buckets]
+        self._values = [[value for key, value in bucket] for bucket in buckets]
+
+    def search(self, prefix, limit=20):
+        """Values with a key starting with prefix, best rank first, without duplicates"""
+        prefix = normalize_key(prefix)
+        results = []
+        seen = set()
+        for keys, values in zip(self._keys, self._values):
+            position = bisect_left(keys, prefix)
+            while position < len(keys) and keys[position].startswith(prefix):
+                value = values[position]
+                if value not in seen:
+                    seen.add(value)
+                    results.append(value)
+                    if len(results) >= limit:
+                        return results
+                position += 1
+        return results
+
+    def __len__(self):
+        """Number of keys in the index"""
+        return sum(len(keys) for keys in self._keys)
+
+
+def build_customer_index(customers):
+    """Prefix index of customer names
+
+    A customer is found by the start of their name (ranked first), by the
+    start of any later word of the name ("kumar" finds "Ravi Kumar"), or by
+    the start of their phone number.
+    """
+    def entries():
+        for customer in customers:
+            name = customer["name"]
+            yield 0, name, name
+            words = normalize_key(name).split(" ")
+            for position in range(1, len(words)):
+                yield 1, " ".join(words[position:]), name
+            phone = re.sub(r"\D", "", customer.get("phone") or "")
+            if phone:
+                yield 2, phone, name
+
+    return PrefixIndex(entries(), ranks=3)
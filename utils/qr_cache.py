@@ -0,0 +1,152 @@
+import os
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Shared on-disk cache so QR codes survive restarts and are shared by bulk
+# regeneration workers. It sits in the app directory whatever the working
+# directory is.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QR_CACHE_DIR = os.path.join(APP_DIR, "cache", "qr_codes")
+
+
+def format_upi_amount(amount):
+    """Format an amount the way it appears in UPI payment links"""
+    return f"{float(amount):.2f}"
+
+
+def build_upi_url(upi_id, upi_name, amount, note=None):
+    """Build a UPI payment link for a payee and amount"""
+    upi_url = f"upi://pay?pa={upi_id}&pn={upi_name}&am={format_upi_amount(amount)}&cu=INR"
+    if note:
+        upi_url += f"&tn={note}"
+    return upi_url
+
+
+class QRCodeCache:
+    """Bounded LRU cache of UPI QR code PNG bytes
+
+    Entries are keyed by (upi_id, upi_name, amount, note) plus the fill color,
+    so invoices for the same amount share one encoded image. With a cache_dir
+    the PNGs are also kept on disk (at most max_disk_entries files).
+    """
+
+    def __init__(self, max_entries=256, cache_dir=None, max_disk_entries=2048):
+        """Initialize the cache"""
+        self.max_entries = max(1, int(max_entries))
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_png(self, upi_id, upi_name, amount, note=None, fill_color="black", back_color="white"):
+        """Get the PNG bytes of a UPI QR code, generating it only on a cache miss"""
+        key = (upi_id or "", upi_name or "", format_upi_amount(amount), note or "", str(fill_color), str(back_color))
+
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png
+            self.misses += 1
+
+        png = self._load_from_disk(key)
+        if png is None:
+            png = self._generate_png(key[0], key[1], amount, note, fill_color, back_color)
+            self._save_to_disk(key, png)
+
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return png
+
+    def clear(self):
+        """Drop all in-memory entries (files on disk are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _generate_png(self, upi_id, upi_name, amount, note, fill_color, back_color):
+        """Render a QR code for the UPI link and PNG-encode it"""
+        import qrcode
+
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            box_size=10,
+            border=4,
+        )
+        qr.add_data(build_upi_url(upi_id, upi_name, amount, note))
+        qr.make(fit=True)
+
+        img = qr.make_image(fill_color=fill_color, back_color=back_color)
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def _disk_path(self, key):
+        """File name for a cache key"""
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def _load_from_disk(self, key):
+        """Read a cached PNG from disk, or None"""
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _save_to_disk(self, key, png):
+        """Write a PNG to the disk cache (atomically, so parallel writers are safe)"""
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._disk_path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(png)
+            os.replace(temp_path, path)
+
+            self._disk_writes += 1
+            if self._disk_writes % 100 == 0:
+                self._prune_disk()
+        except OSError as e:
+            print(f"Error caching QR code: {e}")
+
+    def _prune_disk(self):
+        """Remove the least recently written files beyond max_disk_entries"""
+        try:
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                     if name.endswith(".png")]
+            if len(files) <= self.max_disk_entries:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_disk_entries]:
+                os.remove(path)
+        except OSError as e:
+            print(f"Error pruning QR code cache: {e}")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_qr_cache():
+    """Get the application-wide QR code cache"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = QRCodeCache(cache_dir=QR_CACHE_DIR)
+        return _default_cache
@@ -0,0 +1,82 @@
+import subprocess
+import sys
+
+# Top-level package -> subsystem shown in the startup breakdown
+SUBSYSTEMS = {
+    "reportlab": "PDF (reportlab)",
+    "qrcode": "QR codes (qrcode)",
+    "png": "QR codes (qrcode)",
+    "PIL": "Imaging (PIL)",
+    "zipfile": "Backup (zipfile)",
+    "zlib": "Backup (zipfile)",
+    "bz2": "Backup (zipfile)",
+    "_bz2": "Backup (zipfile)",
+    "lzma": "Backup (zipfile)",
+    "_lzma": "Backup (zipfile)",
+    "_compression": "Backup (zipfile)",
+    "tkinter": "Tk",
+    "_tkinter": "Tk",
+    "sqlite3": "Database",
+    "_sqlite3": "Database",
+    "database": "Database",
+    "database_manager": "Database",
+    "settings_manager": "Application",
+    "modules": "Application",
+    "utils": "Application",
+    "main": "Application",
+}
+
+
+def get_subsystem(module_name):
+    """Map an imported module name to its startup subsystem"""
+    top = module_name.split(".")[0]
+    if top.startswith("win32") or top.startswith("pywin") or top == "pythoncom":
+        return "Windows integration"
+    return SUBSYSTEMS.get(top, "Python standard library / other")
+
+
+def summarize_importtime(lines):
+    """Aggregate -X importtime output into {subsystem: (self_us, module_count)}"""
+    totals = {}
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _cumulative, name = line[len("import time:"):].split("|", 2)
+            self_us = int(self_us)
+        except ValueError:
+            continue
+        subsystem = get_subsystem(name.strip())
+        total, count = totals.get(subsystem, (0, 0))
+        totals[subsystem] = (total + self_us, count + 1)
+    return totals
+
+
+def profile_startup(script_path):
+    """Run the application's startup under -X importtime and print a per-subsystem breakdown"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script_path, "--startup-probe"],
+        capture_output=True, text=True
+    )
+
+    totals = summarize_importtime(result.stderr.splitlines())
+    grand_total = sum(total for total, _ in totals.values())
+
+    print(f"{'Subsystem':<32} {'Import ms':>10} {'Modules':>8} {'Share':>7}")
+    print("-" * 60)
+    for subsystem, (total, count) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+        share = total / grand_total * 100 if grand_total else 0
+        print(f"{subsystem:<32} {total / 1000:>10.1f} {count:>8} {share:>6.1f}%")
+    print("-" * 60)
+    print(f"{'Total imports':<32} {grand_total / 1000:>10.1f}")
+
+    for line in result.stdout.splitlines():
+        if line.startswith("Time to first window:"):
+            print(line)
+            break
+    else:
+        print("Startup did not complete; application output follows")
+        print(result.stdout)
+        print("\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:")))
+
+    return result.returncode
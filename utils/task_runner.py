@@ -0,0 +1,171 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundTask:
+    """Handle for work submitted to the TaskRunner"""
+
+    def __init__(self, description, key=None):
+        """Initialize the handle; the future is attached once submitted"""
+        self.description = description
+        self.key = key
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Cancel the task; its callbacks will not run
+
+        A task that has not started yet is dropped from the pool. A running
+        task finishes in the background unless it checks is_cancelled().
+        """
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def is_cancelled(self):
+        """Check whether the task was cancelled"""
+        return self._cancelled.is_set()
+
+
+class TaskRunner:
+    """Run slow work (queries, PDFs, backups) on a thread pool and hand the
+    results back to the Tk main loop
+
+    Workers never touch Tk. They put their outcome on a queue, and the queue
+    is drained on the Tk thread with root.after, where the on_done/on_error
+    callbacks run.
+    """
+
+    def __init__(self, root, max_workers=4, poll_ms=50, idle_poll_ms=250, on_busy_change=None):
+        """Initialize the runner for a Tk root window"""
+        self.root = root
+        self.poll_ms = poll_ms
+        self.idle_poll_ms = idle_poll_ms
+        self.on_busy_change = on_busy_change
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gti-task")
+        self.results = queue.Queue()
+        self.active = []
+        self.closed = False
+
+        # The queue is always polled (slowly when idle) because call_soon may be
+        # used from threads that must not call root.after themselves
+        self._poll_id = self.root.after(self.idle_poll_ms, self._drain)
+
+    def submit(self, func, *args, on_done=None, on_error=None, description="Working", key=None,
+               pass_task=False, **kwargs):
+        """Run func(*args, **kwargs) in the background
+
+        on_done(result) or on_error(exception) is called on the Tk thread.
+        Submitting with a key cancels any earlier task with the same key, so a
+        newer search or page load replaces a stale one. With pass_task=True the
+        task handle is passed as the first argument so long jobs can stop early
+        when task.is_cancelled().
+        """
+        if self.closed:
+            return None
+
+        if key is not None:
+            self.cancel(key)
+
+        task = BackgroundTask(description, key)
+        if pass_task:
+            args = (task,) + args
+
+        def run():
+            if task.is_cancelled():
+                return
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.results.put((task, on_error, e, False))
+            else:
+                self.results.put((task, on_done, result, True))
+
+        self.active.append(task)
+        task.future = self.executor.submit(run)
+        self._busy_changed()
+        return task
+
+    def call_soon(self, callback, *args):
+        """Run callback(*args) on the Tk thread; safe to call from any thread"""
+        if not self.closed:
+            self.results.put((None, callback, args, None))
+
+    def set_progress(self, task, description):
+        """Update a running task's description in the busy indicator; safe to call from any thread"""
+        task.description = description
+        self.call_soon(self._busy_changed)
+
+    def cancel(self, key=None):
+        """Cancel the tasks with the given key, or all tasks when key is None"""
+        for task in list(self.active):
+            if key is None or task.key == key:
+                task.cancel()
+                self.active.remove(task)
+        self._busy_changed()
+
+    def is_busy(self):
+        """Check whether any background work is still pending"""
+        return bool(self.active)
+
+    def shutdown(self):
+        """Cancel pending work and stop polling (called when the window closes)"""
+        self.cancel()
+        self.closed = True
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _drain(self):
+        """Deliver finished results to their callbacks (runs on the Tk thread)"""
+        self._poll_id = None
+        delivered = False
+
+        while True:
+            try:
+                task, callback, value, succeeded = self.results.get_nowait()
+            except queue.Empty:
+                break
+            delivered = True
+
+            if task is None:
+                # call_soon request from another thread
+                self._run_callback(callback, *value)
+                continue
+
+            if task in self.active:
+                self.active.remove(task)
+            if task.is_cancelled():
+                continue
+
+            if callback is not None:
+                self._run_callback(callback, value)
+            elif not succeeded:
+                print(f"Error in background task '{task.description}': {value}")
+
+        if delivered:
+            self._busy_changed()
+
+        if not self.closed:
+            self._poll_id = self.root.after(self.poll_ms if self.active else self.idle_poll_ms, self._drain)
+
+    def _run_callback(self, callback, *args):
+        """Run a callback, reporting errors instead of breaking the drain loop"""
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Error in background task callback: {e}")
+
+    def _busy_changed(self):
+        """Tell the UI how many tasks are running and what they are"""
+        if self.on_busy_change is not None:
+            try:
+                self.on_busy_change([task.description for task in self.active])
+            except Exception as e:
+                print(f"Error updating busy indicator: {e}")
@@ -1,6 +1,11 @@
-import sqlite3
 import os
 
+try:
+    from utils.migrations import MigrationRunner
+except ImportError:
+    # Running as a script from inside the utils directory
+    from migrations import MigrationRunner
+
 def update_invoice_items_schema():
     db_name = "ganesh_toughened_industry.db"
     
@@ -8,26 +13,13 @@ def update_invoice_items_schema():
         print("Database does not exist. Run the main application to create it.")
         return
     
-    conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
-    
     try:
-        # Check if rounded_sqft column exists in invoice_items table
-        cursor.execute("PRAGMA table_info(invoice_items)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'rounded_sqft' not in columns:
-            print("Adding rounded_sqft column to invoice_items table...")
-            cursor.execute("ALTER TABLE invoice_items ADD COLUMN rounded_sqft REAL")
-        
-        conn.commit()
+        # The rounded_sqft column is now added by the versioned migrations
+        MigrationRunner(db_name).run()
         print("Database schema updated successfully!")
         
     except Exception as e:
         print(f"Error updating database schema: {e}")
-        conn.rollback()
-    
-    finally:
-        conn.close()
 
 if __name__ == "__main__":
-    update_invoice_items_schema()
\ No newline at end of file
+    update_invoice_items_schema()